@@ -21,4 +21,14 @@ __all__ = [
     "Fingerprint",
     "Fingerprinter",
     "__version__",
+    "main",
 ]
+
+
+def __getattr__(name: str):
+    # CLI 入口按需导入, import modelaudit 时不加载 click 命令树
+    if name == "main":
+        from modelaudit.cli import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,6 @@
+"""python -m modelaudit 入口."""
+
+from modelaudit.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 """指纹方法抽象基类."""
 
 from abc import ABC, abstractmethod
-from typing import Literal
+from typing import ClassVar, Literal
 
 from modelaudit.models import ComparisonResult, Fingerprint
 
@@ -9,6 +9,8 @@ from modelaudit.models import ComparisonResult, Fingerprint
 class Fingerprinter(ABC):
     """指纹方法抽象基类.
 
+    子类可以用类属性实现 name / fingerprint_type (类属性同样满足抽象属性)。
+
     所有指纹方法（白盒/黑盒）都需要实现这三个方法:
     - prepare(): 加载模型或建立 API 连接
     - get_fingerprint(): 提取模型指纹
@@ -41,14 +43,10 @@ class Fingerprinter(ABC):
 class WhiteBoxFingerprinter(Fingerprinter):
     """白盒指纹基类，需要访问模型权重."""
 
-    @property
-    def fingerprint_type(self) -> Literal["whitebox", "blackbox"]:
-        return "whitebox"
+    fingerprint_type: ClassVar[Literal["whitebox", "blackbox"]] = "whitebox"
 
 
 class BlackBoxFingerprinter(Fingerprinter):
     """黑盒指纹基类，只需要 API 访问."""
 
-    @property
-    def fingerprint_type(self) -> Literal["whitebox", "blackbox"]:
-        return "blackbox"
+    fingerprint_type: ClassVar[Literal["whitebox", "blackbox"]] = "blackbox"
@@ -1,108 +1,404 @@
 """指纹缓存 — 避免重复调用 API.
 
 将模型指纹保存为本地 JSON 文件，下次审计同一模型时直接复用。
-支持 TTL 过期机制。
+文本来源检测结果按文本内容 hash 追加写入 detections.jsonl, 每批检测只写一次。
+支持 TTL 过期机制，并在进程内保留一层 LRU 内存缓存，避免重复读盘解析。
+
+存储格式保持 JSON: 20 条探测的指纹约 36KB, orjson 解析约 0.1ms,
+改用 msgpack / mmap 二进制格式收益有限, 且会让现有缓存失效、无法直接查看。
 """
 
+import asyncio
+import functools
 import hashlib
 import json
 import logging
+import os
+import threading
 import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
 
-from modelaudit.models import Fingerprint
+from modelaudit.models import DetectionResult, Fingerprint
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# (model, method, provider)
+CacheRequest = tuple[str, str, str]
+
+
+def _loads(raw: bytes | str) -> Any:
+    """解析 JSON (有 orjson 时走 C 实现)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _dumps(obj: Any, indent: bool = True) -> bytes:
+    """序列化为 UTF-8 JSON bytes (有 orjson 时走 C 实现)."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, indent=2 if indent else None).encode("utf-8")
+
+
+# 模型名中不适合出现在文件名里的字符 → "_"
+_KEY_TRANS = str.maketrans({"/": "_", ":": "_", " ": "_"})
+
+
+def _tmp_path(path: Path) -> Path:
+    """原子写用的临时文件名. 按进程与线程区分, 并发写同一 key 时互不覆盖."""
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+# 缓存目录下的条目索引 (追加写), list_entries 用它避免逐个解析指纹文件
+_INDEX_FILE = "_index.jsonl"
+
+# 检测结果 (追加写, 每行 {"k": key, "t": 写入时间, "r": 结果}); 同 key 以最后一行为准
+_DETECTION_FILE = "detections.jsonl"
+
 
 class FingerprintCache:
     """本地指纹缓存."""
 
-    def __init__(self, cache_dir: str = ".modelaudit_cache", ttl: int = 0):
+    def __init__(
+        self,
+        cache_dir: str = ".modelaudit_cache",
+        ttl: int = 0,
+        max_memory_entries: int = 128,
+    ):
         self.cache_dir = Path(cache_dir)
         self.ttl = ttl  # 秒, 0=永不过期
+        self.max_memory_entries = max_memory_entries
+        # key -> (文件签名 (mtime_ns, size), 指纹)
+        self._mem: OrderedDict[str, tuple[tuple[int, int], Fingerprint]] = OrderedDict()
+        # (model, method, provider) -> (key, 文件路径), 省去每次查找的 hash 与 Path 拼接
+        self._paths: dict[CacheRequest, tuple[str, Path]] = {}
+        # 引擎会在多个线程中并发读写缓存, LRU 的复合操作需加锁
+        self._lock = threading.Lock()
+        # detections.jsonl 的内存副本: key -> (写入时间, 结果 dict), 及其对应的文件签名
+        self._detections: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._detections_sig: tuple[int, int] | None = None
 
     def get(self, model: str, method: str, provider: str) -> Fingerprint | None:
         """从缓存读取指纹. 不存在或已过期则返回 None."""
-        path = self.cache_dir / f"{self._key(model, method, provider)}.json"
-        if not path.exists():
+        key, path = self._entry(model, method, provider)
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self._mem.pop(key, None)
             return None
+        # TTL 以文件 mtime 为准, 过期条目只需一次 stat, 无需读盘解析
+        if self.ttl > 0 and time.time() - st.st_mtime > self.ttl:
+            logger.info("缓存已过期: %s (TTL=%ds)", path.name, self.ttl)
+            self._mem.pop(key, None)
+            path.unlink(missing_ok=True)
+            return None
+
+        # 内存命中且文件未被改动 → 跳过读盘和 JSON 解析
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and hit[0] == sig:
+                self._mem.move_to_end(key)
+                return hit[1]
 
         try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, Exception):
+            data = _loads(path.read_bytes())
+        except (OSError, ValueError):  # JSONDecodeError / UnicodeDecodeError 均为 ValueError
             logger.warning("缓存文件损坏，已忽略: %s", path)
             return None
+        if not isinstance(data, dict):
+            logger.warning("缓存文件格式错误，已忽略: %s", path)
+            return None
 
-        # TTL 检查
-        if self.ttl > 0:
-            cached_at = data.get("_cached_at", 0)
-            if time.time() - cached_at > self.ttl:
-                logger.info("缓存已过期: %s (TTL=%ds)", path.name, self.ttl)
-                path.unlink(missing_ok=True)
-                return None
-
-        # 移除内部元数据字段后反序列化
-        data.pop("_cached_at", None)
         try:
-            return Fingerprint(**data)
-        except Exception:
+            fp = Fingerprint(**data)
+        except ValidationError:
+            logger.warning("缓存指纹字段无效，已忽略: %s", path)
             return None
+        self._remember(key, sig, fp)
+        return fp
 
     def put(self, model: str, method: str, provider: str, fp: Fingerprint) -> None:
         """将指纹写入缓存."""
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        path = self.cache_dir / f"{self._key(model, method, provider)}.json"
-        data = fp.model_dump()
-        data["_cached_at"] = time.time()
-        path.write_text(
-            json.dumps(data, ensure_ascii=False, indent=2, default=str),
-            encoding="utf-8",
+        key, path = self._entry(model, method, provider)
+        data = fp.model_dump(mode="json")
+        # 先写临时文件再原子替换, 进程中途被杀也不会留下半截 JSON
+        tmp = _tmp_path(path)
+        tmp.write_bytes(_dumps(data))
+        os.replace(tmp, path)
+        st = path.stat()
+        self._remember(key, (st.st_mtime_ns, st.st_size), fp)
+        self._append_index(path.name, data)
+
+    def get_many(
+        self, requests: list[CacheRequest], max_workers: int = 8
+    ) -> dict[CacheRequest, Fingerprint | None]:
+        """批量读取缓存. 返回 {(model, method, provider): 指纹或 None}.
+
+        多条请求时在线程池中并发 stat/读盘, 各文件的 IO 等待相互重叠。
+        """
+        reqs = list(dict.fromkeys(requests))
+        if len(reqs) <= 1 or max_workers <= 1:
+            return {req: self.get(*req) for req in reqs}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(reqs))) as ex:
+            return dict(zip(reqs, ex.map(lambda req: self.get(*req), reqs), strict=True))
+
+    async def warm(
+        self,
+        requests: list[CacheRequest],
+        fetch: Callable[[str, str, str], Awaitable[Fingerprint]],
+        concurrency: int = 16,
+    ) -> dict[CacheRequest, Fingerprint]:
+        """预热缓存: 对未命中的请求并发调用 fetch 并写回缓存.
+
+        Args:
+            requests: (model, method, provider) 列表
+            fetch: 异步获取指纹的回调, 参数同 requests 元素
+            concurrency: 最大并发 fetch 数
+        """
+        results = self.get_many(requests)
+        misses = [req for req, fp in results.items() if fp is None]
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _fetch(req: CacheRequest) -> None:
+            async with sem:
+                fp = await fetch(*req)
+            self.put(*req, fp)
+            results[req] = fp
+
+        await asyncio.gather(*(_fetch(req) for req in misses))
+        return {req: fp for req, fp in results.items() if fp is not None}
+
+    @staticmethod
+    def detection_key(text: str, namespace: str = "style") -> str:
+        """检测结果缓存 key: namespace (方法/版本) + 文本内容的 blake2b."""
+        h = hashlib.blake2b(namespace.encode(), digest_size=16)
+        h.update(b"\0")
+        h.update(text.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def get_detection(self, key: str) -> DetectionResult | None:
+        """读取缓存的检测结果. 不存在、已过期或损坏则返回 None."""
+        return self.get_detections([key])[0]
+
+    def get_detections(self, keys: list[str]) -> list[DetectionResult | None]:
+        """批量读取检测结果, 与 keys 一一对应. 整个检测缓存文件只读一次."""
+        with self._lock:
+            records = self._load_detections()
+        now = time.time()
+        results: list[DetectionResult | None] = []
+        for key in keys:
+            hit = records.get(key)
+            if hit is None or (self.ttl > 0 and now - hit[0] > self.ttl):
+                results.append(None)
+                continue
+            try:
+                results.append(DetectionResult(**hit[1]))
+            except (ValueError, TypeError):  # ValidationError 亦为 ValueError
+                logger.warning("检测缓存条目无效，已忽略: %s", key)
+                results.append(None)
+        return results
+
+    def put_detection(self, key: str, result: DetectionResult) -> None:
+        """写入检测结果缓存."""
+        self.put_detections([(key, result)])
+
+    def put_detections(self, items: list[tuple[str, DetectionResult]]) -> None:
+        """批量写入检测结果: 整批拼成一块, 单次追加写入."""
+        if not items:
+            return
+        now = time.time()
+        records = [(key, result.model_dump(mode="json")) for key, result in items]
+        blob = b"".join(
+            _dumps({"k": key, "t": now, "r": data}, indent=False) + b"\n" for key, data in records
         )
+        path = self.cache_dir / _DETECTION_FILE
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            with open(path, "ab") as f:
+                f.write(blob)
+                size = f.tell()
+            st = path.stat()
+            # 文件只增长了本次写入的字节 → 期间无其他写入方, 内存副本直接追加, 否则下次读取时重载
+            if self._detections_sig is not None and self._detections_sig[1] + len(blob) == size:
+                self._detections.update((key, (now, data)) for key, data in records)
+                self._detections_sig = (st.st_mtime_ns, st.st_size)
+            else:
+                self._detections_sig = None
 
     def list_entries(self) -> list[dict[str, str]]:
-        """列出所有缓存条目."""
-        entries = []
+        """列出所有缓存条目.
+
+        优先读取 _index.jsonl; 索引中缺失或比索引更新的文件才回退到解析 JSON.
+        """
+        entries: list[dict[str, str]] = []
         if not self.cache_dir.exists():
             return entries
 
-        for path in sorted(self.cache_dir.glob("*.json")):
-            try:
-                data = json.loads(path.read_text(encoding="utf-8"))
-                entries.append({
-                    "file": path.name,
-                    "model": data.get("model_id", ""),
-                    "method": data.get("method", ""),
-                    "type": data.get("fingerprint_type", ""),
-                    "created": data.get("created_at", ""),
-                    "size": f"{path.stat().st_size / 1024:.1f} KB",
-                })
-            except (json.JSONDecodeError, Exception):
+        files: dict[str, os.stat_result] = {}
+        with os.scandir(self.cache_dir) as it:
+            for de in it:
+                if de.name.endswith(".json") and de.is_file():
+                    files[de.name] = de.stat()
+
+        index, index_mtime, index_lines = self._read_index()
+
+        for name in sorted(files):
+            st = files[name]
+            record = index.get(name)
+            if record is None or st.st_mtime_ns > index_mtime:
+                try:
+                    data = _loads((self.cache_dir / name).read_bytes())
+                    record = self._index_record(name, data)
+                except (OSError, ValueError, AttributeError):
+                    record = None
+
+            if record is None:
                 entries.append({
-                    "file": path.name,
+                    "file": name,
                     "model": "?",
                     "method": "?",
                     "type": "?",
                     "created": "?",
-                    "size": f"{path.stat().st_size / 1024:.1f} KB",
+                    "size": f"{st.st_size / 1024:.1f} KB",
+                })
+            else:
+                entries.append({
+                    "file": name,
+                    "model": record.get("model_id", ""),
+                    "method": record.get("method", ""),
+                    "type": record.get("fingerprint_type", ""),
+                    "created": record.get("created_at", ""),
+                    "size": f"{st.st_size / 1024:.1f} KB",
                 })
 
+        # 索引被覆盖写/过期删除撑大后顺手压缩
+        if index_lines > 2 * max(len(files), 1):
+            self._rewrite_index({n: index[n] for n in files if n in index})
+
         return entries
 
     def clear(self) -> int:
-        """清除所有缓存. 返回删除的文件数."""
+        """清除所有缓存 (含检测结果). 返回删除的文件数."""
         count = 0
+        self._mem.clear()
         if self.cache_dir.exists():
             for path in self.cache_dir.glob("*.json"):
                 path.unlink()
                 count += 1
+            (self.cache_dir / _INDEX_FILE).unlink(missing_ok=True)
+            with self._lock:
+                self._detections_sig = None
+                count += len(self._load_detections())
+                (self.cache_dir / _DETECTION_FILE).unlink(missing_ok=True)
+                self._detections = {}
+                self._detections_sig = None
+            # 写入中途被杀留下的临时文件不算条目, 一并清掉
+            for path in self.cache_dir.glob("*.tmp"):
+                path.unlink(missing_ok=True)
         return count
 
+    def _entry(self, model: str, method: str, provider: str) -> tuple[str, Path]:
+        req = (model, method, provider)
+        entry = self._paths.get(req)
+        if entry is None:
+            key = self._key(model, method, provider)
+            entry = self._paths.setdefault(req, (key, self.cache_dir / f"{key}.json"))
+        return entry
+
+    def _load_detections(self) -> dict[str, tuple[float, dict[str, Any]]]:
+        """返回检测结果的内存副本; 文件签名变化 (其他进程写入) 时重新读取. 调用方需持锁."""
+        path = self.cache_dir / _DETECTION_FILE
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            self._detections, self._detections_sig = {}, (0, 0)
+            return self._detections
+        sig = (st.st_mtime_ns, st.st_size)
+        if sig == self._detections_sig:
+            return self._detections
+
+        records: dict[str, tuple[float, dict[str, Any]]] = {}
+        raw = path.read_bytes()
+        for line in raw.splitlines():
+            try:
+                rec = _loads(line)
+                records[rec["k"]] = (float(rec["t"]), rec["r"])
+            except (ValueError, KeyError, TypeError):
+                continue
+        self._detections, self._detections_sig = records, (sig[0], len(raw))
+        return records
+
+    @staticmethod
+    def _index_record(name: str, data: dict) -> dict[str, str]:
+        return {
+            "file": name,
+            "model_id": data.get("model_id", ""),
+            "method": data.get("method", ""),
+            "fingerprint_type": data.get("fingerprint_type", ""),
+            "created_at": str(data.get("created_at", "")),
+        }
+
+    def _append_index(self, name: str, data: dict) -> None:
+        record = self._index_record(name, data)
+        with open(self.cache_dir / _INDEX_FILE, "ab") as f:
+            f.write(_dumps(record, indent=False) + b"\n")
+
+    def _read_index(self) -> tuple[dict[str, dict[str, str]], int, int]:
+        """读取索引. 返回 (file -> 记录, 索引 mtime_ns, 行数); 同名文件以最后一条为准."""
+        path = self.cache_dir / _INDEX_FILE
+        try:
+            mtime = path.stat().st_mtime_ns
+            lines = path.read_bytes().splitlines()
+        except FileNotFoundError:
+            return {}, 0, 0
+
+        index: dict[str, dict[str, str]] = {}
+        for line in lines:
+            try:
+                record = _loads(line)
+                index[record["file"]] = record
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+        return index, mtime, len(lines)
+
+    def _rewrite_index(self, index: dict[str, dict[str, str]]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / _INDEX_FILE).write_bytes(
+            b"".join(_dumps(r, indent=False) + b"\n" for r in index.values()),
+        )
+
+    def _remember(self, key: str, sig: tuple[int, int], fp: Fingerprint) -> None:
+        """写入内存 LRU, 超出容量时淘汰最久未使用的条目."""
+        if self.max_memory_entries <= 0:
+            return
+        with self._lock:
+            self._mem[key] = (sig, fp)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_memory_entries:
+                self._mem.popitem(last=False)
+
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def _key(model: str, method: str, provider: str) -> str:
         """生成缓存文件名 (hash 防碰撞)."""
         combined = f"{method}:{model}:{provider}"
         digest = hashlib.sha256(combined.encode()).hexdigest()[:16]
         # 前缀保留可读性, hash 保证唯一性
-        safe_model = model.replace("/", "_").replace(":", "_").replace(" ", "_")[:40]
+        safe_model = model.translate(_KEY_TRANS)[:40]
         return f"{method}_{safe_model}_{digest}"
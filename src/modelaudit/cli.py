@@ -1,25 +1,77 @@
 """ModelAudit CLI — 命令行界面."""
 
+import csv
+import functools
+import importlib
 import json
 import logging
 import sys
+from collections import Counter
+from collections.abc import Callable
+from operator import itemgetter
 from pathlib import Path
+from types import ModuleType
+from typing import Any
 
 import click
 
 from modelaudit import __version__
-from modelaudit.config import AuditConfig
+from modelaudit.config import DEFAULT_CONFIG, get_config
 from modelaudit.engine import AuditEngine
+from modelaudit.models import DetectionResult
+
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+@functools.cache
+def _lazy(name: str) -> ModuleType:
+    """按需导入 modelaudit 子模块, 首次导入后缓存 (缩短 --help 等短命令的启动)."""
+    return importlib.import_module(f"modelaudit.{name}")
+
+
+@functools.cache
+def _detection_adapter() -> Any:
+    """检测结果列表的序列化器 (pydantic-core 直接输出 JSON bytes, 不经 model_dump).
+
+    只有 detect 输出 JSON 时才用到, 首次调用时才导入并构造 TypeAdapter。
+    """
+    from pydantic import TypeAdapter
+
+    return TypeAdapter(list[DetectionResult])
+
+
+@functools.cache
+def _rich() -> tuple[Any, Any, Any] | None:
+    """延迟导入 rich, 返回 (Console, Table, Progress); 未安装时返回 None."""
+    try:
+        from rich.console import Console
+        from rich.progress import Progress
+        from rich.table import Table
+    except ImportError:
+        return None
+    return Console, Table, Progress
+
+
+_logging_configured = False
 
 
 def _setup_logging(verbose: bool) -> None:
-    """配置日志级别."""
+    """配置日志级别 (每个进程只配置一次)."""
+    global _logging_configured
+    if _logging_configured:
+        return
     level = logging.DEBUG if verbose else logging.WARNING
     logging.basicConfig(
         level=level,
         format="%(asctime)s %(name)s [%(levelname)s] %(message)s",
         datefmt="%H:%M:%S",
     )
+    _logging_configured = True
 
 
 @click.group()
@@ -50,12 +102,14 @@ def main(ctx: click.Context, verbose: bool):
     "--field", type=str, default=None,
     help="JSONL/JSON 中的文本字段名 (默认自动尝试 text/content/output)",
 )
+@click.option("--no-cache", is_flag=True, default=False, help="不使用检测结果缓存，强制重新分析")
 def detect(
     data_path: str,
     output: str | None,
     output_format: str,
     limit: int,
     field: str | None,
+    no_cache: bool,
 ):
     """检测文本数据来源 — 判断文本是哪个模型生成的
 
@@ -75,66 +129,97 @@ def detect(
     if limit > 0:
         texts = texts[:limit]
 
-    short_count = sum(1 for t in texts if len(t.split()) < 10)
+    # maxsplit=9: 最多切出 10 段即可判定, 长文本不必整篇分词
+    short_count = sum(1 for t in texts if len(t.split(maxsplit=9)) < 10)
     if short_count > 0:
         click.echo(f"⚠ {short_count} 条文本少于 10 个词，检测置信度可能较低", err=True)
 
-    engine = AuditEngine()
-
-    # 大批量时显示进度条
-    if len(texts) > 10:
-        try:
-            from rich.progress import Progress
-
-            results = []
-            with Progress() as progress:
-                task = progress.add_task("分析文本来源...", total=len(texts))
-                # 分批处理以更新进度
-                batch_size = 50
-                for i in range(0, len(texts), batch_size):
-                    batch = texts[i : i + batch_size]
-                    results.extend(engine.detect(batch))
-                    progress.update(task, advance=len(batch))
-            # 修正 text_id（分批后需要重新编号）
-            for idx, r in enumerate(results):
-                r.text_id = idx
-        except ImportError:
-            click.echo(f"正在分析 {len(texts)} 条文本...")
-            results = engine.detect(texts)
+    use_cache = not no_cache
+    engine = AuditEngine(use_cache=use_cache)
+
+    # 重复文本只检测一次, 结果再按原下标展开
+    unique_texts, inverse = _dedupe(texts)
+
+    # 大批量时显示进度条; 小批量直接检测, 不必加载 rich
+    rich = _rich() if len(unique_texts) > 10 else None
+    if rich is not None:
+        _, _, Progress = rich
+        with Progress() as progress:
+            task = progress.add_task("分析文本来源...", total=len(unique_texts))
+            unique_results = engine.detect_batched(
+                unique_texts,
+                use_cache=use_cache,
+                on_batch=lambda n: progress.update(task, advance=n),
+            )
     else:
         click.echo(f"正在分析 {len(texts)} 条文本...")
-        results = engine.detect(texts)
+        unique_results = engine.detect(unique_texts, use_cache=use_cache)
+    results = _expand_results(unique_results, inverse)
 
+    # JSON 只序列化一次, stdout 与 -o 文件共用
+    payload: bytes | None = None
     if output_format == "table":
         _print_detection_table(results)
     elif output_format == "csv":
-        _print_detection_csv(results)
+        _write_detection_csv(results)
     else:
-        result_dicts = [r.model_dump() for r in results]
-        output_text = json.dumps(result_dicts, ensure_ascii=False, indent=2)
-        click.echo(output_text)
+        payload = _detection_adapter().dump_json(results, indent=2)
+        click.echo(payload.decode("utf-8"))
 
     if output:
         if output_format == "csv":
-            _save_detection_csv(results, output)
+            _write_detection_csv(results, output)
         else:
-            result_dicts = [r.model_dump() for r in results]
-            Path(output).write_text(
-                json.dumps(result_dicts, ensure_ascii=False, indent=2), encoding="utf-8"
-            )
+            if payload is None:
+                payload = _detection_adapter().dump_json(results, indent=2)
+            Path(output).write_bytes(payload)
         click.echo(f"\n结果已保存: {output}")
 
     # 统计
-    model_counts: dict[str, int] = {}
-    for r in results:
-        model_counts[r.predicted_model] = model_counts.get(r.predicted_model, 0) + 1
+    model_counts = Counter(r.predicted_model for r in results)
 
     click.echo("\n来源分布:")
-    for model, count in sorted(model_counts.items(), key=lambda x: -x[1]):
+    for model, count in model_counts.most_common():
         pct = count / len(results) * 100
         click.echo(f"  {model}: {count} ({pct:.1f}%)")
 
 
+def _dedupe(texts: list[str]) -> tuple[list[str], list[int]]:
+    """去重. 返回 (按首次出现顺序的唯一文本, 每条原文本对应的唯一文本下标)."""
+    index: dict[str, int] = {}
+    inverse = [index.setdefault(t, len(index)) for t in texts]
+    return list(index), inverse
+
+
+def _expand_results(
+    unique_results: list[DetectionResult], inverse: list[int]
+) -> list[DetectionResult]:
+    """把唯一文本的检测结果展开回原顺序, text_id 为原下标; 重复项使用副本."""
+    if len(unique_results) == len(inverse):
+        return unique_results
+    used = [False] * len(unique_results)
+    results: list[DetectionResult] = []
+    for idx, i in enumerate(inverse):
+        r = unique_results[i]
+        if used[i]:
+            r = r.model_copy(update={"text_id": idx})
+        else:
+            used[i] = True
+            r.text_id = idx
+        results.append(r)
+    return results
+
+
+# verify / compare / audit 共用: 每个端点同时在途的探测请求数
+_concurrency_option = click.option(
+    "-j", "--concurrency",
+    type=click.IntRange(1, 64),
+    default=DEFAULT_CONFIG.max_concurrency,
+    show_default=True,
+    help="同一 API 端点同时在途的探测请求数",
+)
+
+
 @main.command()
 @click.argument("model", type=str)
 @click.option(
@@ -145,14 +230,17 @@ def detect(
 )
 @click.option("--api-key", type=str, default="", help="API Key (默认使用环境变量)")
 @click.option("--api-base", type=str, default="", help="自定义 API 地址")
-def verify(model: str, provider: str, api_key: str, api_base: str):
+@_concurrency_option
+def verify(model: str, provider: str, api_key: str, api_base: str, concurrency: int):
     """验证模型身份 — 检查 API 背后是不是声称的模型
 
     MODEL: 模型名称 (如 gpt-4o, claude-3-opus)
     """
     click.echo(f"正在验证 {model} (provider: {provider})...")
 
-    config = AuditConfig(provider=provider, api_key=api_key, api_base=api_base)
+    config = get_config(
+        provider=provider, api_key=api_key, api_base=api_base, max_concurrency=concurrency,
+    )
     engine = AuditEngine(config, use_cache=True)
 
     try:
@@ -187,6 +275,7 @@ def verify(model: str, provider: str, api_key: str, api_base: str):
 @click.option("--api-key", type=str, default="", help="API Key")
 @click.option("--api-base", type=str, default="", help="自定义 API 地址")
 @click.option("--threshold", type=float, default=0.85, help="派生判定阈值")
+@_concurrency_option
 def compare(
     model_a: str,
     model_b: str,
@@ -194,6 +283,7 @@ def compare(
     api_key: str,
     api_base: str,
     threshold: float,
+    concurrency: int,
 ):
     """比对两个模型 — 判断是否存在蒸馏关系
 
@@ -202,11 +292,12 @@ def compare(
     """
     click.echo(f"正在比对 {model_a} vs {model_b}...")
 
-    config = AuditConfig(
+    config = get_config(
         provider=provider.split(",")[0],
         api_key=api_key,
         api_base=api_base,
         similarity_threshold=threshold,
+        max_concurrency=concurrency,
     )
     engine = AuditEngine(config)
 
@@ -256,6 +347,7 @@ def compare(
     help="报告格式",
 )
 @click.option("--no-cache", is_flag=True, default=False, help="不使用指纹缓存，强制重新调用 API")
+@_concurrency_option
 def audit(
     teacher: str,
     student: str,
@@ -271,6 +363,7 @@ def audit(
     output: str | None,
     output_format: str,
     no_cache: bool,
+    concurrency: int,
 ):
     """完整蒸馏审计 — 综合指纹比对 + 风格分析
 
@@ -290,7 +383,9 @@ def audit(
     """
     click.echo(f"正在审计: {teacher} → {student}...")
 
-    config = AuditConfig(provider=provider, api_key=api_key, api_base=api_base)
+    config = get_config(
+        provider=provider, api_key=api_key, api_base=api_base, max_concurrency=concurrency,
+    )
     engine = AuditEngine(config, use_cache=not no_cache)
 
     try:
@@ -319,9 +414,7 @@ def audit(
     click.echo(f"\n{result.summary}")
 
     # 生成报告
-    from modelaudit.report import generate_report
-
-    report_content = generate_report(result, output_format)
+    report_content = _lazy("report").generate_report(result, output_format)
 
     if output:
         Path(output).write_text(report_content, encoding="utf-8")
@@ -339,15 +432,11 @@ def audit(
 @main.command()
 @click.option("--category", type=click.Choice(["qa", "creative", "code", "reasoning"]), help="Filter by category")
 @click.option("--label", help="Filter by model family (gpt-4, claude, llama, etc.)")
-@click.pass_context
-def benchmark(ctx, category, label):
+def benchmark(category, label):
     """运行内置 benchmark — 评估文本来源检测准确率."""
-    from modelaudit.benchmark import evaluate_accuracy, get_benchmark_samples
-
-    verbose = ctx.obj.get("verbose", False) if ctx.obj else False
-    _setup_logging(verbose)
+    bench = _lazy("benchmark")
 
-    samples = get_benchmark_samples(category=category, label=label)
+    samples = bench.get_benchmark_samples(category=category, label=label)
     if not samples:
         click.echo("没有匹配的 benchmark 样本。")
         return
@@ -364,7 +453,7 @@ def benchmark(ctx, category, label):
         pred = result.predicted_model
         predictions.append((pred, sample.label))
 
-    eval_result = evaluate_accuracy(predictions)
+    eval_result = bench.evaluate_accuracy(predictions)
 
     # 显示结果
     click.echo(f"\n{'='*50}")
@@ -427,8 +516,6 @@ def cache_clear(cache_dir: str):
 @main.command()
 def methods():
     """列出所有可用的检测方法"""
-    # 确保方法已注册
-    import modelaudit.methods  # noqa: F401
     from modelaudit.registry import list_methods
 
     available = list_methods()
@@ -465,39 +552,58 @@ def _load_texts(data_path: str, field: str | None = None) -> list[str]:
     texts: list[str] = []
 
     if path.suffix in (".jsonl", ".ndjson"):
-        for line in path.read_text(encoding="utf-8").splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                text = _extract_text(obj, field)
+        # 逐行流式解析, 不把整个文件读进内存
+        extract: Callable[[Any], str] | None = None
+        with open(path, "rb", buffering=1 << 20) as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = _json_loads(line)
+                except ValueError:  # JSONDecodeError / 非法 UTF-8
+                    continue
+                if extract is None:
+                    extract = _pick_extractor(obj, field)
+                text = extract(obj)
                 if text:
                     texts.append(text)
-            except json.JSONDecodeError:
-                continue
     elif path.suffix == ".json":
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = _json_loads(path.read_bytes())
         if isinstance(data, list):
+            extract = None
             for item in data:
                 if isinstance(item, str):
                     texts.append(item)
                 elif isinstance(item, dict):
-                    text = _extract_text(item, field)
+                    if extract is None:
+                        extract = _pick_extractor(item, field)
+                    text = extract(item)
                     if text:
                         texts.append(text)
     elif path.suffix == ".csv":
-        import csv
         with open(path, encoding="utf-8", newline="") as f:
-            reader = csv.DictReader(f)
-            rows = list(reader)
-            for row in rows:
-                text = _extract_text(row, field)
-                if text:
-                    texts.append(text)
+            # 只读表头定位文本列, 之后逐行按下标取值, 不构造 dict 也不整表加载
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            columns = {name: i for i, name in enumerate(header)}  # 同名列取最后一个, 同 DictReader
+            names = (field,) if field else ("text", "content", "output")
+            idxs = [columns[n] for n in names if n in columns]
+            has_rows = False
+            if idxs:
+                for row in reader:
+                    if not row:
+                        continue
+                    has_rows = True
+                    for i in idxs:
+                        if i < len(row) and row[i]:
+                            texts.append(row[i])
+                            break
+            else:
+                has_rows = any(reader)
             # 如果没有找到文本且未指定 field，提示可用列名
-            if not texts and not field and rows:
-                available = ", ".join(rows[0].keys())
+            if not texts and not field and has_rows:
+                available = ", ".join(header)
                 raise click.UsageError(
                     f"CSV 中未找到 text/content/output 列。"
                     f"可用列: {available}\n"
@@ -506,8 +612,7 @@ def _load_texts(data_path: str, field: str | None = None) -> list[str]:
     else:
         # 纯文本，按段落分割
         content = path.read_text(encoding="utf-8")
-        paragraphs = content.split("\n\n")
-        texts = [p.strip() for p in paragraphs if p.strip()]
+        texts = [t for p in content.split("\n\n") if (t := p.strip())]
 
     return texts
 
@@ -521,50 +626,75 @@ def _extract_text(obj: dict | str, field: str | None = None) -> str:
     return obj.get("text") or obj.get("content") or obj.get("output") or ""
 
 
-def _print_detection_table(results: list) -> None:
-    """打印检测结果表格."""
-    try:
-        from rich.console import Console
-        from rich.table import Table
+def _pick_extractor(first: Any, field: str | None = None) -> Callable[[Any], str]:
+    """根据首条记录选定逐行提取函数.
 
-        console = Console()
-        table = Table(title="文本来源检测结果")
+    指定 field 或首条记录含 text 字段时，用 itemgetter 直接取该字段 (C 层查找)；
+    缺键、空值或非 dict 的行回退到 _extract_text，结果与其完全一致。
+    """
+    if not field and not (isinstance(first, dict) and "text" in first):
+        return _extract_text
 
-        table.add_column("ID", justify="right", style="dim")
-        table.add_column("预览", max_width=50)
-        table.add_column("预测模型", style="cyan")
-        table.add_column("置信度", justify="right", style="green")
+    get = itemgetter(field or "text")
 
-        for r in results:
-            conf_str = f"{r.confidence:.2%}"
-            table.add_row(str(r.text_id), r.text_preview, r.predicted_model, conf_str)
+    def extract(obj: Any) -> str:
+        try:
+            text = get(obj)
+        except (KeyError, TypeError):
+            return _extract_text(obj, field)
+        if text or field:
+            return text
+        return _extract_text(obj, field)
 
-        console.print(table)
-    except ImportError:
+    return extract
+
+
+def _print_detection_table(results: list) -> None:
+    """打印检测结果表格."""
+    rich = _rich()
+    if rich is None:
         # 无 rich 时用纯文本
         click.echo(f"{'ID':>4} | {'预测模型':>10} | {'置信度':>8} | 预览")
         click.echo("-" * 60)
         for r in results:
             click.echo(f"{r.text_id:>4} | {r.predicted_model:>10} | {r.confidence:>7.2%} | {r.text_preview}")
+        return
+
+    Console, Table, _ = rich
+    console = Console()
+    table = Table(title="文本来源检测结果")
 
+    table.add_column("ID", justify="right", style="dim")
+    table.add_column("预览", max_width=50)
+    table.add_column("预测模型", style="cyan")
+    table.add_column("置信度", justify="right", style="green")
 
-def _print_detection_csv(results: list) -> None:
-    """打印 CSV 格式检测结果."""
-    click.echo("id,predicted_model,confidence,text_preview")
     for r in results:
-        # 转义预览中的逗号和引号
-        preview = r.text_preview.replace('"', '""')
-        click.echo(f'{r.text_id},"{r.predicted_model}",{r.confidence:.4f},"{preview}"')
+        conf_str = f"{r.confidence:.2%}"
+        table.add_row(str(r.text_id), r.text_preview, r.predicted_model, conf_str)
+
+    console.print(table)
 
 
-def _save_detection_csv(results: list, output_path: str) -> None:
-    """保存 CSV 格式检测结果到文件."""
-    import csv
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.writer(f)
+def _write_detection_csv(results: list, output_path: str | None = None) -> None:
+    """以 CSV 格式写出检测结果; output_path 为空时写到 stdout.
+
+    引号转义交给 csv 模块, 整批行经 writerows 一次写出。
+    """
+
+    def _write(f, lineterminator: str) -> None:
+        writer = csv.writer(f, lineterminator=lineterminator)
         writer.writerow(["id", "predicted_model", "confidence", "text_preview"])
-        for r in results:
-            writer.writerow([r.text_id, r.predicted_model, f"{r.confidence:.4f}", r.text_preview])
+        writer.writerows(
+            (r.text_id, r.predicted_model, f"{r.confidence:.4f}", r.text_preview) for r in results
+        )
+
+    if output_path is None:
+        _write(sys.stdout, "\n")
+        sys.stdout.flush()
+    else:
+        with open(output_path, "w", encoding="utf-8", newline="") as f:
+            _write(f, "\r\n")
 
 
 if __name__ == "__main__":
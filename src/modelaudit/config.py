@@ -1,12 +1,16 @@
 """配置模型."""
 
-from typing import Literal
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 
 
 class AuditConfig(BaseModel):
-    """审计引擎配置."""
+    """审计引擎配置 (不可变, 可安全地在多个引擎间共享)."""
+
+    model_config = ConfigDict(frozen=True)
 
     # 黑盒配置
     blackbox_method: str = "llmmap"
@@ -18,6 +22,12 @@ class AuditConfig(BaseModel):
     # API 调用配置
     api_timeout: int = Field(default=60, ge=10, le=300, description="API 调用超时（秒）")
     api_max_retries: int = Field(default=3, ge=0, le=10, description="API 最大重试次数")
+    max_concurrency: int = Field(default=4, ge=1, le=64, description="每个 API 端点的并发请求上限")
+    rate_limits: Mapping[str, tuple[int, int]] = Field(
+        default_factory=dict,
+        validate_default=True,
+        description="按 provider 主动限速 {provider: (RPM, TPM)}，0=该维度不限",
+    )
 
     # 白盒配置
     whitebox_method: str = "reef"
@@ -28,3 +38,32 @@ class AuditConfig(BaseModel):
     output_format: Literal["json", "markdown"] = "markdown"
     cache_dir: str = ".modelaudit_cache"
     cache_ttl: int = Field(default=0, ge=0, description="缓存过期时间（秒），0=永不过期")
+    prewarm_models: tuple[str, ...] = Field(
+        default=(),
+        description="引擎构造时在后台预读这些模型的缓存指纹",
+    )
+
+    @field_validator("rate_limits", mode="after")
+    @classmethod
+    def _freeze_rate_limits(
+        cls, v: Mapping[str, tuple[int, int]]
+    ) -> Mapping[str, tuple[int, int]]:
+        # frozen 只禁止字段重新赋值; 映射本身也设为只读, 共享的配置不会被原地改掉
+        return MappingProxyType(dict(v))
+
+    @field_serializer("rate_limits")
+    def _dump_rate_limits(self, v: Mapping[str, tuple[int, int]]) -> dict[str, tuple[int, int]]:
+        return dict(v)
+
+
+DEFAULT_CONFIG = AuditConfig()
+
+
+def get_config(**overrides: Any) -> AuditConfig:
+    """构造配置. 所有覆盖项都等于默认值时直接复用 DEFAULT_CONFIG, 省去一次校验."""
+    if all(
+        k in AuditConfig.model_fields and getattr(DEFAULT_CONFIG, k) == v
+        for k, v in overrides.items()
+    ):
+        return DEFAULT_CONFIG
+    return AuditConfig(**overrides)
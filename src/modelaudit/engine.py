@@ -1,11 +1,18 @@
 """审计引擎 — 组合多种方法进行综合判定."""
 
 import logging
+import threading
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from operator import itemgetter
 from typing import Any
 
+from modelaudit import __version__
+from modelaudit.base import Fingerprinter
 from modelaudit.cache import FingerprintCache
-from modelaudit.config import AuditConfig
+from modelaudit.config import DEFAULT_CONFIG, AuditConfig
 from modelaudit.models import AuditResult, ComparisonResult, DetectionResult, Fingerprint
+from modelaudit.ratelimit import RateLimiter
 from modelaudit.registry import get_fingerprinter
 
 logger = logging.getLogger(__name__)
@@ -22,14 +29,39 @@ class AuditEngine:
     """
 
     def __init__(self, config: AuditConfig | None = None, use_cache: bool = True):
-        self.config = config or AuditConfig()
+        self.config = config or DEFAULT_CONFIG
         self.cache = (
             FingerprintCache(self.config.cache_dir, ttl=self.config.cache_ttl)
             if use_cache
             else None
         )
-        # 确保方法模块已注册
-        import modelaudit.methods  # noqa: F401
+        # (provider, api_base) -> 限速器, 同一端点的并发调用共享额度
+        self._limiters: dict[tuple[str, str], RateLimiter] = {}
+        # (provider, api_base) -> 并发名额, 同一端点上所有模型的在途请求合计不超过 max_concurrency
+        self._slots: dict[tuple[str, str], threading.Semaphore] = {}
+        # (method, device) -> 仅用于 compare() 的指纹器; compare 不读取 prepare() 状态, 可安全复用
+        self._comparers: dict[tuple[str, str | None], Fingerprinter] = {}
+
+        if self.config.prewarm_models:
+            self.prewarm(self.config.prewarm_models)
+
+    def prewarm(
+        self, models: Sequence[str], method: str = "llmmap", provider: str | None = None
+    ) -> Future[int] | None:
+        """在后台线程预读缓存指纹到内存, 首次 fingerprint() 不再等待读盘与解析.
+
+        Returns:
+            结果为命中条数的 Future; 未启用缓存或 models 为空时返回 None
+        """
+        if not self.cache or not models:
+            return None
+        provider = provider or self.config.provider
+        reqs = [(m, method, provider) for m in models]
+        cache = self.cache
+        ex = ThreadPoolExecutor(max_workers=1, thread_name_prefix="modelaudit-prewarm")
+        future = ex.submit(lambda: sum(fp is not None for fp in cache.get_many(reqs).values()))
+        ex.shutdown(wait=False)
+        return future
 
     def fingerprint(self, model: str, method: str = "llmmap", **kwargs) -> Fingerprint:
         """提取单个模型的指纹.
@@ -54,36 +86,97 @@ class AuditEngine:
                 return cached
             logger.debug("缓存未命中: model=%s, method=%s", model, method)
 
-        fp_kwargs: dict[str, Any] = {}
-        if method == "llmmap":
-            fp_kwargs["provider"] = provider
-            fp_kwargs["api_key"] = kwargs.get("api_key", self.config.api_key)
-            fp_kwargs["api_base"] = kwargs.get("api_base", self.config.api_base)
-            fp_kwargs["num_probes"] = kwargs.get("num_probes", self.config.num_probes)
-            fp_kwargs["api_timeout"] = kwargs.get("api_timeout", self.config.api_timeout)
-            fp_kwargs["max_retries"] = kwargs.get("max_retries", self.config.api_max_retries)
-        elif method == "dli":
-            fp_kwargs["provider"] = provider
-            fp_kwargs["api_key"] = kwargs.get("api_key", self.config.api_key)
-            fp_kwargs["api_base"] = kwargs.get("api_base", self.config.api_base)
-            fp_kwargs["num_probes"] = kwargs.get("num_probes", 8)
-            fp_kwargs["api_timeout"] = kwargs.get("api_timeout", self.config.api_timeout)
-            fp_kwargs["max_retries"] = kwargs.get("max_retries", self.config.api_max_retries)
-        elif method == "reef":
-            fp_kwargs["device"] = kwargs.get("device", "cpu")
+        build = _METHOD_KWARGS.get(method)
+        fp_kwargs = build(self.config, kwargs, provider) if build else {}
+        if method in _API_METHODS:
+            api_base = fp_kwargs["api_base"]
+            fp_kwargs["rate_limiter"] = self._rate_limiter(provider, api_base)
+            fp_kwargs["slots"] = self._endpoint_slots(provider, api_base)
 
         logger.info("提取指纹: model=%s, method=%s, provider=%s", model, method, provider)
         fingerprinter = get_fingerprinter(method, **fp_kwargs)
         fingerprinter.prepare(model, **kwargs)
         fp = fingerprinter.get_fingerprint()
 
-        # 写入缓存
-        if self.cache:
+        # 写入缓存; 行编组 (marshal_batch > 1) 的响应风格与逐条探测不同, 不进缓存以免混用
+        if self.cache and fp.data.get("marshal_batch", 1) <= 1:
             self.cache.put(model, method, provider, fp)
             logger.debug("指纹已写入缓存: model=%s", model)
 
         return fp
 
+    def _rate_limiter(self, provider: str, api_base: str) -> RateLimiter | None:
+        """按 (provider, api_base) 共享限速器; config.rate_limits 未配置该 provider 时返回 None."""
+        limits = self.config.rate_limits.get(provider)
+        if not limits:
+            return None
+        key = (provider, api_base)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters.setdefault(key, RateLimiter(*limits))
+        return limiter
+
+    def _endpoint_slots(self, provider: str, api_base: str) -> threading.Semaphore:
+        """按 (provider, api_base) 共享并发名额, 不同端点互不阻塞."""
+        key = (provider, api_base)
+        slots = self._slots.get(key)
+        if slots is None:
+            slots = self._slots.setdefault(
+                key, threading.BoundedSemaphore(self.config.max_concurrency)
+            )
+        return slots
+
+    def _comparer(self, method: str, device: str | None = None) -> Fingerprinter:
+        """按 (方法, 设备) 复用比对用的指纹器实例, 省去重复的注册表查找与构造.
+
+        device 为 None 表示该方法不区分设备, 以无参方式构造。
+        """
+        key = (method, device)
+        comparer = self._comparers.get(key)
+        if comparer is None:
+            kwargs = {} if device is None else {"device": device}
+            comparer = self._comparers.setdefault(key, get_fingerprinter(method, **kwargs))
+        return comparer
+
+    def fingerprint_batch(
+        self, models: list[str], method: str = "llmmap", **kwargs
+    ) -> list[Fingerprint]:
+        """批量提取指纹, 返回顺序与 models 一致.
+
+        先一次性并发读取全部缓存, 再对未命中的模型并发调用 fingerprint()。
+        """
+        provider = kwargs.get("provider", self.config.provider)
+        unique = list(dict.fromkeys(models))
+        found: dict[str, Fingerprint] = {}
+        if self.cache:
+            hits = self.cache.get_many([(m, method, provider) for m in unique])
+            found = {req[0]: fp for req, fp in hits.items() if fp is not None}
+
+        misses = [m for m in unique if m not in found]
+        if misses:
+            workers = min(len(misses), self.config.max_concurrency)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                fps = ex.map(lambda m: self.fingerprint(m, method, **kwargs), misses)
+                found.update(zip(misses, fps, strict=True))
+        return [found[m] for m in models]
+
+    def _fingerprint_pair(
+        self,
+        a: tuple[str, dict[str, Any]],
+        b: tuple[str, dict[str, Any]],
+    ) -> tuple[Fingerprint, Fingerprint]:
+        """并发提取两个模型的指纹, 两侧 API 调用的网络等待相互重叠.
+
+        用线程而非 asyncio.run, 这样在已有事件循环中 (如 MCP server) 同步调用也安全。
+        """
+        if a == b:
+            fp = self.fingerprint(a[0], **a[1])
+            return fp, fp
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            fut_a = ex.submit(self.fingerprint, a[0], **a[1])
+            fut_b = ex.submit(self.fingerprint, b[0], **b[1])
+            return fut_a.result(), fut_b.result()
+
     def compare(
         self,
         model_a: str,
@@ -98,11 +191,16 @@ class AuditEngine:
             model_b: 模型 B 名称
             method: 使用的指纹方法
         """
-        fp_a = self.fingerprint(model_a, method=method, **kwargs)
-        fp_b = self.fingerprint(model_b, method=method, **kwargs)
+        fp_a, fp_b = self._fingerprint_pair(
+            (model_a, {"method": method, **kwargs}),
+            (model_b, {"method": method, **kwargs}),
+        )
 
-        fingerprinter = get_fingerprinter(method)
-        return fingerprinter.compare(fp_a, fp_b)
+        # 白盒方法的 CKA 在指定设备上计算, 与提取指纹用同一 device
+        builder = _METHOD_KWARGS.get(method)
+        provider = kwargs.get("provider", self.config.provider)
+        device = builder(self.config, kwargs, provider).get("device") if builder else None
+        return self._comparer(method, device).compare(fp_a, fp_b)
 
     def verify(self, model: str, **kwargs) -> dict[str, Any]:
         """验证模型身份 — 检查 API 背后是不是声称的模型.
@@ -115,36 +213,24 @@ class AuditEngine:
         fp = self.fingerprint(model, method="llmmap", **kwargs)
 
         # 分析指纹中的风格标记
-        from modelaudit.methods.style import _compute_style_scores
-
-        responses = fp.data.get("raw_responses", [])
-        if not responses:
+        if not fp.data.get("raw_responses"):
             return {
                 "model": model,
                 "verified": False,
                 "reason": "无法获取模型响应",
             }
 
-        combined_text = "\n".join(responses)
-        scores = _compute_style_scores(combined_text)
+        scores = _combined_style_scores(fp)
 
-        # 找到最匹配的模型家族
-        if scores:
-            best_match = max(scores, key=lambda k: scores[k])
-            best_score = scores[best_match]
-        else:
-            best_match = "unknown"
-            best_score = 0.0
+        # 按分数降序排一次, 首项即最匹配的模型家族 (稳定排序, 并列时取先出现者)
+        ranked = sorted(scores.items(), key=itemgetter(1), reverse=True)
+        best_match, best_score = ranked[0] if ranked else ("unknown", 0.0)
 
         # 检查声称的模型是否匹配
-        model_lower = model.lower()
-        claimed_family = None
-        for family in scores:
-            if family in model_lower:
-                claimed_family = family
-                break
-
-        if claimed_family:
+        from modelaudit.methods.style import _claimed_family
+
+        claimed_family = _claimed_family(model)
+        if claimed_family in scores:
             claimed_score = scores.get(claimed_family, 0.0)
             is_match = claimed_family == best_match
         else:
@@ -158,19 +244,73 @@ class AuditEngine:
             "best_match": best_match,
             "claimed_score": round(claimed_score, 4),
             "best_score": round(best_score, 4),
-            "all_scores": {k: round(v, 4) for k, v in sorted(scores.items(), key=lambda x: -x[1])},
+            "all_scores": {k: round(v, 4) for k, v in ranked},
             "fingerprint": fp,
         }
 
-    def detect(self, texts: list[str]) -> list[DetectionResult]:
+    def detect(self, texts: list[str], use_cache: bool = False) -> list[DetectionResult]:
         """检测文本来源 — 判断文本是哪个模型生成的.
 
         Args:
             texts: 待检测的文本列表
+            use_cache: 按文本内容 hash 复用缓存的检测结果 (需启用引擎缓存)
         """
         from modelaudit.methods.style import detect_text_source
 
-        return detect_text_source(texts)
+        if not (use_cache and self.cache):
+            return detect_text_source(texts)
+
+        namespace = f"style@{__version__}"
+        keys = [self.cache.detection_key(t, namespace) for t in texts]
+        results = self.cache.get_detections(keys)
+        missing = [i for i, r in enumerate(results) if r is None]
+        logger.debug("检测缓存: 命中 %d / %d", len(texts) - len(missing), len(texts))
+
+        if missing:
+            fresh = detect_text_source([texts[i] for i in missing])
+            self.cache.put_detections([(keys[i], r) for i, r in zip(missing, fresh, strict=True)])
+            for i, r in zip(missing, fresh, strict=True):
+                results[i] = r
+
+        output = [r for r in results if r is not None]
+        for i, r in enumerate(output):
+            r.text_id = i
+        return output
+
+    def detect_batched(
+        self,
+        texts: list[str],
+        batch_size: int = 50,
+        use_cache: bool = False,
+        on_batch: Callable[[int], object] | None = None,
+    ) -> list[DetectionResult]:
+        """分批检测, 每批完成后回调 on_batch(文本数) 供调用方推进进度条.
+
+        检测是纯 Python 的 CPU 计算, 受 GIL 限制, 多线程并发批次不会更快, 故逐批顺序执行;
+        结果顺序与 text_id 与 detect() 一致。
+        on_batch 按约 1% 的粒度合并回调 (最后一次必定回调), 避免进度条逐批重绘。
+
+        Args:
+            texts: 待检测的文本列表
+            batch_size: 每批文本数
+            use_cache: 同 detect()
+            on_batch: 进度回调, 参数为自上次回调以来完成的文本数
+        """
+        results: list[DetectionResult] = []
+        step = max(batch_size, len(texts) // 100)
+        pending = 0
+        for offset in range(0, len(texts), batch_size):
+            batch_results = self.detect(texts[offset : offset + batch_size], use_cache)
+            for r in batch_results:
+                r.text_id = len(results)
+                results.append(r)
+            pending += len(batch_results)
+            if on_batch is not None and pending >= step:
+                on_batch(pending)
+                pending = 0
+        if on_batch is not None and pending:
+            on_batch(pending)
+        return results
 
     def audit(
         self,
@@ -211,37 +351,35 @@ class AuditEngine:
 
         num_probes = kwargs.get("num_probes", self.config.num_probes)
 
-        # ── 1. 分别提取指纹 ──
-        fp_teacher = self.fingerprint(
-            teacher, method="llmmap",
-            provider=t_provider, api_key=t_api_key, api_base=t_api_base,
-            num_probes=num_probes,
-        )
-        fp_student = self.fingerprint(
-            student, method="llmmap",
-            provider=s_provider, api_key=s_api_key, api_base=s_api_base,
-            num_probes=num_probes,
+        # ── 1. 并发提取两侧指纹 ──
+        fp_teacher, fp_student = self._fingerprint_pair(
+            (teacher, {
+                "method": "llmmap",
+                "provider": t_provider, "api_key": t_api_key, "api_base": t_api_base,
+                "num_probes": num_probes,
+            }),
+            (student, {
+                "method": "llmmap",
+                "provider": s_provider, "api_key": s_api_key, "api_base": s_api_base,
+                "num_probes": num_probes,
+            }),
         )
 
         # ── 2. 指纹比对 ──
-        fingerprinter = get_fingerprinter("llmmap")
-        comparison = fingerprinter.compare(fp_teacher, fp_student)
+        comparison = self._comparer("llmmap").compare(fp_teacher, fp_student)
         comparisons: list[ComparisonResult] = [comparison]
 
         # ── 2b. DLI 行为签名比对 (复用 LLMmap 已收集的响应) ──
         skipped: list[str] = []
         try:
-            from modelaudit.methods.dli import (
-                _compute_behavior_similarity,
-                _extract_behavior_signature,
-            )
+            from modelaudit.methods.dli import _compute_behavior_similarity
 
             teacher_responses = fp_teacher.data.get("raw_responses", [])
             student_responses = fp_student.data.get("raw_responses", [])
 
             if teacher_responses and student_responses:
-                sig_teacher = _extract_behavior_signature(teacher_responses)
-                sig_student = _extract_behavior_signature(student_responses)
+                sig_teacher = _behavior_signature(fp_teacher)
+                sig_student = _behavior_signature(fp_student)
                 dli_similarity = _compute_behavior_similarity(sig_teacher, sig_student)
                 dli_threshold = 0.80
 
@@ -265,24 +403,18 @@ class AuditEngine:
             logger.debug("DLI 比对跳过: %s", exc)
 
         # ── 3. 逐条探测的风格分析 ──
-        from modelaudit.methods.style import _compute_style_scores
         from modelaudit.probes import get_probes
 
         probes = get_probes(count=num_probes)
-        teacher_responses = fp_teacher.data.get("raw_responses", [])
-        student_responses = fp_student.data.get("raw_responses", [])
+        # 每条响应的最佳风格只算一次, 缺失的响应记为 unknown
+        n = len(probes)
+        t_styles = [_best_style(sc) for sc in _response_style_scores(fp_teacher)[:n]]
+        s_styles = [_best_style(sc) for sc in _response_style_scores(fp_student)[:n]]
+        t_styles += ["unknown"] * (n - len(t_styles))
+        s_styles += ["unknown"] * (n - len(s_styles))
 
         probe_details: list[dict[str, Any]] = []
-        for i, probe in enumerate(probes):
-            t_response = teacher_responses[i] if i < len(teacher_responses) else ""
-            s_response = student_responses[i] if i < len(student_responses) else ""
-
-            t_scores = _compute_style_scores(t_response) if t_response else {}
-            s_scores = _compute_style_scores(s_response) if s_response else {}
-
-            t_best = max(t_scores, key=lambda k: t_scores[k]) if t_scores else "unknown"
-            s_best = max(s_scores, key=lambda k: s_scores[k]) if s_scores else "unknown"
-
+        for probe, t_best, s_best in zip(probes, t_styles, s_styles, strict=True):
             probe_details.append({
                 "probe_id": probe.id,
                 "category": probe.category,
@@ -292,9 +424,16 @@ class AuditEngine:
             })
 
         # ── 4. 综合判定 ──
-        avg_similarity = sum(c.similarity for c in comparisons) / len(comparisons)
-        derived_votes = sum(1 for c in comparisons if c.is_derived)
+        # 一次遍历同时累计相似度、蒸馏票数与摘要行
+        sim_sum = 0.0
+        derived_votes = 0
+        method_lines: list[str] = []
+        for c in comparisons:
+            sim_sum += c.similarity
+            derived_votes += c.is_derived
+            method_lines.append(f"  [{c.method}] 相似度: {c.similarity:.4f} (阈值: {c.threshold})")
         total_votes = len(comparisons)
+        avg_similarity = sim_sum / total_votes
 
         if derived_votes > total_votes / 2:
             verdict = "likely_derived"
@@ -332,7 +471,7 @@ class AuditEngine:
             comparisons=comparisons,
             verdict=verdict,
             confidence=round(confidence, 4),
-            summary=self._generate_summary(teacher, student, verdict, comparisons),
+            summary=self._generate_summary(teacher, student, verdict, method_lines),
             details=details,
         )
 
@@ -341,9 +480,9 @@ class AuditEngine:
         teacher: str,
         student: str,
         verdict: str,
-        comparisons: list[ComparisonResult],
+        method_lines: list[str],
     ) -> str:
-        """生成审计摘要."""
+        """生成审计摘要. method_lines 为各方法的比对结果行, 由 audit() 在汇总时一并生成."""
         verdict_text = {
             "likely_derived": "可能存在蒸馏关系",
             "independent": "两个模型独立",
@@ -353,9 +492,87 @@ class AuditEngine:
         lines = [
             f"审计对象: {teacher} vs {student}",
             f"判定结果: {verdict_text.get(verdict, verdict)}",
+            *method_lines,
         ]
+        return "\n".join(lines)
 
-        for c in comparisons:
-            lines.append(f"  [{c.method}] 相似度: {c.similarity:.4f} (阈值: {c.threshold})")
 
-        return "\n".join(lines)
+def _api_kwargs(
+    config: AuditConfig, kwargs: dict[str, Any], provider: str, num_probes: int
+) -> dict[str, Any]:
+    """黑盒 API 方法的公共构造参数 (调用方 kwargs 优先于 config)."""
+    return {
+        "provider": provider,
+        "api_key": kwargs.get("api_key", config.api_key),
+        "api_base": kwargs.get("api_base", config.api_base),
+        "num_probes": kwargs.get("num_probes", num_probes),
+        "api_timeout": kwargs.get("api_timeout", config.api_timeout),
+        "max_retries": kwargs.get("max_retries", config.api_max_retries),
+        "max_concurrency": kwargs.get("max_concurrency", config.max_concurrency),
+    }
+
+
+def _llmmap_kwargs(config: AuditConfig, kwargs: dict[str, Any], provider: str) -> dict[str, Any]:
+    return _api_kwargs(config, kwargs, provider, config.num_probes)
+
+
+def _dli_kwargs(config: AuditConfig, kwargs: dict[str, Any], provider: str) -> dict[str, Any]:
+    return _api_kwargs(config, kwargs, provider, 8)
+
+
+def _reef_kwargs(config: AuditConfig, kwargs: dict[str, Any], provider: str) -> dict[str, Any]:
+    return {"device": kwargs.get("device", "cpu")}
+
+
+# method -> 指纹器构造参数; 未登记的方法 (第三方注册) 以无参方式构造
+_METHOD_KWARGS: dict[str, Callable[[AuditConfig, dict[str, Any], str], dict[str, Any]]] = {
+    "llmmap": _llmmap_kwargs,
+    "dli": _dli_kwargs,
+    "reef": _reef_kwargs,
+}
+# 需调用远端 API、共享端点限速与并发名额的方法
+_API_METHODS = frozenset({"llmmap", "dli"})
+
+
+def _best_style(scores: dict[str, float]) -> str:
+    """得分最高的风格; 并列时取先出现者, 无分数时为 unknown."""
+    return max(scores, key=scores.__getitem__) if scores else "unknown"
+
+
+def _derived_current(fp: Fingerprint) -> bool:
+    """指纹里预先算好的派生数据是否由当前版本写入 (评分逻辑可能随版本变化)."""
+    return fp.data.get("derived_version") == __version__
+
+
+def _response_style_scores(fp: Fingerprint) -> list[dict[str, float]]:
+    """逐条响应的风格分数. 优先用指纹里预先算好的, 旧缓存指纹没有或版本不符时现算."""
+    responses = fp.data.get("raw_responses", [])
+    cached = fp.data.get("style_scores")
+    if _derived_current(fp) and isinstance(cached, list) and len(cached) == len(responses):
+        return cached
+
+    from modelaudit.methods.style import _compute_style_scores
+
+    return [_compute_style_scores(r) if r else {} for r in responses]
+
+
+def _combined_style_scores(fp: Fingerprint) -> dict[str, float]:
+    """全部响应拼接后的整体风格分数. 优先用指纹里预先算好的, 旧缓存指纹没有或版本不符时现算."""
+    cached = fp.data.get("combined_style_scores")
+    if _derived_current(fp) and isinstance(cached, dict) and cached:
+        return dict(cached)
+
+    from modelaudit.methods.style import _compute_style_scores
+
+    return _compute_style_scores("\n".join(fp.data.get("raw_responses", [])))
+
+
+def _behavior_signature(fp: Fingerprint) -> dict[str, Any]:
+    """DLI 行为签名. 优先用指纹里预先算好的, 旧缓存指纹没有或版本不符时现算."""
+    cached = fp.data.get("behavior_signature")
+    if _derived_current(fp) and isinstance(cached, dict) and "bigram_dist" in cached and "features" in cached:
+        return cached
+
+    from modelaudit.methods.dli import _extract_behavior_signature
+
+    return _extract_behavior_signature(fp.data.get("raw_responses", []))
@@ -1,5 +1,10 @@
 """ModelAudit MCP Server — Model Context Protocol 服务."""
 
+import asyncio
+import functools
+from collections import Counter
+from datetime import date
+from difflib import SequenceMatcher
 from typing import Any
 
 try:
@@ -11,214 +16,339 @@ try:
 except ImportError:
     HAS_MCP = False
 
-from modelaudit.config import AuditConfig
+try:
+    from rapidfuzz.fuzz import ratio as _fuzz_ratio
+except ImportError:
+    _fuzz_ratio = None
+
+from modelaudit.config import DEFAULT_CONFIG, AuditConfig
 from modelaudit.engine import AuditEngine
 from modelaudit.report import generate_report
 
-
-def create_server() -> "Server":
-    """创建 MCP 服务器实例."""
-    if not HAS_MCP:
-        raise ImportError("MCP 未安装。请运行: pip install knowlyr-modelaudit[mcp]")
-
-    server = Server("modelaudit")
-
-    @server.list_tools()
-    async def list_tools() -> list[Tool]:
-        """列出可用的工具."""
-        return [
-            Tool(
-                name="detect_text_source",
-                description="检测文本数据来源 — 判断文本可能由哪个 LLM 生成",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "texts": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "待检测的文本列表",
-                        },
+# 记忆检测同时在途的 API 调用上限, 避免样本多时触发限流
+_MEMORIZATION_CONCURRENCY = 8
+
+
+@functools.cache
+def _has_api_client() -> bool:
+    """LLM 调用模块是否可用. 结果缓存, 后续调用不再走 import 与异常处理."""
+    try:
+        from modelaudit.methods.llmmap import _call_model_api_once  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _text_similarity(a: str, b: str) -> float:
+    """文本相似度 [0, 1].
+
+    有 rapidfuzz 时用其 C++ 实现 (精确 LCS 的 Indel 归一化, 比 SequenceMatcher 的
+    分块匹配近似值略高, 阈值判定基本不受影响), 否则回退到 difflib。
+    """
+    if _fuzz_ratio is not None:
+        return _fuzz_ratio(a, b) / 100.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _prefix_completion_score(model: str, sample: str, provider: str) -> float:
+    """前缀续写: 取样本前半段让模型续写, 与真实后半段的相似度."""
+    from modelaudit.methods.llmmap import _call_model_api_once
+
+    mid = len(sample) // 2
+    prompt = f"请续写以下文本，直接输出续写部分：\n\n{sample[:mid]}"
+    completion = _call_model_api_once(model, prompt, provider=provider)
+    return _text_similarity(sample[mid:].strip(), completion.strip())
+
+
+def _verbatim_check_score(model: str, sample: str, provider: str) -> float:
+    """逐字复现: 让模型复述样本, 统计原文短语在响应中出现的比例."""
+    from modelaudit.methods.llmmap import _call_model_api_once
+
+    prompt = f"请用你自己的话复述以下文本的关键信息：\n\n{sample[:200]}"
+    response = _call_model_api_once(model, prompt, provider=provider)
+    if not response.strip():
+        return 0.0
+    words = sample.split()
+    phrase_len = min(8, len(words) // 4) or 3
+    # 按不重叠窗口切出原文短语, 一次推导式生成
+    phrases = [
+        " ".join(words[j:j + phrase_len])
+        for j in range(0, len(words) - phrase_len + 1, phrase_len)
+    ]
+    if not phrases:
+        return 0.0
+    # 用子串匹配而非响应分词后的 n-gram 集合: 短语紧贴标点或换行时也应计为命中
+    return sum(phrase in response for phrase in phrases) / len(phrases)
+
+
+async def _memorization_results(
+    text_samples: list[str],
+    model: str,
+    provider: str,
+    method: str,
+    concurrency: int = _MEMORIZATION_CONCURRENCY,
+) -> list[dict[str, Any]]:
+    """并发执行各样本的记忆检测, 结果顺序与 (样本, 方法) 的提交顺序一致.
+
+    API 调用是阻塞的, 放到工作线程执行, 事件循环在等待期间仍可响应其他请求。
+    """
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _run(index: int, kind: str, score_fn, sample: str) -> dict[str, Any]:
+        async with sem:
+            score = await asyncio.to_thread(score_fn, model, sample, provider)
+        return {"index": index, "method": kind, "score": round(score, 4)}
+
+    tasks = []
+    for i, sample in enumerate(text_samples):
+        if method in ("prefix_completion", "both"):
+            tasks.append(_run(i + 1, "prefix_completion", _prefix_completion_score, sample))
+        if method in ("verbatim_check", "both"):
+            tasks.append(_run(i + 1, "verbatim_check", _verbatim_check_score, sample))
+    return list(await asyncio.gather(*tasks))
+
+
+# audit_report 的章节顺序: (工具名, 章节标题)
+_REPORT_SECTIONS: tuple[tuple[str, str], ...] = (
+    ("detect_text_source", "文本来源检测"),
+    ("verify_model", "模型身份验证"),
+    ("audit_distillation", "蒸馏分析"),
+    ("compare_models", "模型指纹比对"),
+    ("audit_memorization", "记忆检测"),
+)
+
+
+def _build_audit_report(results: dict[str, str], model_name: str, audit_date: str) -> str:
+    """按固定章节顺序汇总各工具结果, 未执行的检查给出占位说明."""
+    lines = [f"# 模型审计报告：{model_name}", "", f"**审计日期**: {audit_date}", ""]
+    for key, title in _REPORT_SECTIONS:
+        lines.extend((f"## {title}", "", results.get(key, "*未执行此项检查。*"), ""))
+    return "\n".join(lines)
+
+
+@functools.cache
+def _tool_definitions() -> tuple["Tool", ...]:
+    """工具定义. 内容固定, 首次调用时构造一次后复用."""
+    return (
+        Tool(
+            name="detect_text_source",
+            description="检测文本数据来源 — 判断文本可能由哪个 LLM 生成",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "texts": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "待检测的文本列表",
                     },
-                    "required": ["texts"],
                 },
-            ),
-            Tool(
-                name="verify_model",
-                description="验证模型身份 — 检查 API 背后是不是声称的模型",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "model": {
-                            "type": "string",
-                            "description": "模型名称 (如 gpt-4o, claude-3-opus)",
-                        },
-                        "provider": {
-                            "type": "string",
-                            "enum": ["openai", "anthropic", "custom"],
-                            "description": "API 提供商 (默认: openai)",
-                        },
+                "required": ["texts"],
+            },
+        ),
+        Tool(
+            name="verify_model",
+            description="验证模型身份 — 检查 API 背后是不是声称的模型",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "model": {
+                        "type": "string",
+                        "description": "模型名称 (如 gpt-4o, claude-3-opus)",
+                    },
+                    "provider": {
+                        "type": "string",
+                        "enum": ["openai", "anthropic", "custom"],
+                        "description": "API 提供商 (默认: openai)",
                     },
-                    "required": ["model"],
                 },
-            ),
-            Tool(
-                name="compare_models",
-                description="比对两个模型的指纹相似度，判断是否存在蒸馏/派生关系",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "model_a": {"type": "string", "description": "模型 A 名称"},
-                        "model_b": {"type": "string", "description": "模型 B 名称"},
-                        "provider": {
-                            "type": "string",
-                            "description": "API 提供商 (默认: openai)",
-                        },
-                        "method": {
-                            "type": "string",
-                            "enum": ["llmmap", "dli", "style"],
-                            "description": "指纹方法 (默认: llmmap)",
-                        },
+                "required": ["model"],
+            },
+        ),
+        Tool(
+            name="compare_models",
+            description="比对两个模型的指纹相似度，判断是否存在蒸馏/派生关系",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "model_a": {"type": "string", "description": "模型 A 名称"},
+                    "model_b": {"type": "string", "description": "模型 B 名称"},
+                    "provider": {
+                        "type": "string",
+                        "description": "API 提供商 (默认: openai)",
+                    },
+                    "method": {
+                        "type": "string",
+                        "enum": ["llmmap", "dli", "style"],
+                        "description": "指纹方法 (默认: llmmap)",
                     },
-                    "required": ["model_a", "model_b"],
                 },
-            ),
-            Tool(
-                name="compare_models_whitebox",
-                description="白盒比对两个本地模型 — 使用 REEF CKA 方法比较模型隐藏状态相似度（需要模型权重）",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "model_a": {
-                            "type": "string",
-                            "description": "本地模型路径或 HuggingFace 模型名 A",
-                        },
-                        "model_b": {
-                            "type": "string",
-                            "description": "本地模型路径或 HuggingFace 模型名 B",
-                        },
-                        "device": {
-                            "type": "string",
-                            "description": "计算设备 (默认: cpu)",
-                        },
+                "required": ["model_a", "model_b"],
+            },
+        ),
+        Tool(
+            name="compare_models_whitebox",
+            description="白盒比对两个本地模型 — 使用 REEF CKA 方法比较模型隐藏状态相似度（需要模型权重）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "model_a": {
+                        "type": "string",
+                        "description": "本地模型路径或 HuggingFace 模型名 A",
+                    },
+                    "model_b": {
+                        "type": "string",
+                        "description": "本地模型路径或 HuggingFace 模型名 B",
+                    },
+                    "device": {
+                        "type": "string",
+                        "description": "计算设备 (默认: cpu)",
                     },
-                    "required": ["model_a", "model_b"],
                 },
+                "required": ["model_a", "model_b"],
+            },
+        ),
+        Tool(
+            name="audit_distillation",
+            description=(
+                "完整蒸馏审计 — 综合指纹比对 + 风格分析，生成详细审计报告。"
+                "支持跨 provider 审计（如 Kimi API + Claude API）。"
             ),
-            Tool(
-                name="audit_distillation",
-                description=(
-                    "完整蒸馏审计 — 综合指纹比对 + 风格分析，生成详细审计报告。"
-                    "支持跨 provider 审计（如 Kimi API + Claude API）。"
-                ),
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "teacher": {
-                            "type": "string",
-                            "description": "教师模型 (疑似被蒸馏的源模型)",
-                        },
-                        "student": {
-                            "type": "string",
-                            "description": "学生模型 (疑似蒸馏产物)",
-                        },
-                        "teacher_provider": {
-                            "type": "string",
-                            "description": "教师模型 API 提供商 (默认: openai)",
-                        },
-                        "student_provider": {
-                            "type": "string",
-                            "description": "学生模型 API 提供商 (默认: openai)",
-                        },
-                        "teacher_api_base": {
-                            "type": "string",
-                            "description": "教师模型自定义 API 地址",
-                        },
-                        "student_api_base": {
-                            "type": "string",
-                            "description": "学生模型自定义 API 地址",
-                        },
-                        "format": {
-                            "type": "string",
-                            "enum": ["markdown", "json"],
-                            "description": "报告格式 (默认: markdown)",
-                        },
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "teacher": {
+                        "type": "string",
+                        "description": "教师模型 (疑似被蒸馏的源模型)",
+                    },
+                    "student": {
+                        "type": "string",
+                        "description": "学生模型 (疑似蒸馏产物)",
+                    },
+                    "teacher_provider": {
+                        "type": "string",
+                        "description": "教师模型 API 提供商 (默认: openai)",
+                    },
+                    "student_provider": {
+                        "type": "string",
+                        "description": "学生模型 API 提供商 (默认: openai)",
+                    },
+                    "teacher_api_base": {
+                        "type": "string",
+                        "description": "教师模型自定义 API 地址",
+                    },
+                    "student_api_base": {
+                        "type": "string",
+                        "description": "学生模型自定义 API 地址",
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["markdown", "json"],
+                        "description": "报告格式 (默认: markdown)",
                     },
-                    "required": ["teacher", "student"],
                 },
-            ),
-            Tool(
-                name="audit_memorization",
-                description="检测模型是否记忆了训练数据 — 通过前缀补全和逐字检查评估记忆程度",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "text_samples": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "候选训练文本列表",
-                        },
-                        "model": {
-                            "type": "string",
-                            "description": "待测模型名称 (默认: gpt-4o)",
-                        },
-                        "provider": {
-                            "type": "string",
-                            "enum": ["openai", "anthropic"],
-                            "description": "API 提供商 (默认: openai)",
-                        },
-                        "method": {
-                            "type": "string",
-                            "enum": ["prefix_completion", "verbatim_check", "both"],
-                            "description": "检测方法 (默认: prefix_completion)",
-                        },
+                "required": ["teacher", "student"],
+            },
+        ),
+        Tool(
+            name="audit_memorization",
+            description="检测模型是否记忆了训练数据 — 通过前缀补全和逐字检查评估记忆程度",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "text_samples": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "候选训练文本列表",
+                    },
+                    "model": {
+                        "type": "string",
+                        "description": "待测模型名称 (默认: gpt-4o)",
+                    },
+                    "provider": {
+                        "type": "string",
+                        "enum": ["openai", "anthropic"],
+                        "description": "API 提供商 (默认: openai)",
+                    },
+                    "method": {
+                        "type": "string",
+                        "enum": ["prefix_completion", "verbatim_check", "both"],
+                        "description": "检测方法 (默认: prefix_completion)",
                     },
-                    "required": ["text_samples"],
                 },
-            ),
-            Tool(
-                name="audit_report",
-                description="生成完整的模型审计报告 — 汇总所有审计工具的结果",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "results": {
-                            "type": "object",
-                            "description": "各审计工具的结果字典 (tool_name -> result_text)",
-                        },
-                        "model_name": {
-                            "type": "string",
-                            "description": "被审计模型名称",
-                        },
-                        "audit_date": {
-                            "type": "string",
-                            "description": "审计日期 (默认: 今天)",
-                        },
+                "required": ["text_samples"],
+            },
+        ),
+        Tool(
+            name="audit_report",
+            description="生成完整的模型审计报告 — 汇总所有审计工具的结果",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "object",
+                        "description": "各审计工具的结果字典 (tool_name -> result_text)",
+                    },
+                    "model_name": {
+                        "type": "string",
+                        "description": "被审计模型名称",
+                    },
+                    "audit_date": {
+                        "type": "string",
+                        "description": "审计日期 (默认: 今天)",
                     },
-                    "required": ["results", "model_name"],
                 },
-            ),
-            Tool(
-                name="audit_watermark",
-                description="检测文本中是否包含 AI 水印（统计特征和模式匹配）",
-                inputSchema={
-                    "type": "object",
-                    "properties": {
-                        "texts": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "待检测的文本列表",
-                        },
-                        "method": {
-                            "type": "string",
-                            "enum": ["statistical", "pattern", "both"],
-                            "description": "检测方法（默认 both）",
-                            "default": "both",
-                        },
+                "required": ["results", "model_name"],
+            },
+        ),
+        Tool(
+            name="audit_watermark",
+            description="检测文本中是否包含 AI 水印（统计特征和模式匹配）",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "texts": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "待检测的文本列表",
+                    },
+                    "method": {
+                        "type": "string",
+                        "enum": ["statistical", "pattern", "both"],
+                        "description": "检测方法（默认 both）",
+                        "default": "both",
                     },
-                    "required": ["texts"],
                 },
-            ),
-        ]
+                "required": ["texts"],
+            },
+        ),
+    )
+
+
+def create_server() -> "Server":
+    """创建 MCP 服务器实例."""
+    if not HAS_MCP:
+        raise ImportError("MCP 未安装。请运行: pip install knowlyr-modelaudit[mcp]")
+
+    server = Server("modelaudit")
+
+    # (provider, use_cache) -> 引擎; 跨调用复用指纹内存缓存、端点限速器与并发名额
+    engines: dict[tuple[str, bool], AuditEngine] = {}
+
+    def get_engine(provider: str = DEFAULT_CONFIG.provider, use_cache: bool = True) -> AuditEngine:
+        key = (provider, use_cache)
+        engine = engines.get(key)
+        if engine is None:
+            config = (
+                DEFAULT_CONFIG if provider == DEFAULT_CONFIG.provider
+                else AuditConfig(provider=provider)
+            )
+            engine = engines.setdefault(key, AuditEngine(config, use_cache=use_cache))
+        return engine
+
+    @server.list_tools()
+    async def list_tools() -> list[Tool]:
+        """列出可用的工具."""
+        return list(_tool_definitions())
 
     @server.call_tool()
     async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
@@ -226,7 +356,7 @@ def create_server() -> "Server":
 
         if name == "detect_text_source":
             texts = arguments["texts"]
-            engine = AuditEngine()
+            engine = get_engine()
             results = engine.detect(texts)
 
             lines = ["## 文本来源检测结果", ""]
@@ -239,12 +369,10 @@ def create_server() -> "Server":
                 )
 
             # 统计
-            model_counts: dict[str, int] = {}
-            for r in results:
-                model_counts[r.predicted_model] = model_counts.get(r.predicted_model, 0) + 1
+            model_counts = Counter(r.predicted_model for r in results)
 
             lines.extend(["", "### 来源分布"])
-            for model, count in sorted(model_counts.items(), key=lambda x: -x[1]):
+            for model, count in model_counts.most_common():
                 pct = count / len(results) * 100
                 lines.append(f"- {model}: {count} ({pct:.1f}%)")
 
@@ -254,8 +382,7 @@ def create_server() -> "Server":
             model = arguments["model"]
             provider = arguments.get("provider", "openai")
 
-            config = AuditConfig(provider=provider)
-            engine = AuditEngine(config)
+            engine = get_engine(provider)
             result = engine.verify(model, provider=provider)
 
             verified = result["verified"]
@@ -270,8 +397,9 @@ def create_server() -> "Server":
 
 ### 风格匹配分数
 """
-            for name_k, score in result.get("all_scores", {}).items():
-                text += f"- {name_k}: {score:.4f}\n"
+            text += "".join(
+                f"- {name_k}: {score:.4f}\n" for name_k, score in result.get("all_scores", {}).items()
+            )
 
             return [TextContent(type="text", text=text)]
 
@@ -281,8 +409,7 @@ def create_server() -> "Server":
             provider = arguments.get("provider", "openai")
             method = arguments.get("method", "llmmap")
 
-            config = AuditConfig(provider=provider)
-            engine = AuditEngine(config)
+            engine = get_engine(provider)
             result = engine.compare(model_a, model_b, method=method, provider=provider)
 
             derived_text = "可能存在派生关系" if result.is_derived else "可能是独立模型"
@@ -305,7 +432,7 @@ def create_server() -> "Server":
             model_b = arguments["model_b"]
             device = arguments.get("device", "cpu")
 
-            engine = AuditEngine(use_cache=False)
+            engine = get_engine(use_cache=False)
             result = engine.compare(
                 model_a, model_b, method="reef", device=device,
             )
@@ -324,9 +451,9 @@ def create_server() -> "Server":
 - 置信度: {result.confidence:.4f}
 """
             if "layer_cka" in result.details:
-                text += "\n### 逐层 CKA 相似度\n"
-                for layer, cka in result.details["layer_cka"].items():
-                    text += f"- {layer}: {cka:.4f}\n"
+                text += "\n### 逐层 CKA 相似度\n" + "".join(
+                    f"- {layer}: {cka:.4f}\n" for layer, cka in result.details["layer_cka"].items()
+                )
 
             return [TextContent(type="text", text=text)]
 
@@ -335,8 +462,7 @@ def create_server() -> "Server":
             student = arguments["student"]
             output_format = arguments.get("format", "markdown")
 
-            config = AuditConfig()
-            engine = AuditEngine(config)
+            engine = get_engine()
             result = engine.audit(
                 teacher, student,
                 teacher_provider=arguments.get("teacher_provider"),
@@ -351,20 +477,12 @@ def create_server() -> "Server":
             return [TextContent(type="text", text=report)]
 
         elif name == "audit_memorization":
-            from difflib import SequenceMatcher
             text_samples = arguments["text_samples"]
             model = arguments.get("model", "gpt-4o")
             provider = arguments.get("provider", "openai")
             method = arguments.get("method", "prefix_completion")
 
-            # Try to call model API
-            try:
-                from modelaudit.methods.llmmap import _call_model_api_once
-                has_client = True
-            except ImportError:
-                has_client = False
-
-            if not has_client:
+            if not _has_api_client():
                 lines = ["## 记忆检测 — 交互模式", "", "未找到 LLM 客户端库，以下是供手动执行的提示：", ""]
                 for i, sample in enumerate(text_samples):
                     mid = len(sample) // 2
@@ -372,29 +490,7 @@ def create_server() -> "Server":
                     lines.append(f"```\n请续写以下文本：\n\n{sample[:mid]}\n```\n")
                 return [TextContent(type="text", text="\n".join(lines))]
 
-            results = []
-            for i, sample in enumerate(text_samples):
-                mid = len(sample) // 2
-                prefix = sample[:mid]
-                suffix = sample[mid:]
-                if method in ("prefix_completion", "both"):
-                    prompt = f"请续写以下文本，直接输出续写部分：\n\n{prefix}"
-                    completion = _call_model_api_once(model, prompt, provider=provider)
-                    score = SequenceMatcher(None, suffix.strip(), completion.strip()).ratio()
-                    results.append({"index": i + 1, "method": "prefix_completion", "score": round(score, 4)})
-                if method in ("verbatim_check", "both"):
-                    prompt = f"请用你自己的话复述以下文本的关键信息：\n\n{sample[:200]}"
-                    response = _call_model_api_once(model, prompt, provider=provider)
-                    words = sample.split()
-                    phrase_len = min(8, len(words) // 4) or 3
-                    matches = total = 0
-                    for j in range(0, len(words) - phrase_len + 1, phrase_len):
-                        phrase = " ".join(words[j:j + phrase_len])
-                        total += 1
-                        if phrase in response:
-                            matches += 1
-                    score = matches / total if total else 0
-                    results.append({"index": i + 1, "method": "verbatim_check", "score": round(score, 4)})
+            results = await _memorization_results(text_samples, model, provider, method)
 
             lines = [f"## 训练数据记忆检测结果 ({model})", "", f"- 检测方法: {method}", f"- 样本数量: {len(text_samples)}", "",
                      "| # | 方法 | 记忆分数 | 评级 |", "|---|------|---------|------|"]
@@ -408,27 +504,11 @@ def create_server() -> "Server":
             return [TextContent(type="text", text="\n".join(lines))]
 
         elif name == "audit_report":
-            from datetime import date
             results = arguments["results"]
             model_name = arguments["model_name"]
             audit_date = arguments.get("audit_date", date.today().isoformat())
-            sections = {
-                "detect_text_source": "文本来源检测",
-                "verify_model": "模型身份验证",
-                "audit_distillation": "蒸馏分析",
-                "compare_models": "模型指纹比对",
-                "audit_memorization": "记忆检测",
-            }
-            lines = [f"# 模型审计报告：{model_name}", "", f"**审计日期**: {audit_date}", ""]
-            for key, title in sections.items():
-                lines.append(f"## {title}")
-                lines.append("")
-                if key in results:
-                    lines.append(results[key])
-                else:
-                    lines.append("*未执行此项检查。*")
-                lines.append("")
-            return [TextContent(type="text", text="\n".join(lines))]
+            text = _build_audit_report(results, model_name, audit_date)
+            return [TextContent(type="text", text=text)]
 
         elif name == "audit_watermark":
             texts = arguments["texts"]
@@ -507,8 +587,6 @@ async def serve():
 
 def main():
     """主入口."""
-    import asyncio
-
     asyncio.run(serve())
 
 
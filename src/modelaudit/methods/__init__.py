@@ -1,8 +1,15 @@
-"""指纹方法注册.
+"""指纹方法.
 
-导入所有方法模块以触发 @register 装饰器注册。
+各方法模块按需导入: registry 首次按名称查找时才加载对应模块并触发 @register 注册。
 """
 
-from modelaudit.methods import dli, llmmap, reef, style  # noqa: F401
+import importlib
 
 __all__ = ["dli", "llmmap", "reef", "style"]
+
+
+def __getattr__(name: str):
+    # modelaudit.methods.llmmap 等属性访问时再导入子模块
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
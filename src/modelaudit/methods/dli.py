@@ -14,47 +14,85 @@
 import logging
 import math
 import re
+import threading
 from collections import Counter
+from collections.abc import Iterator
+from itertools import chain, pairwise
 from typing import Any
 
 from modelaudit.base import BlackBoxFingerprinter
 from modelaudit.models import ComparisonResult, Fingerprint
+from modelaudit.ratelimit import RateLimiter
 from modelaudit.registry import register
 
 logger = logging.getLogger(__name__)
 
+_WORD_RE = re.compile(r"\w+")
+_HEADER_RE = re.compile(r"^#+\s", re.MULTILINE)
+_BULLET_RE = re.compile(r"^[\s]*[-*•]\s", re.MULTILINE)
+
+# 各组标记合并为一个交替正则, 一次扫描完成计数。保持子串匹配语义 (不加 \b),
+# 组内标记互不为子串, findall 的非重叠计数与逐词 str.count 之和一致
+_REFUSAL_PHRASES = (
+    "i cannot", "i can't", "i'm unable", "i apologize",
+    "i don't think i should", "i'd rather not",
+)
+_REFUSAL_RE = re.compile("|".join(map(re.escape, _REFUSAL_PHRASES)))
+_HEDGING_RE = re.compile("perhaps|maybe|might|could|possibly")
+_CERTAINTY_RE = re.compile("certainly|definitely|absolutely|clearly")
+
+
+def _iter_bigrams(text: str) -> Iterator[str]:
+    """逐个产出文本的 bigram (直接拼接相邻词, 不做切片)."""
+    return (f"{a} {b}" for a, b in pairwise(_WORD_RE.findall(text.lower())))
+
 
 def _extract_ngrams(text: str, n: int = 2) -> Counter:
     """提取文本的 n-gram 频率分布."""
-    words = re.findall(r"\w+", text.lower())
+    if n == 2:
+        return Counter(_iter_bigrams(text))
+    words = _WORD_RE.findall(text.lower())
     if len(words) < n:
         return Counter()
-    ngrams = [" ".join(words[i : i + n]) for i in range(len(words) - n + 1)]
-    return Counter(ngrams)
+    return Counter(" ".join(words[i : i + n]) for i in range(len(words) - n + 1))
+
 
+def _neg_entropy(p: dict[str, float]) -> float:
+    """归一化后分布的负熵 sum(p·log p), 只取决于单侧分布, 可随签名预先算好."""
+    p_sum = sum(p.values()) or 1
+    return sum(v / p_sum * math.log(v / p_sum) for v in p.values() if v > 0)
+
+
+def _js_divergence(
+    p: dict[str, float],
+    q: dict[str, float],
+    neg_ent_p: float | None = None,
+    neg_ent_q: float | None = None,
+) -> float:
+    """计算 Jensen-Shannon 散度 (对称 KL 散度).
 
-def _js_divergence(p: dict[str, float], q: dict[str, float]) -> float:
-    """计算 Jensen-Shannon 散度 (对称 KL 散度)."""
-    all_keys = set(p.keys()) | set(q.keys())
+    JS = (sum p·log p + sum q·log q) / 2 - sum m·log m, M = (P + Q) / 2。
+    两侧负熵可由调用方传入预计算值 (见签名中的 bigram_neg_entropy),
+    此时每个 key 只需一次 log。
+    """
+    all_keys = p.keys() | q.keys()
     if not all_keys:
         return 0.0
 
-    # 归一化
     p_sum = sum(p.values()) or 1
     q_sum = sum(q.values()) or 1
-    p_norm = {k: p.get(k, 0) / p_sum for k in all_keys}
-    q_norm = {k: q.get(k, 0) / q_sum for k in all_keys}
-
-    # M = (P + Q) / 2
-    m = {k: (p_norm[k] + q_norm[k]) / 2 for k in all_keys}
+    if neg_ent_p is None:
+        neg_ent_p = _neg_entropy(p)
+    if neg_ent_q is None:
+        neg_ent_q = _neg_entropy(q)
 
-    def _kl(a: dict[str, float], b: dict[str, float]) -> float:
-        return sum(
-            a[k] * math.log(a[k] / b[k]) if a[k] > 0 and b[k] > 0 else 0
-            for k in all_keys
-        )
-
-    return (_kl(p_norm, m) + _kl(q_norm, m)) / 2
+    cross = 0.0
+    for k in all_keys:
+        mk = (p.get(k, 0) / p_sum + q.get(k, 0) / q_sum) / 2
+        if mk > 0:
+            cross += mk * math.log(mk)
+    # 浮点抵消可能得到极小负数
+    return max((neg_ent_p + neg_ent_q) / 2 - cross, 0.0)
 
 
 def _extract_behavior_signature(responses: list[str]) -> dict[str, Any]:
@@ -62,82 +100,92 @@ def _extract_behavior_signature(responses: list[str]) -> dict[str, Any]:
     if not responses:
         return {"bigram_dist": {}, "features": {}}
 
-    # 合并所有响应的 bigram 分布
-    total_bigrams: Counter = Counter()
-    for r in responses:
-        total_bigrams.update(_extract_ngrams(r, n=2))
+    # 每条响应只分词一次, bigram 分布与词汇统计共用
+    combined = " ".join(responses).lower()
+    per_response = [_WORD_RE.findall(r.lower()) for r in responses]
+
+    # 合并所有响应的 bigram 分布: 单个 Counter 直接消费 (w1, w2) 元组流 (bigram 不跨响应边界),
+    # 只对入选 top 100 的元组拼接字符串
+    total_bigrams = Counter(chain.from_iterable(pairwise(ws) for ws in per_response))
 
     # 归一化 bigram 分布（取 top 100）
     top_bigrams = total_bigrams.most_common(100)
     total = sum(c for _, c in top_bigrams) or 1
-    bigram_dist = {ng: c / total for ng, c in top_bigrams}
+    bigram_dist = {f"{a} {b}": c / total for (a, b), c in top_bigrams}
 
     # 行为特征
     total_responses = len(responses)
-    combined = " ".join(responses).lower()
-    words = re.findall(r"\w+", combined)
-    total_words = len(words) or 1
+    total_words = sum(map(len, per_response)) or 1
 
     features = {
         # 拒绝率
         "refusal_rate": sum(
-            1 for r in responses
-            if any(p in r.lower() for p in [
-                "i cannot", "i can't", "i'm unable", "i apologize",
-                "i don't think i should", "i'd rather not",
-            ])
+            1 for r in responses if _REFUSAL_RE.search(r.lower())
         ) / total_responses,
         # 平均响应长度
         "avg_length": sum(len(r.split()) for r in responses) / total_responses,
         # 词汇多样性
-        "vocab_diversity": len(set(words)) / total_words,
+        "vocab_diversity": len(set(chain.from_iterable(per_response))) / total_words,
         # 格式偏好
         "markdown_rate": sum(
-            1 for r in responses if re.search(r"^#+\s", r, re.MULTILINE)
+            1 for r in responses if _HEADER_RE.search(r)
         ) / total_responses,
         "list_rate": sum(
-            1 for r in responses if re.search(r"^[\s]*[-*•]\s", r, re.MULTILINE)
+            1 for r in responses if _BULLET_RE.search(r)
         ) / total_responses,
         "code_block_rate": sum(
             1 for r in responses if "```" in r
         ) / total_responses,
         # 语气标记
-        "hedging_rate": sum(
-            combined.count(w) for w in ["perhaps", "maybe", "might", "could", "possibly"]
-        ) / total_words,
-        "certainty_rate": sum(
-            combined.count(w) for w in ["certainly", "definitely", "absolutely", "clearly"]
-        ) / total_words,
+        "hedging_rate": len(_HEDGING_RE.findall(combined)) / total_words,
+        "certainty_rate": len(_CERTAINTY_RE.findall(combined)) / total_words,
     }
 
-    return {"bigram_dist": bigram_dist, "features": features}
+    return {
+        "bigram_dist": bigram_dist,
+        "bigram_neg_entropy": _neg_entropy(bigram_dist),
+        "features": features,
+    }
 
 
 def _compute_behavior_similarity(sig_a: dict[str, Any], sig_b: dict[str, Any]) -> float:
     """计算两个行为签名的相似度 [0, 1]."""
+    return _behavior_similarity_parts(sig_a, sig_b)[0]
+
+
+def _behavior_similarity_parts(
+    sig_a: dict[str, Any], sig_b: dict[str, Any]
+) -> tuple[float, float]:
+    """计算行为签名相似度, 同时返回其中的 bigram JS 散度, 供 compare() 复用."""
     # 1. bigram 分布的 JS 散度 (权重 0.4)
-    js_div = _js_divergence(sig_a.get("bigram_dist", {}), sig_b.get("bigram_dist", {}))
+    js_div = _js_divergence(
+        sig_a.get("bigram_dist", {}),
+        sig_b.get("bigram_dist", {}),
+        sig_a.get("bigram_neg_entropy"),
+        sig_b.get("bigram_neg_entropy"),
+    )
     # JS 散度范围 [0, ln2]，归一化到 [0, 1] 并转换为相似度
     bigram_sim = 1.0 - min(js_div / math.log(2), 1.0)
 
     # 2. 行为特征的余弦相似度 (权重 0.6)
     feat_a = sig_a.get("features", {})
     feat_b = sig_b.get("features", {})
-    all_keys = set(feat_a.keys()) | set(feat_b.keys())
+    all_keys = feat_a.keys() | feat_b.keys()
 
     if not all_keys:
-        return bigram_sim
+        return bigram_sim, js_div
 
-    dot = sum(feat_a.get(k, 0) * feat_b.get(k, 0) for k in all_keys)
-    norm_a = sum(feat_a.get(k, 0) ** 2 for k in all_keys) ** 0.5
-    norm_b = sum(feat_b.get(k, 0) ** 2 for k in all_keys) ** 0.5
+    # 点积与两侧范数在同一次遍历中累加
+    dot = sq_a = sq_b = 0.0
+    for k in all_keys:
+        a = feat_a.get(k, 0)
+        b = feat_b.get(k, 0)
+        dot += a * b
+        sq_a += a * a
+        sq_b += b * b
 
-    if norm_a == 0 or norm_b == 0:
-        feat_sim = 0.0
-    else:
-        feat_sim = dot / (norm_a * norm_b)
-
-    return bigram_sim * 0.4 + feat_sim * 0.6
+    feat_sim = 0.0 if sq_a == 0 or sq_b == 0 else dot / (sq_a**0.5 * sq_b**0.5)
+    return bigram_sim * 0.4 + feat_sim * 0.6, js_div
 
 
 @register("dli")
@@ -148,9 +196,7 @@ class DLIFingerprinter(BlackBoxFingerprinter):
     判断是否存在蒸馏关系。不需要模型权重。
     """
 
-    @property
-    def name(self) -> str:
-        return "dli"
+    name = "dli"
 
     def __init__(
         self,
@@ -160,6 +206,10 @@ class DLIFingerprinter(BlackBoxFingerprinter):
         num_probes: int = 8,
         api_timeout: int = 60,
         max_retries: int = 3,
+        max_concurrency: int = 4,
+        rate_limiter: RateLimiter | None = None,
+        slots: threading.Semaphore | None = None,
+        marshal_batch: int = 1,
     ):
         self.provider = provider
         self.api_key = api_key
@@ -167,6 +217,10 @@ class DLIFingerprinter(BlackBoxFingerprinter):
         self.num_probes = num_probes
         self.api_timeout = api_timeout
         self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.slots = slots
+        self.marshal_batch = marshal_batch
         self._model: str = ""
         self._responses: list[str] = []
 
@@ -180,44 +234,31 @@ class DLIFingerprinter(BlackBoxFingerprinter):
             self.api_key = kwargs["api_key"]
         if "api_base" in kwargs:
             self.api_base = kwargs["api_base"]
+        if "marshal_batch" in kwargs:
+            self.marshal_batch = kwargs["marshal_batch"]
 
     def get_fingerprint(self) -> Fingerprint:
         """发送探测 prompt 并提取行为签名."""
         if not self._model:
             raise RuntimeError("请先调用 prepare() 设置目标模型")
 
-        from modelaudit.methods.llmmap import _call_model_api
+        from modelaudit.methods.llmmap import _call_probes
         from modelaudit.probes import get_probes
 
         probes = get_probes(count=self.num_probes)
-        responses: list[str] = []
-
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-
-        def _call_probe(probe):
-            return _call_model_api(
-                model=self._model,
-                prompt=probe.prompt,
-                provider=self.provider,
-                api_key=self.api_key,
-                api_base=self.api_base,
-                max_retries=self.max_retries,
-                api_timeout=self.api_timeout,
-            )
-
-        # 并发发送探测 (最多 4 个并发)
-        probe_response_map: dict[str, str] = {}
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_probe = {
-                executor.submit(_call_probe, probe): probe for probe in probes
-            }
-            for future in as_completed(future_to_probe):
-                probe = future_to_probe[future]
-                probe_response_map[probe.id] = future.result()
-
-        # 按原始顺序组装结果
-        for probe in probes:
-            responses.append(probe_response_map[probe.id])
+        responses = _call_probes(
+            self._model,
+            [p.prompt for p in probes],
+            provider=self.provider,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            max_retries=self.max_retries,
+            api_timeout=self.api_timeout,
+            max_concurrency=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            slots=self.slots,
+            marshal_batch=self.marshal_batch,
+        )
 
         self._responses = responses
         signature = _extract_behavior_signature(responses)
@@ -231,6 +272,7 @@ class DLIFingerprinter(BlackBoxFingerprinter):
                 "num_probes": len(probes),
                 "probe_ids": [p.id for p in probes],
                 "raw_responses": responses,
+                "marshal_batch": self.marshal_batch,
             },
         )
 
@@ -239,7 +281,9 @@ class DLIFingerprinter(BlackBoxFingerprinter):
         sig_a = fp_a.data.get("signature", {})
         sig_b = fp_b.data.get("signature", {})
 
-        similarity = _compute_behavior_similarity(sig_a, sig_b)
+        similarity, js_div = _behavior_similarity_parts(sig_a, sig_b)
+        feat_a = sig_a.get("features", {})
+        feat_b = sig_b.get("features", {})
         threshold = 0.80  # DLI 使用稍低的阈值，因为行为签名粒度更粗
 
         return ComparisonResult(
@@ -251,18 +295,10 @@ class DLIFingerprinter(BlackBoxFingerprinter):
             threshold=threshold,
             confidence=min(abs(similarity - threshold) / 0.2, 1.0),
             details={
-                "bigram_js_divergence": _js_divergence(
-                    sig_a.get("bigram_dist", {}), sig_b.get("bigram_dist", {}),
-                ),
+                "bigram_js_divergence": js_div,
                 "feature_diff": {
-                    k: abs(
-                        sig_a.get("features", {}).get(k, 0)
-                        - sig_b.get("features", {}).get(k, 0)
-                    )
-                    for k in set(
-                        list(sig_a.get("features", {}).keys())
-                        + list(sig_b.get("features", {}).keys())
-                    )
+                    k: abs(feat_a.get(k, 0) - feat_b.get(k, 0))
+                    for k in feat_a.keys() | feat_b.keys()
                 },
             },
         )
@@ -10,84 +10,116 @@
 4. 与已知模型模板比对，计算相似度
 """
 
+import contextlib
+import functools
 import hashlib
+import importlib.util
 import json
 import logging
+import math
+import operator
+import random
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+from modelaudit import __version__
 from modelaudit.base import BlackBoxFingerprinter
+from modelaudit.methods.dli import _extract_behavior_signature
+from modelaudit.methods.style import _compute_style_scores
 from modelaudit.models import ComparisonResult, Fingerprint
 from modelaudit.probes import get_probes
+from modelaudit.ratelimit import RateLimiter
 from modelaudit.registry import register
 
 logger = logging.getLogger(__name__)
 
+# 单条探测响应的输出 token 上限
+_MAX_TOKENS = 500
+
+
+# 常见 LLM 风格标记词
+_STYLE_MARKERS: dict[str, tuple[str, ...]] = {
+    "apologetic": ("sorry", "apologize", "unfortunately", "cannot", "can't", "i'm unable"),
+    "helpful": ("certainly", "sure", "absolutely", "of course", "happy to", "glad to"),
+    "hedging": ("however", "although", "perhaps", "might", "could", "may"),
+    "structured": ("first", "second", "third", "finally", "additionally", "moreover"),
+    "ai_aware": ("as an ai", "language model", "i don't have", "i'm not able", "trained"),
+}
+_REFUSAL_PREFIXES = ("i cannot", "i can't", "sorry", "i apologize")
+
+_SENTENCE_SPLIT_RE = re.compile(r"[.!?]+")
+_BULLET_RE = re.compile(r"^[\s]*[-*•]\s", re.MULTILINE)
+_NUMBERED_RE = re.compile(r"^[\s]*\d+[.)]\s", re.MULTILINE)
+_HEADER_RE = re.compile(r"^#+\s", re.MULTILINE)
+
 
 def _extract_response_features(response: str) -> dict[str, Any]:
     """从单条响应中提取特征向量."""
+    lower = response.lower()
     words = response.split()
-    sentences = re.split(r"[.!?]+", response)
-    sentences = [s.strip() for s in sentences if s.strip()]
+    sentences = [s for s in _SENTENCE_SPLIT_RE.split(response) if s.strip()]
 
     total_words = len(words) or 1
 
-    # 常见 LLM 风格标记词
-    style_markers = {
-        "apologetic": ["sorry", "apologize", "unfortunately", "cannot", "can't", "i'm unable"],
-        "helpful": ["certainly", "sure", "absolutely", "of course", "happy to", "glad to"],
-        "hedging": ["however", "although", "perhaps", "might", "could", "may"],
-        "structured": ["first", "second", "third", "finally", "additionally", "moreover"],
-        "ai_aware": ["as an ai", "language model", "i don't have", "i'm not able", "trained"],
+    marker_scores = {
+        category: sum(lower.count(m) for m in markers) / total_words
+        for category, markers in _STYLE_MARKERS.items()
     }
 
-    marker_scores = {}
-    for category, markers in style_markers.items():
-        count = sum(response.lower().count(m) for m in markers)
-        marker_scores[category] = count / total_words
-
     return {
         "length_chars": len(response),
         "length_words": len(words),
         "length_sentences": len(sentences),
-        "avg_word_length": sum(len(w) for w in words) / total_words,
+        # 各词总长 = 拼接后长度, 比逐词 len 求和快
+        "avg_word_length": len("".join(words)) / total_words,
         "avg_sentence_length": len(words) / max(len(sentences), 1),
-        "unique_word_ratio": len({w.lower() for w in words}) / total_words,
-        "punctuation_ratio": sum(1 for c in response if c in ".,;:!?") / max(len(response), 1),
+        "unique_word_ratio": len(set(lower.split())) / total_words,
+        "punctuation_ratio": sum(response.count(c) for c in ".,;:!?") / max(len(response), 1),
         "newline_ratio": response.count("\n") / max(len(response), 1),
-        "has_bullet_points": bool(re.search(r"^[\s]*[-*•]\s", response, re.MULTILINE)),
-        "has_numbered_list": bool(re.search(r"^[\s]*\d+[.)]\s", response, re.MULTILINE)),
-        "has_markdown_headers": bool(re.search(r"^#+\s", response, re.MULTILINE)),
+        "has_bullet_points": _BULLET_RE.search(response) is not None,
+        "has_numbered_list": _NUMBERED_RE.search(response) is not None,
+        "has_markdown_headers": _HEADER_RE.search(response) is not None,
         "has_code_blocks": "```" in response,
-        "starts_with_refusal": any(
-            response.lower().startswith(w) for w in ["i cannot", "i can't", "sorry", "i apologize"]
-        ),
+        "starts_with_refusal": lower.startswith(_REFUSAL_PREFIXES),
         "marker_scores": marker_scores,
     }
 
 
+_NUMERIC_KEYS = (
+    "length_chars", "length_words", "length_sentences",
+    "avg_word_length", "avg_sentence_length", "unique_word_ratio",
+    "punctuation_ratio", "newline_ratio",
+)
+_BOOL_KEYS = (
+    "has_bullet_points", "has_numbered_list", "has_markdown_headers",
+    "has_code_blocks", "starts_with_refusal",
+)
+# 指纹向量的固定维度顺序, 稠密单位向量 (unit_array) 按此排列
+_VECTOR_KEYS: tuple[str, ...] = (
+    *(f"avg_{k}" for k in _NUMERIC_KEYS),
+    *(f"ratio_{k}" for k in _BOOL_KEYS),
+    *(f"style_{c}" for c in _STYLE_MARKERS),
+)
+
+
+_SCHEMA_KEYS = frozenset(_VECTOR_KEYS)
+
+
 def _compute_fingerprint_vector(probe_features: list[dict[str, Any]]) -> dict[str, float]:
     """将多个探测的特征合并为指纹向量."""
     vector: dict[str, float] = {}
     n = len(probe_features) or 1
 
     # 聚合数值特征
-    numeric_keys = [
-        "length_chars", "length_words", "length_sentences",
-        "avg_word_length", "avg_sentence_length", "unique_word_ratio",
-        "punctuation_ratio", "newline_ratio",
-    ]
-    for key in numeric_keys:
+    for key in _NUMERIC_KEYS:
         values = [f.get(key, 0) for f in probe_features]
         vector[f"avg_{key}"] = sum(values) / n
 
     # 聚合布尔特征
-    bool_keys = [
-        "has_bullet_points", "has_numbered_list", "has_markdown_headers",
-        "has_code_blocks", "starts_with_refusal",
-    ]
-    for key in bool_keys:
+    for key in _BOOL_KEYS:
         vector[f"ratio_{key}"] = sum(1 for f in probe_features if f.get(key)) / n
 
     # 聚合风格标记
@@ -127,23 +159,49 @@ def _normalize_vector(vector: dict[str, float]) -> dict[str, float]:
     return normalized
 
 
+def _unit_vector(vector: dict[str, float]) -> dict[str, float]:
+    """归一化到 0-1 后再缩放为单位长度, 只保留非零分量; 零向量返回空 dict."""
+    normalized = _normalize_vector(vector)
+    norm = math.sqrt(sum(v * v for v in normalized.values()))
+    if norm == 0:
+        return {}
+    return {k: v / norm for k, v in normalized.items() if v}
+
+
+def _unit_dot(a: dict[str, float], b: dict[str, float]) -> float:
+    """两个单位向量的点积 (即余弦相似度), 只遍历较短一侧."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
 def _cosine_similarity(a: dict[str, float], b: dict[str, float]) -> float:
     """计算两个稀疏向量的余弦相似度（归一化后比对）."""
-    a = _normalize_vector(a)
-    b = _normalize_vector(b)
+    return _unit_dot(_unit_vector(a), _unit_vector(b))
 
-    all_keys = set(a.keys()) | set(b.keys())
-    if not all_keys:
-        return 0.0
 
-    dot = sum(a.get(k, 0) * b.get(k, 0) for k in all_keys)
-    norm_a = sum(a.get(k, 0) ** 2 for k in all_keys) ** 0.5
-    norm_b = sum(b.get(k, 0) ** 2 for k in all_keys) ** 0.5
+def _unit_array(unit: dict[str, float]) -> list[float] | None:
+    """按 _VECTOR_KEYS 展开为稠密单位向量; 含 schema 之外的维度时返回 None."""
+    if not unit.keys() <= _SCHEMA_KEYS:
+        return None
+    return [unit.get(k, 0.0) for k in _VECTOR_KEYS]
 
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
 
-    return dot / (norm_a * norm_b)
+def _fingerprint_similarity(fp_a: Fingerprint, fp_b: Fingerprint) -> float:
+    """两个 LLMmap 指纹的余弦相似度; 双方都有稠密单位向量时按固定顺序直接点积."""
+    arr_a = fp_a.data.get("unit_array")
+    arr_b = fp_b.data.get("unit_array")
+    if isinstance(arr_a, list) and isinstance(arr_b, list) and len(arr_a) == len(arr_b):
+        return sum(map(operator.mul, arr_a, arr_b))
+    return _unit_dot(_fingerprint_unit_vector(fp_a), _fingerprint_unit_vector(fp_b))
+
+
+def _fingerprint_unit_vector(fp: Fingerprint) -> dict[str, float]:
+    """读取指纹预存的单位向量; 旧缓存指纹没有该字段时现算."""
+    cached = fp.data.get("unit_vector")
+    if isinstance(cached, dict):
+        return cached
+    return _unit_vector(fp.data.get("vector", {}))
 
 
 def _call_model_api(
@@ -154,11 +212,14 @@ def _call_model_api(
     api_base: str = "",
     max_retries: int = 3,
     api_timeout: int = 60,
+    max_tokens: int = _MAX_TOKENS,
 ) -> str:
     """调用模型 API 获取响应，支持指数退避重试."""
     for attempt in range(max_retries):
         try:
-            text = _call_model_api_once(model, prompt, provider, api_key, api_base, api_timeout)
+            text = _call_model_api_once(
+                model, prompt, provider, api_key, api_base, api_timeout, max_tokens
+            )
             if not text or not text.strip():
                 logger.warning("API 返回空响应 (model=%s, attempt=%d)", model, attempt + 1)
                 if attempt < max_retries - 1:
@@ -177,7 +238,7 @@ def _call_model_api(
             if "429" in err_str or "rate" in err_str:
                 logger.warning("API 速率限制 (model=%s, attempt=%d/%d)", model, attempt + 1, max_retries)
                 if attempt < max_retries - 1:
-                    _backoff_sleep(attempt + 1)  # 加长退避
+                    _backoff_sleep(attempt + 1, _retry_after(e))  # 加长退避
                     continue
             logger.warning(
                 "API 调用失败 (model=%s, attempt=%d/%d): %s",
@@ -190,22 +251,126 @@ def _call_model_api(
     return ""
 
 
-def _backoff_sleep(attempt: int) -> None:
-    """指数退避等待."""
-    delay = min(2 ** attempt, 30)
-    logger.info("等待 %ds 后重试...", delay)
-    time.sleep(delay)
-
-
-def _call_model_api_once(
+def _call_probes(
     model: str,
-    prompt: str,
+    prompts: list[str],
     provider: str = "openai",
     api_key: str = "",
     api_base: str = "",
+    max_retries: int = 3,
     api_timeout: int = 60,
-) -> str:
-    """单次调用模型 API."""
+    max_concurrency: int = 4,
+    rate_limiter: RateLimiter | None = None,
+    slots: threading.Semaphore | None = None,
+    marshal_batch: int = 1,
+) -> list[str]:
+    """并发发送一组探测 prompt, 按提交顺序返回响应.
+
+    探测相互独立且以网络等待为主, 用线程池重叠各次调用的往返延迟。
+    指定 rate_limiter 时每次调用前先预留额度 (token 数按 prompt 粗估 + max_tokens)。
+    指定 slots 时每次调用需先占用一个名额, 多个模型对同一端点的并发总数受其约束。
+    marshal_batch > 1 时每 marshal_batch 条探测合并为一次调用 (行编组), 调用次数随之减少;
+    合并响应无法按编号拆回时, 该组回退为逐条调用。
+    """
+
+    def _call(prompt: str, n: int = 1) -> str:
+        # 合并 n 条探测时输出上限同比放大, 避免末尾答案被截断
+        max_tokens = _MAX_TOKENS * n
+        with slots or contextlib.nullcontext():
+            if rate_limiter is not None:
+                rate_limiter.acquire(len(prompt) // 4 + max_tokens)
+            return _call_model_api(
+                model=model,
+                prompt=prompt,
+                provider=provider,
+                api_key=api_key,
+                api_base=api_base,
+                max_retries=max_retries,
+                api_timeout=api_timeout,
+                max_tokens=max_tokens,
+            )
+
+    def _call_chunk(chunk: list[str]) -> list[str]:
+        if len(chunk) == 1:
+            return [_call(chunk[0])]
+        answers = _unmarshal_response(_call(_marshal_probes(chunk), len(chunk)), len(chunk))
+        if answers is None:
+            logger.warning("合并探测响应解析失败, 回退为逐条调用 (%d 条)", len(chunk))
+            return [_call(p) for p in chunk]
+        return answers
+
+    k = max(1, marshal_batch)
+    chunks = [prompts[i : i + k] for i in range(0, len(prompts), k)]
+    if len(chunks) <= 1 or max_concurrency <= 1:
+        return [r for c in chunks for r in _call_chunk(c)]
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+        return [r for rs in executor.map(_call_chunk, chunks) for r in rs]
+
+
+_MARSHAL_HEADER = (
+    "Answer each numbered question below separately and completely. "
+    "Start each answer on a new line with its marker, e.g. [[ANSWER 1]], "
+    "and do not add any text outside the marked answers."
+)
+_ANSWER_MARKER_RE = re.compile(r"^[ \t]*\[\[ANSWER (\d+)\]\][ \t]*$", re.MULTILINE)
+
+
+def _marshal_probes(prompts: list[str]) -> str:
+    """把多条探测 prompt 合并为一条带编号的 prompt."""
+    questions = "\n\n".join(f"[[QUESTION {i}]]\n{p}" for i, p in enumerate(prompts, 1))
+    return f"{_MARSHAL_HEADER}\n\n{questions}"
+
+
+def _unmarshal_response(text: str, k: int) -> list[str] | None:
+    """按 [[ANSWER i]] 标记拆分合并响应; 标记缺失、乱序或有空答案时返回 None.
+
+    不用 "1." 这类编号切分: 回答本身常含编号列表, 会被误切。
+    """
+    marks = list(_ANSWER_MARKER_RE.finditer(text))
+    if [int(m.group(1)) for m in marks] != list(range(1, k + 1)):
+        return None
+    ends = [m.start() for m in marks[1:]] + [len(text)]
+    answers = [text[m.end() : end].strip() for m, end in zip(marks, ends, strict=True)]
+    return answers if all(answers) else None
+
+
+def _backoff_sleep(attempt: int, retry_after: float | None = None) -> None:
+    """指数退避等待.
+
+    在 [delay/2, delay] 内随机抖动, 避免并发探测在限速时同步重试、再次撞上限额;
+    服务端给出 Retry-After 时以其为准 (最多等 60s)。
+    """
+    if retry_after is not None:
+        delay = min(retry_after, 60.0)
+    else:
+        cap = min(2 ** attempt, 30)
+        delay = random.uniform(cap / 2, cap)
+    logger.info("等待 %.1fs 后重试...", delay)
+    time.sleep(delay)
+
+
+def _retry_after(exc: Exception) -> float | None:
+    """从 SDK / httpx 异常携带的响应头中读取 Retry-After 秒数; 无法解析时返回 None."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        value = float(headers.get("retry-after", ""))
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 0 else None
+
+
+_CLIENT_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=32)
+def _get_client(provider: str, api_key: str = "", api_base: str = "", api_timeout: int = 60) -> Any:
+    """按端点复用 SDK 客户端.
+
+    同一端点的所有探测共享一个客户端及其 HTTP 连接池 (keep-alive)，
+    不再每条探测新建客户端、重新握手。SDK 客户端本身线程安全。
+    """
     if provider == "openai":
         try:
             from openai import OpenAI
@@ -219,14 +384,7 @@ def _call_model_api_once(
             client_kwargs["base_url"] = api_base
 
         client_kwargs["timeout"] = float(api_timeout)
-        client = OpenAI(**client_kwargs)
-        response = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=500,
-            temperature=0.0,
-        )
-        return response.choices[0].message.content or ""
+        return OpenAI(**client_kwargs)
 
     elif provider == "anthropic":
         try:
@@ -240,13 +398,7 @@ def _call_model_api_once(
         if api_key:
             client_kwargs["api_key"] = api_key
 
-        client = Anthropic(**client_kwargs)
-        response = client.messages.create(
-            model=model,
-            max_tokens=500,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return response.content[0].text if response.content else ""
+        return Anthropic(**client_kwargs)
 
     elif provider == "custom":
         try:
@@ -261,24 +413,63 @@ def _call_model_api_once(
         if api_key:
             headers["Authorization"] = f"Bearer {api_key}"
 
-        resp = httpx.post(
-            f"{api_base.rstrip('/')}/v1/chat/completions",
+        # 装有 h2 时启用 HTTP/2, 并发探测复用同一条 TCP 连接多路传输
+        return httpx.Client(
+            base_url=api_base.rstrip("/"),
+            headers=headers,
+            timeout=api_timeout,
+            http2=importlib.util.find_spec("h2") is not None,
+        )
+
+    else:
+        raise ValueError(f"不支持的 provider: {provider}")
+
+
+def _call_model_api_once(
+    model: str,
+    prompt: str,
+    provider: str = "openai",
+    api_key: str = "",
+    api_base: str = "",
+    api_timeout: int = 60,
+    max_tokens: int = _MAX_TOKENS,
+) -> str:
+    """单次调用模型 API."""
+    # lru_cache 并发未命中时会重复构造客户端 (多建一套连接池), 加锁保证每个端点只建一次
+    with _CLIENT_LOCK:
+        client = _get_client(provider, api_key, api_base, api_timeout)
+
+    if provider == "openai":
+        response = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=max_tokens,
+            temperature=0.0,
+        )
+        return response.choices[0].message.content or ""
+
+    elif provider == "anthropic":
+        response = client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}],
+        )
+        return response.content[0].text if response.content else ""
+
+    else:  # custom
+        resp = client.post(
+            "/v1/chat/completions",
             json={
                 "model": model,
                 "messages": [{"role": "user", "content": prompt}],
-                "max_tokens": 500,
+                "max_tokens": max_tokens,
                 "temperature": 0.0,
             },
-            headers=headers,
-            timeout=api_timeout,
         )
         resp.raise_for_status()
         data = resp.json()
         return data["choices"][0]["message"]["content"]
 
-    else:
-        raise ValueError(f"不支持的 provider: {provider}")
-
 
 @register("llmmap")
 class LLMmapFingerprinter(BlackBoxFingerprinter):
@@ -288,9 +479,7 @@ class LLMmapFingerprinter(BlackBoxFingerprinter):
     参考: LLMmap (USENIX Security 2025), MIT License
     """
 
-    @property
-    def name(self) -> str:
-        return "llmmap"
+    name = "llmmap"
 
     def __init__(
         self,
@@ -300,6 +489,10 @@ class LLMmapFingerprinter(BlackBoxFingerprinter):
         num_probes: int = 8,
         api_timeout: int = 60,
         max_retries: int = 3,
+        max_concurrency: int = 4,
+        rate_limiter: RateLimiter | None = None,
+        slots: threading.Semaphore | None = None,
+        marshal_batch: int = 1,
     ):
         self.provider = provider
         self.api_key = api_key
@@ -307,6 +500,10 @@ class LLMmapFingerprinter(BlackBoxFingerprinter):
         self.num_probes = num_probes
         self.api_timeout = api_timeout
         self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.slots = slots
+        self.marshal_batch = marshal_batch
         self._model: str = ""
         self._responses: list[str] = []
 
@@ -321,6 +518,8 @@ class LLMmapFingerprinter(BlackBoxFingerprinter):
             self.api_key = kwargs["api_key"]
         if "api_base" in kwargs:
             self.api_base = kwargs["api_base"]
+        if "marshal_batch" in kwargs:
+            self.marshal_batch = kwargs["marshal_batch"]
 
     def get_fingerprint(self) -> Fingerprint:
         """发送探测 prompt 并提取指纹."""
@@ -328,41 +527,30 @@ class LLMmapFingerprinter(BlackBoxFingerprinter):
             raise RuntimeError("请先调用 prepare() 设置目标模型")
 
         probes = get_probes(count=self.num_probes)
-        responses: list[str] = []
-        probe_features: list[dict[str, Any]] = []
-
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-
-        def _call_probe(probe):
-            return _call_model_api(
-                model=self._model,
-                prompt=probe.prompt,
-                provider=self.provider,
-                api_key=self.api_key,
-                api_base=self.api_base,
-                max_retries=self.max_retries,
-                api_timeout=self.api_timeout,
-            )
-
-        # 并发发送探测 (最多 4 个并发)
-        probe_response_map: dict[str, str] = {}
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            future_to_probe = {
-                executor.submit(_call_probe, probe): probe for probe in probes
-            }
-            for future in as_completed(future_to_probe):
-                probe = future_to_probe[future]
-                probe_response_map[probe.id] = future.result()
-
-        # 按原始顺序组装结果
-        for probe in probes:
-            response = probe_response_map[probe.id]
-            responses.append(response)
-            features = _extract_response_features(response)
-            probe_features.append(features)
+        responses = _call_probes(
+            self._model,
+            [p.prompt for p in probes],
+            provider=self.provider,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            max_retries=self.max_retries,
+            api_timeout=self.api_timeout,
+            max_concurrency=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            slots=self.slots,
+            marshal_batch=self.marshal_batch,
+        )
+        probe_features = [_extract_response_features(r) for r in responses]
+        # 逐条响应的风格分数随指纹一起保存, audit() 的逐探测分析直接复用
+        style_scores = [_compute_style_scores(r) if r else {} for r in responses]
+        # DLI 行为签名同理, 命中缓存的重复审计无需再扫描全部响应
+        behavior_signature = _extract_behavior_signature(responses)
+        # verify() 按全部响应拼接后的整体风格判定, 同样预先算好
+        combined_style_scores = _compute_style_scores("\n".join(responses))
 
         self._responses = responses
         vector = _compute_fingerprint_vector(probe_features)
+        unit = _unit_vector(vector)
 
         # 生成指纹哈希（用于快速比对）
         fp_hash = hashlib.md5(json.dumps(vector, sort_keys=True).encode()).hexdigest()[:16]
@@ -373,19 +561,25 @@ class LLMmapFingerprinter(BlackBoxFingerprinter):
             fingerprint_type="blackbox",
             data={
                 "vector": vector,
+                # 两两比对时直接做点积, 不必每次重新归一化
+                "unit_vector": unit,
+                "unit_array": _unit_array(unit),
                 "hash": fp_hash,
                 "num_probes": len(probes),
                 "probe_ids": [p.id for p in probes],
                 "raw_responses": responses,
+                "marshal_batch": self.marshal_batch,
+                "style_scores": style_scores,
+                "behavior_signature": behavior_signature,
+                "combined_style_scores": combined_style_scores,
+                # 以上派生数据随评分逻辑变化; 引擎只复用同版本写入的, 旧版本缓存会重算
+                "derived_version": __version__,
             },
         )
 
     def compare(self, fp_a: Fingerprint, fp_b: Fingerprint) -> ComparisonResult:
         """比对两个 LLMmap 指纹."""
-        vec_a = fp_a.data.get("vector", {})
-        vec_b = fp_b.data.get("vector", {})
-
-        similarity = _cosine_similarity(vec_a, vec_b)
+        similarity = _fingerprint_similarity(fp_a, fp_b)
         threshold = 0.85
 
         return ComparisonResult(
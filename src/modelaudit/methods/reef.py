@@ -11,6 +11,7 @@ CKA 是一种衡量两组表示是否具有相同结构的方法。
 4. 汇总为蒸馏判定分数
 """
 
+import base64
 import hashlib
 import logging
 from typing import Any
@@ -34,6 +35,13 @@ _REEF_PROBES = [
 ]
 
 
+def _squared_fro(a: Any) -> float:
+    """||A||_F^2 = sum(A*A), 省去 norm 的开方再平方."""
+    import numpy as np
+
+    return float(np.vdot(a, a))
+
+
 def _compute_cka(X: Any, Y: Any) -> float:
     """计算线性 CKA (Centered Kernel Alignment).
 
@@ -46,8 +54,9 @@ def _compute_cka(X: Any, Y: Any) -> float:
     """
     import numpy as np
 
-    X = np.array(X, dtype=np.float64)
-    Y = np.array(Y, dtype=np.float64)
+    # asarray: 已是 float64 ndarray 时不复制
+    X = np.asarray(X, dtype=np.float64)
+    Y = np.asarray(Y, dtype=np.float64)
 
     # HSIC(X, Y) = ||Y^T X||_F^2 / (n-1)^2
     n = X.shape[0]
@@ -58,9 +67,13 @@ def _compute_cka(X: Any, Y: Any) -> float:
     X = X - X.mean(axis=0)
     Y = Y - Y.mean(axis=0)
 
-    hsic_xy = np.linalg.norm(Y.T @ X, "fro") ** 2
-    hsic_xx = np.linalg.norm(X.T @ X, "fro") ** 2
-    hsic_yy = np.linalg.norm(Y.T @ Y, "fro") ** 2
+    # 核技巧: ||Y^T X||_F^2 = <XX^T, YY^T>_F, 只需构造 n×n 的 Gram 矩阵,
+    # 不必生成 p×p / q×q 的特征空间乘积 (n 为探测数, 远小于隐藏维度)
+    Kx = X @ X.T
+    Ky = Y @ Y.T
+    hsic_xy = float(np.vdot(Kx, Ky))
+    hsic_xx = _squared_fro(Kx)
+    hsic_yy = _squared_fro(Ky)
 
     denom = (hsic_xx * hsic_yy) ** 0.5
     if denom < 1e-10:
@@ -69,17 +82,123 @@ def _compute_cka(X: Any, Y: Any) -> float:
     return float(hsic_xy / denom)
 
 
+def _layer_hsic_torch(X: Any, Y: Any, device: str) -> Any:
+    """在 torch 设备上批量计算各层 HSIC 三项 (xy, xx, yy); 未安装 torch 时返回 None."""
+    try:
+        import torch
+    except ImportError:
+        return None
+
+    x = torch.as_tensor(X, dtype=torch.float32, device=device)
+    y = torch.as_tensor(Y, dtype=torch.float32, device=device)
+    x = x - x.mean(dim=1, keepdim=True)
+    y = y - y.mean(dim=1, keepdim=True)
+    kx = x @ x.transpose(1, 2)
+    ky = y @ y.transpose(1, 2)
+    terms = torch.stack(
+        [(kx * ky).sum(dim=(1, 2)), (kx * kx).sum(dim=(1, 2)), (ky * ky).sum(dim=(1, 2))]
+    )
+    return terms.double().cpu().numpy()
+
+
+def _compute_layer_cka(hs_a: Any, hs_b: Any, device: str = "cpu") -> list[float]:
+    """逐层计算 CKA, 所有层一次批量完成.
+
+    Args:
+        hs_a: shape (L, n, p) — 模型 A 各层表示
+        hs_b: shape (L, n, q) — 模型 B 各层表示
+        device: 非 cpu 时用 torch 在该设备上计算 (FP32), 未安装 torch 则回退 NumPy
+
+    Returns:
+        长度 L 的逐层 CKA; 层内形状不规整时退回逐层计算
+    """
+    import numpy as np
+
+    try:
+        X = np.asarray(hs_a, dtype=np.float64)
+        Y = np.asarray(hs_b, dtype=np.float64)
+    except ValueError:
+        X = Y = None
+    if X is None or X.ndim != 3 or Y.ndim != 3 or X.shape[1] != Y.shape[1]:
+        return [_compute_cka(a, b) for a, b in zip(hs_a, hs_b, strict=True)]
+
+    if X.shape[1] < 2:
+        return [0.0] * len(X)
+
+    terms = _layer_hsic_torch(X, Y, device) if device != "cpu" else None
+    if terms is not None:
+        hsic_xy, hsic_xx, hsic_yy = terms
+    else:
+        X = X - X.mean(axis=1, keepdims=True)
+        Y = Y - Y.mean(axis=1, keepdims=True)
+
+        # 同 _compute_cka 的核技巧, 各层 n×n Gram 矩阵批量计算
+        Kx = X @ X.transpose(0, 2, 1)
+        Ky = Y @ Y.transpose(0, 2, 1)
+        hsic_xy = np.einsum("lnm,lnm->l", Kx, Ky)
+        hsic_xx = np.einsum("lnm,lnm->l", Kx, Kx)
+        hsic_yy = np.einsum("lnm,lnm->l", Ky, Ky)
+
+    denom = np.sqrt(hsic_xx * hsic_yy)
+    return [float(xy / d) if d >= 1e-10 else 0.0 for xy, d in zip(hsic_xy, denom, strict=True)]
+
+
+def _self_cka_is_one(hs: Any) -> bool:
+    """隐藏状态与自身比对时, _compute_layer_cka 是否每层都得 1 (可免计算)."""
+    import numpy as np
+
+    try:
+        X = np.asarray(hs, dtype=np.float64)
+    except ValueError:
+        return False
+    if X.ndim != 3 or X.shape[1] < 2:
+        return False
+    Xc = X - X.mean(axis=1, keepdims=True)
+    sq = np.einsum("lnd,lnd->l", Xc, Xc)
+    # ‖Xc·Xcᵀ‖_F² ≥ ‖Xc‖_F⁴ / n, 由此保证分母不低于 _compute_layer_cka 的 1e-10 阈值
+    return bool(np.all(sq * sq / X.shape[1] >= 1e-10))
+
+
+def _pack_hidden_states(hidden_states: Any) -> dict[str, Any]:
+    """把 (L, n, d) 隐藏状态压缩为可 JSON 缓存的 FP16 base64 块.
+
+    个别层的激活超出 FP16 范围时整体改存 FP32, 避免溢出为 inf。
+    """
+    import numpy as np
+
+    arr = np.asarray(hidden_states, dtype=np.float32)
+    fits_fp16 = np.abs(arr).max(initial=0.0) <= np.finfo(np.float16).max
+    packed = arr.astype("<f2" if fits_fp16 else "<f4")
+    return {
+        "dtype": packed.dtype.name,
+        "shape": list(packed.shape),
+        "data": base64.b64encode(packed.tobytes()).decode("ascii"),
+    }
+
+
+def _unpack_hidden_states(value: Any) -> Any:
+    """还原 _pack_hidden_states 的结果为 FP32 ndarray; 旧指纹的嵌套 list 原样返回."""
+    if not isinstance(value, dict):
+        return value
+
+    import numpy as np
+
+    dtype = "<f2" if value["dtype"] == "float16" else "<f4"
+    raw = base64.b64decode(value["data"])
+    return np.frombuffer(raw, dtype=dtype).reshape(value["shape"]).astype(np.float32)
+
+
 def _extract_hidden_states(
     model_name_or_path: str,
     texts: list[str],
     device: str = "cpu",
     num_layers: int | None = None,
-) -> list[list[list[float]]]:
+) -> Any:
     """提取模型的逐层隐藏状态.
 
     Returns:
-        list of layers, each layer is list of per-sample pooled representations
-        shape: (num_layers, num_samples, hidden_dim)
+        np.ndarray, shape: (num_layers, num_samples, hidden_dim)
+        各层对每个样本做 mean pooling 后的表示
     """
     try:
         import torch
@@ -103,7 +222,8 @@ def _extract_hidden_states(
         texts, return_tensors="pt", padding=True, truncation=True, max_length=512
     ).to(device)
 
-    with torch.no_grad():
+    # inference_mode 比 no_grad 更进一步, 跳过 autograd 的版本计数与视图追踪
+    with torch.inference_mode():
         outputs = model(**inputs)
 
     hidden_states = outputs.hidden_states  # tuple of (batch, seq_len, hidden_dim)
@@ -117,15 +237,15 @@ def _extract_hidden_states(
     else:
         indices = list(range(total_layers))
 
-    result: list[list[list[float]]] = []
-    for idx in indices:
-        hs = hidden_states[idx]  # (batch, seq_len, hidden_dim)
-        # mean pooling (忽略 padding)
-        mask = attention_mask.unsqueeze(-1).float()
-        pooled = (hs * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
-        result.append(pooled.cpu().tolist())
-
-    return result
+    # mean pooling (忽略 padding): 选中各层堆叠为 (L, B, T, D) 后一次 einsum 完成加权求和,
+    # 不再逐层各发一组 kernel; 结果一次性拷回 CPU。
+    # 求和前先转 float32: fp16/bf16 在长序列上按 token 累加会溢出或丢精度, mask 计数也一样
+    with torch.inference_mode():
+        hs_stack = torch.stack([hidden_states[idx] for idx in indices]).float()
+        mask = attention_mask.float()
+        denom = mask.sum(dim=1).clamp(min=1).unsqueeze(-1)  # (B, 1)
+        pooled = torch.einsum("lbtd,bt->lbd", hs_stack, mask) / denom
+    return pooled.cpu().numpy()
 
 
 @register("reef")
@@ -136,9 +256,7 @@ class REEFFingerprinter(WhiteBoxFingerprinter):
     参考: REEF (NeurIPS 2024)
     """
 
-    @property
-    def name(self) -> str:
-        return "reef"
+    name = "reef"
 
     def __init__(self, device: str = "cpu", num_layers: int = 8):
         self.device = device
@@ -160,12 +278,10 @@ class REEFFingerprinter(WhiteBoxFingerprinter):
             self._model, _REEF_PROBES, device=self.device, num_layers=self.num_layers,
         )
 
-        # 用隐藏状态的统计摘要作为指纹哈希
+        # 用隐藏状态的统计摘要作为指纹哈希 (各层样本均值的前16维)
         import numpy as np
 
-        flat = np.array([
-            np.mean(layer, axis=0)[:16] for layer in hidden_states  # 取前16维的均值
-        ]).flatten()
+        flat = hidden_states.mean(axis=1, dtype=np.float64)[:, :16].flatten()
         fp_hash = hashlib.md5(flat.tobytes()).hexdigest()[:16]
 
         return Fingerprint(
@@ -173,7 +289,8 @@ class REEFFingerprinter(WhiteBoxFingerprinter):
             method="reef",
             fingerprint_type="whitebox",
             data={
-                "hidden_states": hidden_states,
+                # FP16 base64 存储: 比嵌套 float list 小一个数量级, CKA 误差 < 1e-3
+                "hidden_states": _pack_hidden_states(hidden_states),
                 "hash": fp_hash,
                 "num_layers": len(hidden_states),
                 "num_probes": len(_REEF_PROBES),
@@ -183,10 +300,25 @@ class REEFFingerprinter(WhiteBoxFingerprinter):
 
     def compare(self, fp_a: Fingerprint, fp_b: Fingerprint) -> ComparisonResult:
         """用 CKA 比对两个 REEF 指纹."""
-        hs_a = fp_a.data.get("hidden_states", [])
-        hs_b = fp_b.data.get("hidden_states", [])
+        raw_a = fp_a.data.get("hidden_states", [])
+        raw_b = fp_b.data.get("hidden_states", [])
+        hash_a = fp_a.data.get("hash", "")
+        hash_b = fp_b.data.get("hash", "")
+
+        hs_a = _unpack_hidden_states(raw_a)
+        hs_b = _unpack_hidden_states(raw_b)
+
+        # 同一模型的重复比对: 哈希一致且隐藏状态数据逐字节相同时 CKA 为 1, 直接跳过计算。
+        # 哈希只覆盖各层均值的前 16 维, 故仍需核对原始数据, 不单凭哈希判定;
+        # 样本不足或某层近乎零方差时正常计算得 0 而非 1, 这些情况不走捷径
+        skipped_cka = (
+            bool(raw_a) and hash_a != "" and hash_a == hash_b and raw_a == raw_b
+            and _self_cka_is_one(hs_a)
+        )
+        if skipped_cka:
+            return self._result(fp_a, fp_b, [1.0] * len(hs_a), skipped_cka=True)
 
-        if not hs_a or not hs_b:
+        if len(hs_a) == 0 or len(hs_b) == 0:
             return ComparisonResult(
                 model_a=fp_a.model_id,
                 model_b=fp_b.model_id,
@@ -200,11 +332,16 @@ class REEFFingerprinter(WhiteBoxFingerprinter):
 
         # 逐层计算 CKA
         num_layers = min(len(hs_a), len(hs_b))
-        layer_cka: list[float] = []
-        for i in range(num_layers):
-            cka = _compute_cka(hs_a[i], hs_b[i])
-            layer_cka.append(cka)
-
+        layer_cka = _compute_layer_cka(hs_a[:num_layers], hs_b[:num_layers], self.device)
+        return self._result(fp_a, fp_b, layer_cka)
+
+    @staticmethod
+    def _result(
+        fp_a: Fingerprint, fp_b: Fingerprint, layer_cka: list[float], skipped_cka: bool = False
+    ) -> ComparisonResult:
+        """由逐层 CKA 汇总比对结果."""
+        hash_a = fp_a.data.get("hash", "")
+        hash_b = fp_b.data.get("hash", "")
         avg_cka = sum(layer_cka) / len(layer_cka) if layer_cka else 0.0
         threshold = 0.85
 
@@ -218,8 +355,10 @@ class REEFFingerprinter(WhiteBoxFingerprinter):
             confidence=min(abs(avg_cka - threshold) / 0.15, 1.0),
             details={
                 "layer_cka": [round(c, 6) for c in layer_cka],
-                "num_layers_compared": num_layers,
-                "hash_a": fp_a.data.get("hash", ""),
-                "hash_b": fp_b.data.get("hash", ""),
+                "num_layers_compared": len(layer_cka),
+                "hash_a": hash_a,
+                "hash_b": hash_b,
+                "hash_match": hash_a == hash_b,
+                "skipped_cka": skipped_cka,
             },
         )
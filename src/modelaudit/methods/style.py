@@ -8,16 +8,25 @@
 - 格式化习惯（列表、Markdown 等）
 """
 
+import functools
 import re
+from collections.abc import Callable
+from operator import itemgetter
 from typing import Any
 
 from modelaudit.models import DetectionResult
 
+try:
+    import ahocorasick
+except ImportError:  # 可选加速 (fast extra), 缺省时逐模式子串查找
+    ahocorasick = None
+
 # 已知 LLM 风格特征库
 # markers: 独特短语 (越独特越好，避免跨模型重叠)
 # refusal_patterns: 拒绝时的典型表达
 # structural: 格式偏好
 # lang: 主要语言 ("en", "zh", "both")
+# 打分结果按文本缓存; 运行时修改本表后须调用 clear_style_caches(), 否则已缓存的文本仍按旧表计分
 MODEL_STYLE_SIGNATURES: dict[str, dict[str, Any]] = {
     "gpt-4": {
         "markers": [
@@ -228,9 +237,49 @@ MODEL_STYLE_SIGNATURES: dict[str, dict[str, Any]] = {
 }
 
 
+# 预编译的文本特征正则; 汉字计数用 findall 在 C 层扫描, 比逐字符比较快约 2.5 倍
+_CJK_RE = re.compile("[\u4e00-\u9fff]")
+_MD_HEADING_RE = re.compile(r"^#+\s", re.MULTILINE)
+_NUMBERED_RE = re.compile(r"^\s*\d+[.)]\s", re.MULTILINE)
+
+
+@functools.cache
+def _signature_patterns() -> tuple[str, ...]:
+    """签名表中全部 marker 与拒绝模式 (去重, 保持顺序); 只构造一次, 自动机按它命中缓存."""
+    return tuple(dict.fromkeys(
+        p
+        for sig in MODEL_STYLE_SIGNATURES.values()
+        for p in (*sig["markers"], *sig["refusal_patterns"])
+    ))
+
+
+@functools.lru_cache(maxsize=4)
+def _pattern_automaton(patterns: tuple[str, ...]) -> Any:
+    automaton = ahocorasick.Automaton()
+    for p in patterns:
+        automaton.add_word(p, p)
+    automaton.make_automaton()
+    return automaton
+
+
+def _pattern_matcher(text_lower: str) -> Callable[[str], bool]:
+    """返回 "模式是否出现在文本中" 的判定函数.
+
+    装有 pyahocorasick 时对全部签名模式单遍扫描一次文本, 之后逐模式判定只是集合查找;
+    否则退回逐模式子串查找。两种方式判定结果一致 (重叠、嵌套的模式都会命中)。
+    """
+    if ahocorasick is None:
+        return text_lower.__contains__
+    automaton = _pattern_automaton(_signature_patterns())
+    return frozenset(p for _, p in automaton.iter(text_lower)).__contains__
+
+
 def _detect_lang(text: str) -> str:
     """检测文本主要语言: 'zh' 或 'en'."""
-    cjk_count = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    # 纯 ASCII 文本不可能含汉字; CPython 的 str.isascii() 只读字符串头部标记, O(1)
+    if text.isascii():
+        return "en"
+    cjk_count = len(_CJK_RE.findall(text))
     # 绝对数量兜底: 即使代码多, 10 个汉字也算中文
     if cjk_count >= 10:
         return "zh"
@@ -239,17 +288,33 @@ def _detect_lang(text: str) -> str:
 
 
 def _compute_style_scores(text: str) -> dict[str, float]:
-    """计算文本与各模型风格的匹配分数."""
+    """计算文本与各模型风格的匹配分数.
+
+    同一文本会在 verify / audit / 检测路径上重复打分, 结果按文本做 LRU 缓存;
+    每次返回新 dict, 调用方修改不会污染缓存。
+    """
+    return dict(_cached_style_scores(text))
+
+
+# 每条缓存约为一条响应文本加 12 个分数; 4096 条可覆盖多轮重复审计的全部探测响应
+@functools.lru_cache(maxsize=4096)
+def _cached_style_scores(text: str) -> tuple[tuple[str, float], ...]:
     text_lower = text.lower()
     words = text_lower.split()
     total_words = len(words) or 1
     text_lang = _detect_lang(text)
 
-    # 预计算结构特征 (只算一次)
-    has_md = bool(re.search(r"^#+\s", text, re.MULTILINE))
-    has_numbered = bool(re.search(r"^\s*\d+[.)]\s", text, re.MULTILINE))
-    has_code_blocks = "```" in text
-    is_verbose = total_words > 150
+    # 预计算结构特征 (只算一次), 只保留文本实际展现的特征, 各模型循环内不再重复判断
+    present_struct = [
+        key
+        for text_has, key in (
+            (_MD_HEADING_RE.search(text) is not None, "tends_markdown"),
+            (_NUMBERED_RE.search(text) is not None, "tends_numbered_lists"),
+            ("```" in text, "tends_code_blocks"),
+            (total_words > 150, "verbose"),
+        )
+        if text_has
+    ]
 
     # 检测是否有拒绝内容 (决定是否启用拒绝分数)
     has_refusal_hint = any(
@@ -257,6 +322,7 @@ def _compute_style_scores(text: str) -> dict[str, float]:
         for kw in ("i cannot", "i can't", "unable to", "我无法", "作为ai")
     )
 
+    contains = _pattern_matcher(text_lower)
     scores: dict[str, float] = {}
 
     for model_name, sig in MODEL_STYLE_SIGNATURES.items():
@@ -272,34 +338,43 @@ def _compute_style_scores(text: str) -> dict[str, float]:
 
         # ── 2. 标记词匹配 (权重 0.50) ──
         # 用固定分母 (3) 归一化, 避免 marker 多的模型吃亏
-        marker_hits = sum(1 for m in sig["markers"] if m in text_lower)
+        marker_hits = sum(1 for m in sig["markers"] if contains(m))
         score += min(marker_hits / 3, 1.0) * 0.50
 
         # ── 3. 结构特征匹配 (权重 0.20) ──
         # 只对文本实际展现的特征计分, 避免 "双否" 虚假匹配
         structural = sig["structural"]
         struct_score = 0.0
-        for text_has, key in [
-            (has_md, "tends_markdown"),
-            (has_numbered, "tends_numbered_lists"),
-            (has_code_blocks, "tends_code_blocks"),
-            (is_verbose, "verbose"),
-        ]:
-            model_tends = structural.get(key, False)
-            if text_has and model_tends:
+        for key in present_struct:
+            if structural.get(key, False):
                 struct_score += 0.05   # 正向匹配
-            elif text_has and not model_tends:
+            else:
                 struct_score -= 0.02   # 文本有但模型不倾向 → 轻微惩罚
         score += struct_score
 
         # ── 4. 拒绝模式 (权重 0.10, 仅文本含拒绝时生效) ──
         if has_refusal_hint:
-            refusal_hits = sum(1 for p in sig["refusal_patterns"] if p in text_lower)
+            refusal_hits = sum(1 for p in sig["refusal_patterns"] if contains(p))
             score += refusal_hits / max(len(sig["refusal_patterns"]), 1) * 0.10
 
         scores[model_name] = round(score, 4)
 
-    return scores
+    return tuple(scores.items())
+
+
+@functools.lru_cache(maxsize=256)
+def _claimed_family(model: str) -> str | None:
+    """从模型名推断其声称的风格家族 (按签名表顺序取第一个子串命中), 按模型名缓存."""
+    model_lower = model.lower()
+    return next((f for f in MODEL_STYLE_SIGNATURES if f in model_lower), None)
+
+
+def clear_style_caches() -> None:
+    """清空依赖签名表的进程内缓存 (打分、家族推断、模式表与自动机). 修改 MODEL_STYLE_SIGNATURES 后调用."""
+    _cached_style_scores.cache_clear()
+    _claimed_family.cache_clear()
+    _signature_patterns.cache_clear()
+    _pattern_automaton.cache_clear()
 
 
 def detect_text_source(texts: list[str]) -> list[DetectionResult]:
@@ -315,13 +390,9 @@ def detect_text_source(texts: list[str]) -> list[DetectionResult]:
 
     for i, text in enumerate(texts):
         scores = _compute_style_scores(text)
-
-        if scores:
-            best_model = max(scores, key=lambda k: scores[k])
-            best_score = scores[best_model]
-        else:
-            best_model = "unknown"
-            best_score = 0.0
+        best_model, best_score = (
+            max(scores.items(), key=itemgetter(1)) if scores else ("unknown", 0.0)
+        )
 
         preview = text[:80] + "..." if len(text) > 80 else text
         preview = preview.replace("\n", " ")
@@ -341,14 +412,15 @@ def detect_text_source(texts: list[str]) -> list[DetectionResult]:
 
 def compute_style_fingerprint(texts: list[str]) -> dict[str, float]:
     """从一组文本中提取风格指纹向量."""
-    all_scores: dict[str, list[float]] = {}
+    # 按模型累加分数与计数, 内存只随模型数增长, 不为每条文本保留分数列表
+    sums: dict[str, float] = {}
+    counts: dict[str, int] = {}
 
     for text in texts:
-        scores = _compute_style_scores(text)
-        for model, score in scores.items():
-            all_scores.setdefault(model, []).append(score)
+        # 只读遍历, 直接用缓存中的不可变结果, 不必复制成 dict
+        for model, score in _cached_style_scores(text):
+            sums[model] = sums.get(model, 0.0) + score
+            counts[model] = counts.get(model, 0) + 1
 
     # 聚合为平均分
-    return {
-        model: round(sum(s) / len(s), 4) for model, s in all_scores.items() if s
-    }
+    return {model: round(total / counts[model], 4) for model, total in sums.items()}
@@ -0,0 +1,70 @@
+"""API 速率限制 — 令牌桶.
+
+在发出请求前按 RPM / TPM 主动节流，而不是等 provider 返回 429 后再指数退避，
+并发探测时可以避免大量失败请求浪费的时间。
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """线程安全的令牌桶.
+
+    Args:
+        rate_per_minute: 每分钟补充的令牌数
+        capacity: 桶容量 (允许的突发量)，默认等于 rate_per_minute
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute 必须大于 0")
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """取走 amount 个令牌，不足时阻塞等待. 返回等待的秒数.
+
+        单次请求超过桶容量时按容量计，避免永远等不到。
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                elapsed = now - self._updated
+                self._updated = now
+                self._tokens = min(
+                    self.capacity, self._tokens + elapsed * self.rate_per_minute / 60
+                )
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) * 60 / self.rate_per_minute
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """按请求数 (RPM) 和 token 数 (TPM) 同时限速，0 表示该维度不限.
+
+    Args:
+        rpm: 每分钟最大请求数
+        tpm: 每分钟最大 token 数
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        """为一次请求预留额度，返回总等待秒数."""
+        waited = 0.0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.tokens is not None and tokens > 0:
+            waited += self.tokens.acquire(tokens)
+        return waited
@@ -1,10 +1,14 @@
 """方法注册表 — 装饰器工厂模式."""
 
+import importlib
 
 from modelaudit.base import Fingerprinter
 
 _REGISTRY: dict[str, type[Fingerprinter]] = {}
 
+# 内置方法 (modelaudit.methods.<name>), 首次按名称查找时才导入
+_BUILTIN_METHODS = ("llmmap", "dli", "reef")
+
 
 def register(name: str):
     """注册指纹方法的装饰器.
@@ -22,14 +26,30 @@ def register(name: str):
     return decorator
 
 
+def _load_builtin(name: str) -> None:
+    if name in _BUILTIN_METHODS and name not in _REGISTRY:
+        importlib.import_module(f"modelaudit.methods.{name}")
+
+
 def get_fingerprinter(name: str, **kwargs) -> Fingerprinter:
     """通过名称获取指纹方法实例."""
+    _load_builtin(name)
     if name not in _REGISTRY:
-        available = ", ".join(sorted(_REGISTRY.keys()))
+        available = ", ".join(sorted(_REGISTRY.keys() | set(_BUILTIN_METHODS)))
         raise ValueError(f"未知指纹方法: {name}。可用方法: {available}")
     return _REGISTRY[name](**kwargs)
 
 
 def list_methods() -> dict[str, str]:
     """列出所有已注册方法. 返回 {name: type}."""
-    return {name: cls().fingerprint_type for name, cls in sorted(_REGISTRY.items())}
+    for name in _BUILTIN_METHODS:
+        _load_builtin(name)
+    return {name: _fingerprint_type(cls) for name, cls in sorted(_REGISTRY.items())}
+
+
+def _fingerprint_type(cls: type[Fingerprinter]) -> str:
+    # 内置方法用类属性, 免实例化; 插件若按抽象属性实现为 property, 则从实例上取值
+    value = cls.fingerprint_type
+    if isinstance(value, str):
+        return value
+    return cls().fingerprint_type
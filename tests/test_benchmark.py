@@ -1,5 +1,11 @@
 """测试 benchmark 数据集与准确率评估."""
 
+import dataclasses
+import subprocess
+import sys
+
+import pytest
+
 from modelaudit.benchmark import (
     BENCHMARK_SAMPLES,
     BenchmarkSample,
@@ -19,6 +25,25 @@ class TestBenchmarkSamples:
             assert s.label
             assert s.category
 
+    def test_sample_is_immutable(self):
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            BENCHMARK_SAMPLES[0].label = "other"
+        assert not hasattr(BENCHMARK_SAMPLES[0], "__dict__")
+
+    def test_samples_loaded_lazily(self):
+        code = (
+            "import modelaudit.benchmark as b; "
+            "assert b._load_samples.cache_info().currsize == 0; "
+            "assert len(b.BENCHMARK_SAMPLES) > 0"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_unknown_attribute(self):
+        import modelaudit.benchmark as b
+
+        with pytest.raises(AttributeError):
+            b.NOT_A_THING  # noqa: B018
+
     def test_multiple_labels(self):
         labels = {s.label for s in BENCHMARK_SAMPLES}
         assert len(labels) >= 4  # 至少 4 个模型家族
@@ -50,6 +75,20 @@ class TestGetBenchmarkSamples:
     def test_no_match(self):
         assert get_benchmark_samples(label="nonexistent") == []
 
+    def test_filter_matches_linear_scan(self):
+        for category in ("qa", "code", "reasoning", "creative", None):
+            for label in ("gpt-4", "claude", "qwen", None):
+                expected = [
+                    s for s in BENCHMARK_SAMPLES
+                    if (not category or s.category == category)
+                    and (not label or s.label == label)
+                ]
+                assert get_benchmark_samples(category=category, label=label) == expected
+
+    def test_filtered_result_is_a_copy(self):
+        get_benchmark_samples(label="claude").clear()
+        assert len(get_benchmark_samples(label="claude")) > 0
+
 
 class TestEvaluateAccuracy:
     def test_perfect(self):
@@ -77,3 +116,9 @@ class TestEvaluateAccuracy:
         preds = [("a", "a"), ("a", "a"), ("b", "a")]
         result = evaluate_accuracy(preds)
         assert result["per_class"]["a"] == 2 / 3
+
+    def test_per_class_keeps_first_seen_order_and_labels(self):
+        preds = [("c", "c"), ("b", "a"), ("x", None), ("a", "a")]
+        result = evaluate_accuracy(preds)
+        assert list(result["per_class"]) == ["c", "a", None]
+        assert result["per_class"][None] == 0.0
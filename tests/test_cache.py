@@ -1,8 +1,12 @@
 """测试指纹缓存."""
 
+import asyncio
 import json
+import os
+import threading
 import time
 
+import modelaudit.cache as cache_mod
 from modelaudit.cache import FingerprintCache
 from modelaudit.models import Fingerprint
 
@@ -46,6 +50,44 @@ class TestFingerprintCache:
         result = cache.get("bad-model", "llmmap", "openai")
         assert result is None
 
+    def test_get_non_object_json(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+        key = FingerprintCache._key("model", "llmmap", "openai")
+        (tmp_path / "cache" / f"{key}.json").write_text("[1, 2]", encoding="utf-8")
+
+        assert cache.get("model", "llmmap", "openai") is None
+
+    def test_put_leaves_no_temp_file(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+        cache.put("model", "llmmap", "openai", _make_fp())
+
+        assert list((tmp_path / "cache").glob("*.tmp")) == []
+        assert len(list((tmp_path / "cache").glob("*.json"))) == 1
+
+    def test_concurrent_put_same_key(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        errors: list[BaseException] = []
+
+        def _worker():
+            try:
+                for _ in range(50):
+                    cache.put("model", "llmmap", "openai", _make_fp())
+            except BaseException as e:  # noqa: BLE001
+                errors.append(e)
+
+        threads = [threading.Thread(target=_worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert list((tmp_path / "cache").glob("*.tmp")) == []
+        fresh = FingerprintCache(str(tmp_path / "cache"))
+        assert fresh.get("model", "llmmap", "openai").model_id == "test-model"
+
     def test_list_entries_empty(self, tmp_path):
         cache = FingerprintCache(str(tmp_path / "cache"))
         entries = cache.list_entries()
@@ -78,6 +120,43 @@ class TestFingerprintCache:
         bad_entry = [e for e in entries if e["model"] == "?"]
         assert len(bad_entry) == 1
 
+    def test_list_entries_uses_index(self, tmp_path, monkeypatch):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model-a", "llmmap", "openai", _make_fp("model-a"))
+        cache.put("model-b", "dli", "openai", _make_fp("model-b", method="dli"))
+        assert (tmp_path / "cache" / "_index.jsonl").exists()
+
+        real_loads = cache_mod._loads
+
+        def _loads(raw):
+            assert b'"data"' not in raw, "不应解析指纹文件"
+            return real_loads(raw)
+
+        monkeypatch.setattr(cache_mod, "_loads", _loads)
+        entries = cache.list_entries()
+        assert {(e["model"], e["method"]) for e in entries} == {
+            ("model-a", "llmmap"), ("model-b", "dli"),
+        }
+
+    def test_list_entries_skips_deleted_files(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model-a", "llmmap", "openai", _make_fp("model-a"))
+        cache.put("model-b", "llmmap", "openai", _make_fp("model-b"))
+        key = FingerprintCache._key("model-a", "llmmap", "openai")
+        (tmp_path / "cache" / f"{key}.json").unlink()
+
+        entries = cache.list_entries()
+        assert [e["model"] for e in entries] == ["model-b"]
+
+    def test_index_compacted_after_overwrites(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        for _ in range(5):
+            cache.put("model-a", "llmmap", "openai", _make_fp("model-a"))
+
+        assert len(cache.list_entries()) == 1
+        index = (tmp_path / "cache" / "_index.jsonl").read_text(encoding="utf-8")
+        assert len(index.splitlines()) == 1
+
     def test_clear(self, tmp_path):
         cache = FingerprintCache(str(tmp_path / "cache"))
         cache.put("model-a", "llmmap", "openai", _make_fp("model-a"))
@@ -86,6 +165,15 @@ class TestFingerprintCache:
         count = cache.clear()
         assert count == 2
         assert cache.list_entries() == []
+        assert not (tmp_path / "cache" / "_index.jsonl").exists()
+
+    def test_clear_removes_leftover_temp_files(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+        (tmp_path / "cache" / "stale.json.123.456.tmp").write_bytes(b"{")
+
+        assert cache.clear() == 1
+        assert list((tmp_path / "cache").glob("*.tmp")) == []
 
     def test_clear_empty(self, tmp_path):
         cache = FingerprintCache(str(tmp_path / "cache"))
@@ -148,6 +236,120 @@ class TestFingerprintCache:
         assert r2.data["vector"]["avg_length_chars"] == 200.0
 
 
+class TestMemoryCache:
+    def test_repeated_get_skips_disk_parse(self, tmp_path, monkeypatch):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("不应重新解析缓存文件")
+
+        monkeypatch.setattr(cache_mod, "_loads", _fail)
+        first = cache.get("model", "llmmap", "openai")
+        second = cache.get("model", "llmmap", "openai")
+        assert first is not None
+        assert first is second
+
+    def test_file_change_invalidates_memory(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+        path = tmp_path / "cache" / f"{FingerprintCache._key('model', 'llmmap', 'openai')}.json"
+
+        data = json.loads(path.read_text(encoding="utf-8"))
+        data["data"]["vector"]["avg_length_chars"] = 42.0
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+        result = cache.get("model", "llmmap", "openai")
+        assert result is not None
+        assert result.data["vector"]["avg_length_chars"] == 42.0
+
+    def test_deleted_file_misses(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+        cache.clear()
+        assert cache.get("model", "llmmap", "openai") is None
+
+    def test_stdlib_json_fallback(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(cache_mod, "orjson", None)
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("模型", "llmmap", "openai", _make_fp("模型"))
+
+        fresh = FingerprintCache(str(tmp_path / "cache"))
+        result = fresh.get("模型", "llmmap", "openai")
+        assert result is not None
+        assert result.model_id == "模型"
+        assert fresh.list_entries()[0]["model"] == "模型"
+
+    def test_lru_eviction(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"), max_memory_entries=2)
+        for name in ("a", "b", "c"):
+            cache.put(name, "llmmap", "openai", _make_fp(name))
+
+        assert len(cache._mem) == 2
+        assert FingerprintCache._key("a", "llmmap", "openai") not in cache._mem
+        # 被淘汰的条目仍可从磁盘读回
+        assert cache.get("a", "llmmap", "openai") is not None
+
+
+class TestBatchAccess:
+    def test_get_many(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model-a", "llmmap", "openai", _make_fp("model-a"))
+
+        result = cache.get_many([
+            ("model-a", "llmmap", "openai"),
+            ("model-b", "llmmap", "openai"),
+        ])
+        assert result[("model-a", "llmmap", "openai")].model_id == "model-a"
+        assert result[("model-b", "llmmap", "openai")] is None
+
+    def test_get_many_concurrent_preserves_order(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        models = [f"model-{i}" for i in range(12)]
+        for m in models[::2]:
+            cache.put(m, "llmmap", "openai", _make_fp(m))
+
+        reqs = [(m, "llmmap", "openai") for m in models]
+        result = cache.get_many(reqs + reqs[:3], max_workers=4)
+        assert list(result) == reqs
+        assert [fp.model_id for fp in result.values() if fp] == models[::2]
+        assert all(result[req] is None for req in reqs[1::2])
+
+    def test_warm_fetches_only_misses(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model-a", "llmmap", "openai", _make_fp("model-a"))
+        fetched: list[str] = []
+
+        async def fetch(model, method, provider):
+            fetched.append(model)
+            await asyncio.sleep(0)
+            return _make_fp(model, method)
+
+        requests = [(m, "llmmap", "openai") for m in ("model-a", "model-b", "model-c")]
+        result = asyncio.run(cache.warm(requests, fetch, concurrency=2))
+
+        assert sorted(fetched) == ["model-b", "model-c"]
+        assert {fp.model_id for fp in result.values()} == {"model-a", "model-b", "model-c"}
+        assert cache.get("model-c", "llmmap", "openai") is not None
+
+    def test_warm_respects_concurrency(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        active = 0
+        peak = 0
+
+        async def fetch(model, method, provider):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return _make_fp(model, method)
+
+        requests = [(f"m{i}", "llmmap", "openai") for i in range(6)]
+        asyncio.run(cache.warm(requests, fetch, concurrency=2))
+        assert peak == 2
+
+
 class TestCacheTTL:
     def test_ttl_not_expired(self, tmp_path):
         cache = FingerprintCache(str(tmp_path / "cache"), ttl=3600)
@@ -168,40 +370,131 @@ class TestCacheTTL:
         fp = _make_fp()
         cache.put("model", "llmmap", "openai", fp)
 
-        # 手动修改 _cached_at 使其过期
+        # 把文件 mtime 改到 10 秒前使其过期
         path = self._get_cache_file(tmp_path / "cache", "model", "llmmap", "openai")
-        data = json.loads(path.read_text(encoding="utf-8"))
-        data["_cached_at"] = time.time() - 10  # 10 秒前
-        path.write_text(json.dumps(data), encoding="utf-8")
+        old = time.time() - 10
+        os.utime(path, (old, old))
 
         result = cache.get("model", "llmmap", "openai")
         assert result is None
+        assert not path.exists()
+
+    def test_ttl_expired_skips_parse(self, tmp_path, monkeypatch):
+        cache = FingerprintCache(str(tmp_path / "cache"), ttl=1)
+        cache.put("model", "llmmap", "openai", _make_fp())
+        path = self._get_cache_file(tmp_path / "cache", "model", "llmmap", "openai")
+        old = time.time() - 10
+        os.utime(path, (old, old))
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("过期条目不应被解析")
+
+        monkeypatch.setattr(cache_mod, "_loads", _fail)
+        assert cache.get("model", "llmmap", "openai") is None
 
     def test_ttl_zero_means_no_expiry(self, tmp_path):
         cache = FingerprintCache(str(tmp_path / "cache"), ttl=0)
         fp = _make_fp()
         cache.put("model", "llmmap", "openai", fp)
 
-        # 手动修改 _cached_at 为很久以前
+        # 把文件 mtime 改到很久以前
         path = self._get_cache_file(tmp_path / "cache", "model", "llmmap", "openai")
-        data = json.loads(path.read_text(encoding="utf-8"))
-        data["_cached_at"] = time.time() - 999999
-        path.write_text(json.dumps(data), encoding="utf-8")
+        old = time.time() - 999999
+        os.utime(path, (old, old))
 
         result = cache.get("model", "llmmap", "openai")
         assert result is not None
 
-    def test_ttl_missing_cached_at(self, tmp_path):
-        """旧格式缓存文件没有 _cached_at 字段，TTL 开启时应视为过期."""
+    def test_legacy_cached_at_field_ignored(self, tmp_path):
+        """旧格式缓存文件带 _cached_at 字段，仍应能正常读取."""
         cache = FingerprintCache(str(tmp_path / "cache"), ttl=3600)
         fp = _make_fp()
         cache.put("model", "llmmap", "openai", fp)
 
-        # 删除 _cached_at 字段
         path = self._get_cache_file(tmp_path / "cache", "model", "llmmap", "openai")
         data = json.loads(path.read_text(encoding="utf-8"))
-        data.pop("_cached_at", None)
+        assert "_cached_at" not in data
+        data["_cached_at"] = 0
         path.write_text(json.dumps(data), encoding="utf-8")
 
         result = cache.get("model", "llmmap", "openai")
-        assert result is None  # _cached_at=0, 总是过期
+        assert result is not None
+        assert result.model_id == "test-model"
+
+    def test_entry_path_memoized(self, tmp_path, monkeypatch):
+        """同一 (model, method, provider) 只计算一次 key 与路径."""
+        cache = FingerprintCache(str(tmp_path / "cache"))
+        cache.put("model", "llmmap", "openai", _make_fp())
+
+        def _fail(*args, **kwargs):
+            raise AssertionError("key 应已缓存")
+
+        monkeypatch.setattr(cache, "_key", _fail)
+        assert cache.get("model", "llmmap", "openai") is not None
+        key, path = cache._entry("model", "llmmap", "openai")
+        assert path == tmp_path / "cache" / f"{key}.json"
+
+
+class TestDetectionCache:
+    def _result(self, text_id=0):
+        from modelaudit.models import DetectionResult
+
+        return DetectionResult(
+            text_id=text_id, predicted_model="gpt-4", confidence=0.5, scores={"gpt-4": 0.5}
+        )
+
+    def test_roundtrip(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path))
+        key = cache.detection_key("some text")
+        assert cache.get_detection(key) is None
+        cache.put_detection(key, self._result())
+        assert cache.get_detection(key) == self._result()
+
+    def test_key_depends_on_namespace(self):
+        k1 = FingerprintCache.detection_key("abc", "style@1")
+        k2 = FingerprintCache.detection_key("abc", "style@2")
+        assert k1 != k2
+        assert k1 == FingerprintCache.detection_key("abc", "style@1")
+
+    def test_ttl_expiry(self, tmp_path, monkeypatch):
+        cache = FingerprintCache(str(tmp_path), ttl=60)
+        key = cache.detection_key("x")
+        cache.put_detection(key, self._result())
+        now = time.time()
+        monkeypatch.setattr(cache_mod.time, "time", lambda: now + 120)
+        assert cache.get_detection(key) is None
+
+    def test_corrupt_line_skipped(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path))
+        k1, k2 = cache.detection_key("x"), cache.detection_key("y")
+        cache.put_detection(k1, self._result())
+        with open(tmp_path / "detections.jsonl", "ab") as f:
+            f.write(b"{bad\n")
+        cache.put_detection(k2, self._result(1))
+        fresh = FingerprintCache(str(tmp_path))
+        assert fresh.get_detections([k1, k2]) == [self._result(), self._result(1)]
+
+    def test_batch_written_in_one_file(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path))
+        keys = [cache.detection_key(f"t{i}") for i in range(50)]
+        cache.put_detections([(k, self._result(i)) for i, k in enumerate(keys)])
+        assert [p.name for p in tmp_path.iterdir()] == ["detections.jsonl"]
+        assert len((tmp_path / "detections.jsonl").read_bytes().splitlines()) == 50
+        fresh = FingerprintCache(str(tmp_path))
+        assert fresh.get_detections(keys) == [self._result(i) for i in range(50)]
+
+    def test_sees_writes_from_other_instance(self, tmp_path):
+        a = FingerprintCache(str(tmp_path))
+        b = FingerprintCache(str(tmp_path))
+        key = a.detection_key("x")
+        assert b.get_detection(key) is None
+        a.put_detection(key, self._result())
+        assert b.get_detection(key) == self._result()
+        b.put_detection(a.detection_key("y"), self._result(1))
+        assert a.get_detection(a.detection_key("y")) == self._result(1)
+
+    def test_clear_removes_detections(self, tmp_path):
+        cache = FingerprintCache(str(tmp_path))
+        cache.put_detection(cache.detection_key("x"), self._result())
+        assert cache.clear() == 1
+        assert cache.list_entries() == []
@@ -4,11 +4,18 @@ import json
 import tempfile
 from pathlib import Path
 
+import pytest
 from click.testing import CliRunner
 
 from modelaudit.cli import main
 
 
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    """detect 默认写检测缓存到 .modelaudit_cache，测试中隔离到临时目录."""
+    monkeypatch.chdir(tmp_path)
+
+
 class TestCLI:
     def test_version(self):
         runner = CliRunner()
@@ -167,6 +174,28 @@ class TestCLI:
         content = output_file.read_text(encoding="utf-8")
         assert "id,predicted_model" in content
 
+    def test_detect_csv_quoting_roundtrip(self, tmp_path):
+        import csv
+        import io
+
+        input_file = tmp_path / "input.jsonl"
+        text = 'He said "hi", then, well, left'
+        input_file.write_text(json.dumps({"text": text}) + "\n", encoding="utf-8")
+        output_file = tmp_path / "result.csv"
+
+        result = CliRunner().invoke(main, [
+            "detect", str(input_file), "-f", "csv", "-o", str(output_file), "--no-cache",
+        ])
+        assert result.exit_code == 0
+        with open(output_file, encoding="utf-8", newline="") as f:
+            saved = list(csv.reader(f))
+        csv_start = result.output.index("id,predicted_model")
+        printed = list(csv.reader(io.StringIO(result.output[csv_start:])))[: len(saved)]
+        assert saved == printed
+        assert saved[0] == ["id", "predicted_model", "confidence", "text_preview"]
+        assert saved[1][0] == "0"
+        assert saved[1][3] == text
+
     def test_detect_with_field(self):
         runner = CliRunner()
 
@@ -240,3 +269,327 @@ class TestCSVValidation:
         runner = CliRunner()
         result = runner.invoke(main, ["detect", str(csv_file)])
         assert result.exit_code == 0
+
+    @pytest.mark.parametrize("field", [None, "content", "missing"])
+    def test_csv_matches_dictreader(self, tmp_path, field):
+        """按列下标流式读取的结果应与 DictReader 逐行提取一致."""
+        import csv
+
+        from modelaudit.cli import _extract_text, _load_texts
+
+        csv_file = tmp_path / "mixed.csv"
+        csv_file.write_text(
+            'id,text,content\n1,"多行\n文本",x\n\n2,,fallback\n3\n4,dup,y,extra\n',
+            encoding="utf-8",
+        )
+        with open(csv_file, encoding="utf-8", newline="") as f:
+            expected = [t for row in csv.DictReader(f) if (t := _extract_text(row, field))]
+        assert _load_texts(str(csv_file), field=field) == expected
+
+    def test_csv_header_only(self, tmp_path):
+        from modelaudit.cli import _load_texts
+
+        csv_file = tmp_path / "empty.csv"
+        csv_file.write_text("name,age\n", encoding="utf-8")
+        assert _load_texts(str(csv_file)) == []
+
+
+class TestLoadTexts:
+    def test_jsonl_skips_blank_and_malformed_lines(self, tmp_path):
+        from modelaudit.cli import _load_texts
+
+        data = tmp_path / "data.jsonl"
+        data.write_text(
+            json.dumps({"text": "第一条"}, ensure_ascii=False) + "\n"
+            "\n"
+            "{not json\n"
+            + json.dumps({"content": "second"}) + "\n",
+            encoding="utf-8",
+        )
+        assert _load_texts(str(data)) == ["第一条", "second"]
+
+    def test_json_list(self, tmp_path):
+        from modelaudit.cli import _load_texts
+
+        data = tmp_path / "data.json"
+        data.write_text(json.dumps(["a", {"output": "b"}, {"other": "c"}]), encoding="utf-8")
+        assert _load_texts(str(data)) == ["a", "b"]
+
+    def test_txt_paragraphs(self, tmp_path):
+        from modelaudit.cli import _load_texts
+
+        data = tmp_path / "data.txt"
+        data.write_text("  first\nline \n\n \n\n\n\nsecond\n\n\nthird\n", encoding="utf-8")
+        assert _load_texts(str(data)) == ["first\nline", "second", "third"]
+
+
+class TestDetectCache:
+    def test_second_run_served_from_cache(self, tmp_path):
+        data = tmp_path / "data.jsonl"
+        data.write_text(
+            "\n".join(json.dumps({"text": f"I'd be happy to help with item {i}."}) for i in range(3)),
+            encoding="utf-8",
+        )
+        runner = CliRunner()
+        first = runner.invoke(main, ["detect", str(data), "-f", "json"])
+        assert first.exit_code == 0
+        assert (tmp_path / ".modelaudit_cache" / "detections.jsonl").exists()
+
+        from unittest.mock import patch
+
+        with patch("modelaudit.methods.style.detect_text_source") as mock_detect:
+            second = runner.invoke(main, ["detect", str(data), "-f", "json"])
+        assert second.exit_code == 0
+        mock_detect.assert_not_called()
+        assert second.output == first.output
+
+    def test_no_cache_flag(self, tmp_path):
+        data = tmp_path / "data.txt"
+        data.write_text("hello world", encoding="utf-8")
+        runner = CliRunner()
+        result = runner.invoke(main, ["detect", str(data), "--no-cache"])
+        assert result.exit_code == 0
+        assert not (tmp_path / ".modelaudit_cache").exists()
+
+
+class TestPickExtractor:
+    ROWS = [
+        {"text": "a"},
+        {"text": "", "content": "b"},
+        {"content": "c"},
+        {"output": "d"},
+        {"other": "e"},
+        "plain",
+        {"text": None, "output": "f"},
+    ]
+
+    @pytest.mark.parametrize("field", [None, "content", "missing"])
+    @pytest.mark.parametrize("first", [0, 2, 5])
+    def test_matches_generic_extraction(self, field, first):
+        from modelaudit.cli import _extract_text, _pick_extractor
+
+        extract = _pick_extractor(self.ROWS[first], field)
+        assert [extract(r) for r in self.ROWS] == [_extract_text(r, field) for r in self.ROWS]
+
+
+class TestLazyImports:
+    def test_lazy_module_cached(self):
+        import modelaudit.report
+        from modelaudit.cli import _lazy
+
+        assert _lazy("report") is modelaudit.report
+        assert _lazy("report") is _lazy("report")
+
+    def test_table_without_rich(self, tmp_path):
+        from unittest.mock import patch
+
+        data = tmp_path / "data.txt"
+        data.write_text("\n\n".join(f"paragraph {i}" for i in range(12)), encoding="utf-8")
+        with patch("modelaudit.cli._rich", return_value=None):
+            result = CliRunner().invoke(main, ["detect", str(data), "--no-cache"])
+        assert result.exit_code == 0
+        assert "正在分析 12 条文本" in result.output
+        assert "预测模型" in result.output
+
+
+class TestShortTextWarning:
+    def test_counts_texts_under_ten_words(self, tmp_path):
+        data = tmp_path / "data.txt"
+        data.write_text(
+            "one two three\n\n" + "w\t" * 9 + "\n\n" + " ".join(["word"] * 10),
+            encoding="utf-8",
+        )
+        result = CliRunner().invoke(main, ["detect", str(data), "--no-cache"])
+        assert result.exit_code == 0
+        assert "⚠ 2 条文本少于 10 个词" in result.stderr
+
+
+class TestJsonOutput:
+    def test_adapter_matches_stdlib_layout(self):
+        from modelaudit.cli import _detection_adapter
+        from modelaudit.models import DetectionResult
+
+        results = [
+            DetectionResult(
+                text_id=0, text_preview='中文 "引号"', predicted_model="gpt-4",
+                confidence=0.5, scores={"gpt-4": 0.5},
+            )
+        ]
+        raw = _detection_adapter().dump_json(results, indent=2)
+        expected = json.dumps([r.model_dump() for r in results], ensure_ascii=False, indent=2)
+        assert raw == expected.encode("utf-8")
+
+    def test_detect_json_file_matches_stdout(self, tmp_path):
+        data = tmp_path / "data.txt"
+        data.write_text("第一段文本\n\nsecond paragraph", encoding="utf-8")
+        out = tmp_path / "out.json"
+        result = CliRunner().invoke(main, ["detect", str(data), "-f", "json", "-o", str(out)])
+        assert result.exit_code == 0
+        saved = json.loads(out.read_bytes())
+        assert [r["text_preview"] for r in saved] == ["第一段文本", "second paragraph"]
+        assert out.read_text(encoding="utf-8") in result.output
+
+
+class TestDetectSerializeOnce:
+    def test_json_stdout_and_file_dump_once(self, tmp_path):
+        from unittest.mock import patch
+
+        import modelaudit.cli as cli_mod
+
+        data = tmp_path / "data.txt"
+        data.write_text("hello there", encoding="utf-8")
+        out = tmp_path / "out.json"
+        with patch.object(cli_mod, "_detection_adapter", wraps=cli_mod._detection_adapter) as dumps:
+            result = CliRunner().invoke(
+                main, ["detect", str(data), "-f", "json", "-o", str(out), "--no-cache"]
+            )
+        assert result.exit_code == 0
+        assert dumps.call_count == 1
+        assert json.loads(out.read_bytes())[0]["text_preview"] == "hello there"
+
+    def test_table_with_output_still_saves_json(self, tmp_path):
+        data = tmp_path / "data.txt"
+        data.write_text("hello there", encoding="utf-8")
+        out = tmp_path / "out.json"
+        result = CliRunner().invoke(main, ["detect", str(data), "-o", str(out), "--no-cache"])
+        assert result.exit_code == 0
+        assert len(json.loads(out.read_bytes())) == 1
+
+
+class TestSourceDistribution:
+    def test_sorted_by_count_desc(self):
+        from unittest.mock import patch
+
+        from modelaudit.models import DetectionResult
+
+        fake = [
+            DetectionResult(text_id=i, predicted_model=m, confidence=0.5)
+            for i, m in enumerate(["claude", "gpt-4", "gpt-4", "llama", "gpt-4", "claude"])
+        ]
+        Path("data.txt").write_text("\n\n".join(f"text {i}" for i in range(6)), encoding="utf-8")
+        with patch("modelaudit.engine.AuditEngine.detect", return_value=fake):
+            result = CliRunner().invoke(main, ["detect", "data.txt", "--no-cache"])
+        assert result.exit_code == 0
+        dist = result.output.split("来源分布:")[1].split()
+        assert dist[0::3] == ["gpt-4:", "claude:", "llama:"]
+        assert dist[1::3] == ["3", "2", "1"]
+        assert "(50.0%)" in result.output
+
+
+class TestEntryPoints:
+    def test_package_exports_main(self):
+        import modelaudit
+
+        assert modelaudit.main is main
+
+    def test_import_does_not_load_cli(self):
+        import subprocess
+        import sys
+
+        code = "import sys, modelaudit; print('modelaudit.cli' in sys.modules)"
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == "False"
+
+    def test_python_m_modelaudit(self):
+        import subprocess
+        import sys
+
+        out = subprocess.run(
+            [sys.executable, "-m", "modelaudit", "--version"], capture_output=True, text=True
+        )
+        assert out.returncode == 0
+        assert "0.4" in out.stdout
+
+
+class TestRichGuard:
+    def test_small_input_skips_rich(self, tmp_path):
+        from unittest.mock import patch
+
+        data = tmp_path / "data.txt"
+        data.write_text("only one paragraph", encoding="utf-8")
+        with patch("modelaudit.cli._rich") as rich:
+            result = CliRunner().invoke(main, ["detect", str(data), "-f", "json", "--no-cache"])
+        assert result.exit_code == 0
+        rich.assert_not_called()
+
+
+class TestDedupe:
+    def test_dedupe_and_expand(self):
+        from modelaudit.cli import _dedupe, _expand_results
+        from modelaudit.models import DetectionResult
+
+        texts = ["a", "b", "a", "c", "b", "a"]
+        uniq, inverse = _dedupe(texts)
+        assert uniq == ["a", "b", "c"]
+        assert [uniq[i] for i in inverse] == texts
+
+        unique_results = [
+            DetectionResult(text_id=i, text_preview=t, predicted_model="m", confidence=0.5)
+            for i, t in enumerate(uniq)
+        ]
+        results = _expand_results(unique_results, inverse)
+        assert [r.text_id for r in results] == list(range(6))
+        assert [r.text_preview for r in results] == texts
+        assert len({id(r) for r in results}) == 6
+
+    def test_detect_runs_each_text_once(self, tmp_path):
+        from unittest.mock import patch
+
+        from modelaudit.methods.style import detect_text_source
+
+        data = tmp_path / "data.jsonl"
+        data.write_text(
+            "\n".join(json.dumps({"text": t}) for t in ["same", "other", "same", "same"]),
+            encoding="utf-8",
+        )
+        with patch(
+            "modelaudit.methods.style.detect_text_source", wraps=detect_text_source
+        ) as mock_detect:
+            result = CliRunner().invoke(main, ["detect", str(data), "-f", "json", "--no-cache"])
+        assert result.exit_code == 0
+        mock_detect.assert_called_once_with(["same", "other"])
+        out = json.loads(result.output[result.output.index("["):result.output.rindex("]") + 1])
+        assert [r["text_id"] for r in out] == [0, 1, 2, 3]
+        assert [r["text_preview"] for r in out] == ["same", "other", "same", "same"]
+
+
+class TestSetupLogging:
+    def test_configures_once(self, monkeypatch):
+        from unittest.mock import patch
+
+        import modelaudit.cli as cli_mod
+
+        monkeypatch.setattr(cli_mod, "_logging_configured", False)
+        with patch("modelaudit.cli.logging.basicConfig") as basic:
+            CliRunner().invoke(main, ["-v", "benchmark", "--label", "claude"])
+            CliRunner().invoke(main, ["benchmark", "--label", "claude"])
+        basic.assert_called_once()
+
+
+class TestConcurrencyOption:
+    def _invoke(self, args):
+        from unittest.mock import patch
+
+        from modelaudit.models import ComparisonResult
+
+        cmp = ComparisonResult(
+            model_a="a", model_b="b", method="llmmap",
+            similarity=0.5, is_derived=False, threshold=0.85, confidence=0.5,
+        )
+        with patch("modelaudit.cli.AuditEngine") as engine_cls:
+            engine_cls.return_value.compare.return_value = cmp
+            result = CliRunner().invoke(main, args)
+        return result, engine_cls.call_args.args[0]
+
+    def test_sets_max_concurrency(self):
+        result, config = self._invoke(["compare", "a", "b", "-j", "16"])
+        assert result.exit_code == 0
+        assert config.max_concurrency == 16
+
+    def test_default_and_bounds(self):
+        from modelaudit.config import DEFAULT_CONFIG
+
+        _, config = self._invoke(["compare", "a", "b"])
+        assert config.max_concurrency == DEFAULT_CONFIG.max_concurrency
+        result = CliRunner().invoke(main, ["compare", "a", "b", "-j", "0"])
+        assert result.exit_code != 0
@@ -1,13 +1,17 @@
 """测试 DLI 蒸馏检测方法."""
 
+import math
+
 import pytest
 
 from modelaudit.methods.dli import (
     DLIFingerprinter,
+    _behavior_similarity_parts,
     _compute_behavior_similarity,
     _extract_behavior_signature,
     _extract_ngrams,
     _js_divergence,
+    _neg_entropy,
 )
 from modelaudit.models import Fingerprint
 
@@ -29,6 +33,10 @@ class TestExtractNgrams:
         assert ngrams["a b"] == 3
         assert ngrams["b a"] == 2
 
+    def test_trigram(self):
+        ngrams = _extract_ngrams("The quick brown fox", n=3)
+        assert ngrams == {"the quick brown": 1, "quick brown fox": 1}
+
 
 class TestJSDivergence:
     def test_identical(self):
@@ -50,6 +58,15 @@ class TestJSDivergence:
         js = _js_divergence(p, q)
         assert 0 < js
 
+    def test_precomputed_neg_entropy(self):
+        p = {"a": 2.0, "b": 1.0, "c": 1.0}
+        q = {"a": 1.0, "d": 3.0}
+        assert _neg_entropy({"a": 0.5, "b": 0.5}) == pytest.approx(-math.log(2))
+        assert _js_divergence(p, q, _neg_entropy(p), _neg_entropy(q)) == pytest.approx(
+            _js_divergence(p, q)
+        )
+        assert _js_divergence({"a": 1.0}, {"b": 1.0}) == pytest.approx(math.log(2))
+
 
 class TestExtractBehaviorSignature:
     def test_basic(self):
@@ -62,6 +79,20 @@ class TestExtractBehaviorSignature:
         assert "features" in sig
         assert sig["features"]["avg_length"] > 0
         assert 0 <= sig["features"]["vocab_diversity"] <= 1
+        assert sig["bigram_neg_entropy"] == pytest.approx(_neg_entropy(sig["bigram_dist"]))
+
+    def test_bigrams_do_not_cross_responses(self):
+        sig = _extract_behavior_signature(["alpha beta", "gamma delta"])
+        assert set(sig["bigram_dist"]) == {"alpha beta", "gamma delta"}
+
+    def test_marker_rates_keep_substring_semantics(self):
+        responses = ["I'd rather not. Perhaps it COULDN'T be.", "Certainly, mighty clearly."]
+        sig = _extract_behavior_signature(responses)
+        feats = sig["features"]
+        assert feats["refusal_rate"] == 0.5
+        # "couldn't" 与 "mighty" 按子串计入
+        assert feats["hedging_rate"] == pytest.approx(3 / 12)
+        assert feats["certainty_rate"] == pytest.approx(2 / 12)
 
     def test_empty(self):
         sig = _extract_behavior_signature([])
@@ -110,6 +141,15 @@ class TestBehaviorSimilarity:
         sim = _compute_behavior_similarity(sig, sig)
         assert sim >= 0
 
+    def test_parts_expose_js_divergence(self):
+        sig_a = {"bigram_dist": {"a b": 0.5, "b c": 0.5}, "features": {"x": 1.0}}
+        sig_b = {"bigram_dist": {"a b": 1.0}, "features": {"x": 1.0, "y": 1.0}}
+        sim, js = _behavior_similarity_parts(sig_a, sig_b)
+        assert js == pytest.approx(_js_divergence(sig_a["bigram_dist"], sig_b["bigram_dist"]))
+        expected = (1 - js / math.log(2)) * 0.4 + (1 / math.sqrt(2)) * 0.6
+        assert sim == pytest.approx(expected)
+        assert _compute_behavior_similarity(sig_a, sig_b) == sim
+
 
 class TestDLIFingerprinter:
     def test_init(self):
@@ -4,6 +4,7 @@ from unittest.mock import patch
 
 import pytest
 
+from modelaudit import __version__
 from modelaudit.config import AuditConfig
 from modelaudit.engine import AuditEngine
 from modelaudit.models import Fingerprint
@@ -45,6 +46,33 @@ class TestAuditEngine:
             engine.fingerprint("   ")
 
 
+class TestFingerprintKwargs:
+    def _captured(self, method, **kwargs):
+        engine = AuditEngine(AuditConfig(num_probes=12, api_key="k"), use_cache=False)
+        with patch("modelaudit.engine.get_fingerprinter") as factory:
+            engine.fingerprint("m", method=method, **kwargs)
+        return engine, factory.call_args.kwargs
+
+    def test_llmmap_uses_config_defaults(self):
+        engine, kw = self._captured("llmmap")
+        assert kw["num_probes"] == 12
+        assert kw["api_key"] == "k"
+        assert kw["slots"] is engine._endpoint_slots("openai", "")
+
+    def test_dli_default_probe_count_and_override(self):
+        _, kw = self._captured("dli")
+        assert kw["num_probes"] == 8
+        _, kw = self._captured("dli", num_probes=3, api_base="https://x")
+        assert kw["num_probes"] == 3
+        assert kw["api_base"] == "https://x"
+
+    def test_reef_and_unknown_methods(self):
+        _, kw = self._captured("reef", device="cuda")
+        assert kw == {"device": "cuda"}
+        _, kw = self._captured("custom-method")
+        assert kw == {}
+
+
 class TestAuditConfig:
     def test_default_values(self):
         config = AuditConfig()
@@ -82,6 +110,52 @@ class TestAuditConfig:
         assert engine.cache is not None
         assert engine.cache.ttl == 7200
 
+    def test_frozen(self):
+        from pydantic import ValidationError
+
+        config = AuditConfig()
+        with pytest.raises(ValidationError):
+            config.provider = "anthropic"
+
+    def test_rate_limits_read_only(self):
+        from modelaudit.config import DEFAULT_CONFIG
+
+        limits = {"openai": (60, 0)}
+        config = AuditConfig(rate_limits=limits)
+        limits["anthropic"] = (1, 1)
+        assert dict(config.rate_limits) == {"openai": (60, 0)}
+        with pytest.raises(TypeError):
+            config.rate_limits["anthropic"] = (1, 1)
+        with pytest.raises(TypeError):
+            DEFAULT_CONFIG.rate_limits["openai"] = (1, 1)
+        assert config.model_dump()["rate_limits"] == {"openai": (60, 0)}
+        assert AuditConfig.model_validate_json(config.model_dump_json()) == config
+
+    def test_prewarm_models_is_tuple(self):
+        config = AuditConfig(prewarm_models=["a", "b"])
+        assert config.prewarm_models == ("a", "b")
+        assert AuditConfig().prewarm_models == ()
+
+    def test_get_config_reuses_default(self):
+        from modelaudit.config import DEFAULT_CONFIG, get_config
+
+        assert get_config() is DEFAULT_CONFIG
+        assert get_config(provider="openai", api_key="", similarity_threshold=0.85) is DEFAULT_CONFIG
+        assert AuditEngine().config is DEFAULT_CONFIG
+
+        custom = get_config(provider="anthropic", api_key="k")
+        assert custom is not DEFAULT_CONFIG
+        assert custom.provider == "anthropic"
+        assert custom.api_key == "k"
+
+    def test_get_config_still_validates(self):
+        from pydantic import ValidationError
+
+        from modelaudit.config import get_config
+
+        with pytest.raises(ValidationError):
+            get_config(similarity_threshold=2.0)
+
 
 class TestAuditDLIIntegration:
     """测试 audit() 多方法集成."""
@@ -139,3 +213,250 @@ class TestAuditDLIIntegration:
             assert "dli" not in methods
             assert "skipped_methods" in result.details
             assert any("DLI" in s for s in result.details["skipped_methods"])
+
+
+class TestAuditStyleScores:
+    RESPONSES = ["Certainly! Here's the answer.", "", "我来帮你分析一下这个问题。"]
+
+    def _fp(self, with_scores: bool, version: str = __version__):
+        from modelaudit.methods.dli import _extract_behavior_signature
+        from modelaudit.methods.style import _compute_style_scores
+
+        data = {"vector": {}, "raw_responses": list(self.RESPONSES), "probe_ids": []}
+        if with_scores:
+            data["style_scores"] = [_compute_style_scores(r) if r else {} for r in self.RESPONSES]
+            data["behavior_signature"] = _extract_behavior_signature(self.RESPONSES)
+            data["derived_version"] = version
+        return Fingerprint(model_id="m", method="llmmap", fingerprint_type="blackbox", data=data)
+
+    def test_precomputed_scores_reused(self):
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", return_value=self._fp(False)):
+            legacy = engine.audit("a", "b", num_probes=3)
+        with patch.object(AuditEngine, "fingerprint", return_value=self._fp(True)), \
+             patch("modelaudit.methods.style._compute_style_scores") as compute, \
+             patch("modelaudit.methods.dli._extract_behavior_signature") as extract:
+            cached = engine.audit("a", "b", num_probes=3)
+        compute.assert_not_called()
+        extract.assert_not_called()
+        assert cached.details["probe_details"] == legacy.details["probe_details"]
+        assert [c.similarity for c in cached.comparisons] == [
+            c.similarity for c in legacy.comparisons
+        ]
+        assert legacy.details["probe_details"][1]["teacher_style"] == "unknown"
+
+    def test_stale_derived_version_recomputed(self):
+        from modelaudit.methods.dli import _extract_behavior_signature
+        from modelaudit.methods.style import _compute_style_scores
+
+        engine = AuditEngine(use_cache=False)
+        stale = self._fp(True, version="0.0.0")
+        with patch.object(AuditEngine, "fingerprint", return_value=stale), \
+             patch("modelaudit.methods.style._compute_style_scores",
+                   side_effect=_compute_style_scores) as compute, \
+             patch("modelaudit.methods.dli._extract_behavior_signature",
+                   side_effect=_extract_behavior_signature) as extract:
+            engine.audit("a", "b", num_probes=3)
+        assert compute.called
+        assert extract.called
+
+    def test_summary_lists_each_method(self):
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", return_value=self._fp(True)):
+            result = engine.audit("a", "b", num_probes=3)
+        lines = result.summary.splitlines()
+        assert lines[0] == "审计对象: a vs b"
+        assert [ln.split("]")[0].strip() for ln in lines[2:]] == ["[llmmap", "[dli"]
+        assert lines[1].startswith("判定结果: ")
+
+    def test_probe_details_padded_to_probe_count(self):
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", return_value=self._fp(True)):
+            result = engine.audit("a", "b", num_probes=5)
+        details = result.details["probe_details"]
+        assert len(details) == 5
+        assert details[0]["is_consistent"]
+        assert [d["student_style"] for d in details[3:]] == ["unknown", "unknown"]
+
+
+class TestConcurrentFingerprints:
+    def _fp(self, model):
+        return Fingerprint(
+            model_id=model, method="llmmap", fingerprint_type="blackbox",
+            data={"vector": {}, "raw_responses": [], "probe_ids": []},
+        )
+
+    def test_audit_fetches_both_sides_concurrently(self):
+        import threading
+
+        barrier = threading.Barrier(2, timeout=5)
+        calls = []
+
+        def fake(self_, model, method="llmmap", **kwargs):
+            barrier.wait()  # 串行执行时这里会超时
+            calls.append((model, kwargs["provider"]))
+            return self._fp(model)
+
+        with patch.object(AuditEngine, "fingerprint", fake):
+            engine = AuditEngine(use_cache=False)
+            result = engine.audit("t", "s", teacher_provider="anthropic")
+
+        assert sorted(calls) == [("s", "openai"), ("t", "anthropic")]
+        assert result.details["fingerprints"]["teacher"]["model_id"] == "t"
+        assert result.details["fingerprints"]["student"]["model_id"] == "s"
+
+    def test_same_model_fetched_once(self):
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", return_value=self._fp("m")) as fp:
+            engine.compare("m", "m")
+        fp.assert_called_once()
+
+    def test_comparer_reused(self):
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", side_effect=lambda m, *a, **k: self._fp(m)):
+            engine.compare("a", "b")
+            with patch("modelaudit.engine.get_fingerprinter") as factory:
+                engine.compare("a", "c")
+                engine.audit("a", "b", num_probes=1)
+        factory.assert_not_called()
+
+    def test_compare_uses_requested_device(self):
+        from modelaudit.methods.reef import REEFFingerprinter
+
+        fp = Fingerprint(model_id="m", method="reef", fingerprint_type="whitebox", data={})
+        engine = AuditEngine(use_cache=False)
+        devices = []
+
+        def fake_compare(self_, fp_a, fp_b):
+            devices.append(self_.device)
+            return "ok"
+
+        with patch.object(AuditEngine, "fingerprint", return_value=fp), \
+             patch.object(REEFFingerprinter, "compare", fake_compare):
+            engine.compare("a", "b", method="reef", device="cuda:1")
+            engine.compare("a", "b", method="reef")
+            engine.compare("a", "b", method="reef", device="cuda:1")
+        assert devices == ["cuda:1", "cpu", "cuda:1"]
+        assert set(engine._comparers) == {("reef", "cuda:1"), ("reef", "cpu")}
+
+    def test_fingerprint_batch_reads_cache_then_fetches_misses(self, tmp_path):
+        engine = AuditEngine(AuditConfig(cache_dir=str(tmp_path)))
+        engine.cache.put("a", "llmmap", "openai", self._fp("a"))
+        calls = []
+
+        def fake(self_, model, method="llmmap", **kwargs):
+            calls.append(model)
+            return self._fp(model)
+
+        with patch.object(AuditEngine, "fingerprint", fake):
+            fps = engine.fingerprint_batch(["b", "a", "c", "b"])
+
+        assert [fp.model_id for fp in fps] == ["b", "a", "c", "b"]
+        assert sorted(calls) == ["b", "c"]
+
+    def test_prewarm_loads_cache_into_memory(self, tmp_path):
+        AuditEngine(AuditConfig(cache_dir=str(tmp_path))).cache.put(
+            "a", "llmmap", "openai", self._fp("a")
+        )
+        engine = AuditEngine(AuditConfig(cache_dir=str(tmp_path)))
+        assert engine.prewarm(["a", "b"]).result(timeout=5) == 1
+        assert len(engine.cache._mem) == 1
+        assert AuditEngine(use_cache=False).prewarm(["a"]) is None
+
+    def test_prewarm_from_config(self, tmp_path):
+        with patch.object(AuditEngine, "prewarm") as prewarm:
+            AuditEngine(AuditConfig(cache_dir=str(tmp_path), prewarm_models=["a"]))
+        prewarm.assert_called_once_with(("a",))
+
+
+class TestVerify:
+    def test_best_match_is_top_ranked(self):
+        fp = Fingerprint(
+            model_id="gpt-4o", method="llmmap", fingerprint_type="blackbox",
+            data={"raw_responses": ["Certainly! Here's what you need to know."]},
+        )
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", return_value=fp):
+            result = engine.verify("gpt-4o")
+        ranked = list(result["all_scores"].items())
+        assert ranked == sorted(ranked, key=lambda kv: kv[1], reverse=True)
+        assert result["best_match"] == ranked[0][0]
+        assert result["best_score"] == ranked[0][1]
+        assert result["claimed_family"] in result["all_scores"]
+
+    def test_precomputed_combined_scores_reused(self):
+        from modelaudit.methods.style import _compute_style_scores
+
+        responses = ["Certainly! Here's what you need to know.", "I'd be happy to help."]
+        fp = Fingerprint(
+            model_id="gpt-4o", method="llmmap", fingerprint_type="blackbox",
+            data={
+                "raw_responses": responses,
+                "combined_style_scores": _compute_style_scores("\n".join(responses)),
+                "derived_version": __version__,
+            },
+        )
+        legacy = fp.model_copy(update={"data": {"raw_responses": responses}})
+        engine = AuditEngine(use_cache=False)
+        with patch.object(AuditEngine, "fingerprint", return_value=legacy):
+            expected = engine.verify("gpt-4o")
+        with patch.object(AuditEngine, "fingerprint", return_value=fp), \
+             patch("modelaudit.methods.style._compute_style_scores") as compute:
+            result = engine.verify("gpt-4o")
+        compute.assert_not_called()
+        assert result["all_scores"] == expected["all_scores"]
+        assert result["verified"] == expected["verified"]
+
+        stale = fp.model_copy(update={"data": {**fp.data, "derived_version": "0.0.0"}})
+        with patch.object(AuditEngine, "fingerprint", return_value=stale), \
+             patch("modelaudit.methods.style._compute_style_scores",
+                   return_value={"gpt-4": 1.0}) as compute:
+            engine.verify("gpt-4o")
+        compute.assert_called_once()
+
+
+class TestDetectCache:
+    def test_cached_results_match_and_renumber(self, tmp_path):
+        config = AuditConfig(cache_dir=str(tmp_path))
+        engine = AuditEngine(config, use_cache=True)
+        texts = ["I'd be happy to help!", "Sure, here's the code.", "Let me think."]
+
+        first = engine.detect(texts[:2], use_cache=True)
+        results = engine.detect(texts, use_cache=True)
+        assert [r.text_id for r in results] == [0, 1, 2]
+        assert results[:2] == first
+        assert results == engine.detect(texts)
+
+        with patch("modelaudit.methods.style.detect_text_source") as mock_detect:
+            engine.detect(list(reversed(texts)), use_cache=True)
+        mock_detect.assert_not_called()
+
+    def test_default_does_not_write(self, tmp_path):
+        engine = AuditEngine(AuditConfig(cache_dir=str(tmp_path)), use_cache=True)
+        engine.detect(["hello"])
+        assert not (tmp_path / "detections.jsonl").exists()
+
+
+class TestDetectBatched:
+    def test_matches_detect(self):
+        engine = AuditEngine(AuditConfig(max_concurrency=3), use_cache=False)
+        texts = [f"Sure! Here is answer {i}.\n\n- point" * (i % 3 + 1) for i in range(17)]
+        batched = engine.detect_batched(texts, batch_size=4)
+        assert batched == engine.detect(texts)
+        assert [r.text_id for r in batched] == list(range(17))
+
+    def test_progress_callback(self):
+        engine = AuditEngine(use_cache=False)
+        seen: list[int] = []
+        results = engine.detect_batched(
+            [f"t{i}" for i in range(23)], batch_size=5, on_batch=seen.append
+        )
+        assert [r.text_id for r in results] == list(range(23))
+        assert sum(seen) == 23
+
+    def test_progress_updates_are_coarse(self):
+        engine = AuditEngine(use_cache=False)
+        seen: list[int] = []
+        engine.detect_batched([f"t{i}" for i in range(2000)], batch_size=5, on_batch=seen.append)
+        assert sum(seen) == 2000
+        assert len(seen) <= 100
@@ -4,12 +4,17 @@ from unittest.mock import patch
 
 import pytest
 
+from modelaudit import __version__
 from modelaudit.methods.llmmap import (
     LLMmapFingerprinter,
     _call_model_api,
+    _call_probes,
     _compute_fingerprint_vector,
     _cosine_similarity,
     _extract_response_features,
+    _marshal_probes,
+    _unit_vector,
+    _unmarshal_response,
 )
 from modelaudit.models import Fingerprint
 
@@ -130,6 +135,49 @@ class TestLLMmapFingerprinter:
         assert result.similarity < 0.5
         assert result.is_derived is False
 
+    def test_compare_uses_stored_unit_vector(self):
+        fp = LLMmapFingerprinter()
+        vec_a = {"avg_length_chars": 800.0, "ratio_has_code_blocks": 0.5, "style_hedging": 0.1}
+        vec_b = {"avg_length_chars": 300.0, "ratio_has_code_blocks": 0.0, "style_helpful": 0.2}
+        legacy = [
+            Fingerprint(model_id=m, method="llmmap", fingerprint_type="blackbox",
+                        data={"vector": v})
+            for m, v in (("a", vec_a), ("b", vec_b))
+        ]
+        stored = [
+            Fingerprint(model_id=f.model_id, method="llmmap", fingerprint_type="blackbox",
+                        data={**f.data, "unit_vector": _unit_vector(f.data["vector"])})
+            for f in legacy
+        ]
+        expected = _cosine_similarity(vec_a, vec_b)
+        assert fp.compare(*legacy).similarity == pytest.approx(expected)
+        assert fp.compare(*stored).similarity == pytest.approx(expected)
+        unit = stored[0].data["unit_vector"]
+        assert sum(v * v for v in unit.values()) == pytest.approx(1.0)
+
+    def test_compare_uses_dense_unit_array(self):
+        from modelaudit.methods.llmmap import _VECTOR_KEYS, _unit_array
+
+        fp = LLMmapFingerprinter()
+        vec_a = {"avg_length_chars": 800.0, "ratio_has_code_blocks": 0.5, "style_hedging": 0.1}
+        vec_b = {"avg_length_chars": 300.0, "style_helpful": 0.2}
+        fps = []
+        for m, v in (("a", vec_a), ("b", vec_b)):
+            unit = _unit_vector(v)
+            arr = _unit_array(unit)
+            assert arr is not None and len(arr) == len(_VECTOR_KEYS)
+            fps.append(Fingerprint(model_id=m, method="llmmap", fingerprint_type="blackbox",
+                                   data={"vector": v, "unit_array": arr}))
+        assert fp.compare(*fps).similarity == pytest.approx(_cosine_similarity(vec_a, vec_b))
+        # schema 之外的维度无法放进稠密数组
+        assert _unit_array({"custom": 1.0}) is None
+
+    def test_vector_keys_cover_extracted_features(self):
+        from modelaudit.methods.llmmap import _VECTOR_KEYS
+
+        features = [_extract_response_features("Sure! 1. First\n- item\n# Title")]
+        assert set(_compute_fingerprint_vector(features)) == set(_VECTOR_KEYS)
+
 
 class TestRetryLogic:
     @patch("modelaudit.methods.llmmap._call_model_api_once")
@@ -194,4 +242,244 @@ class TestRetryLogic:
         result = _call_model_api("model", "prompt", max_retries=3)
         assert result == "OK"
         # 速率限制时 attempt+1 传入 backoff, 所以退避更长
-        mock_sleep.assert_called_once_with(1)
+        mock_sleep.assert_called_once_with(1, None)
+
+    @patch("modelaudit.methods.llmmap._call_model_api_once")
+    @patch("modelaudit.methods.llmmap._backoff_sleep")
+    def test_rate_limit_honors_retry_after(self, mock_sleep, mock_api):
+        from unittest.mock import MagicMock
+
+        err = Exception("429 Too Many Requests")
+        err.response = MagicMock(headers={"retry-after": "7"})
+        mock_api.side_effect = [err, "OK"]
+        assert _call_model_api("model", "prompt", max_retries=3) == "OK"
+        mock_sleep.assert_called_once_with(1, 7.0)
+
+    @patch("modelaudit.methods.llmmap.time.sleep")
+    def test_backoff_jitter_and_retry_after(self, mock_sleep):
+        from modelaudit.methods.llmmap import _backoff_sleep
+
+        for _ in range(20):
+            _backoff_sleep(3)
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert all(4 <= d <= 8 for d in delays)
+        assert len(set(delays)) > 1
+        mock_sleep.reset_mock()
+        _backoff_sleep(3, retry_after=120)
+        mock_sleep.assert_called_once_with(60.0)
+
+
+class TestCallProbes:
+    def test_order_preserved_and_concurrency_capped(self):
+        import threading
+        import time
+
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def fake_call(model, prompt, *args, **kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01 * (5 - int(prompt) % 5))
+            with lock:
+                active -= 1
+            return f"resp-{prompt}"
+
+        prompts = [str(i) for i in range(10)]
+        with patch("modelaudit.methods.llmmap._call_model_api", side_effect=fake_call):
+            responses = _call_probes("m", prompts, max_concurrency=3)
+        assert responses == [f"resp-{i}" for i in range(10)]
+        assert 1 < peak <= 3
+
+    def test_shared_slots_cap_across_calls(self):
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def fake_call(model, prompt, *args, **kwargs):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            return f"{model}-{prompt}"
+
+        slots = threading.BoundedSemaphore(3)
+        prompts = [str(i) for i in range(6)]
+        with patch("modelaudit.methods.llmmap._call_model_api", side_effect=fake_call), \
+             ThreadPoolExecutor(max_workers=2) as ex:
+            futs = [
+                ex.submit(_call_probes, m, prompts, max_concurrency=3, slots=slots)
+                for m in ("t", "s")
+            ]
+            results = [f.result() for f in futs]
+        assert results[1] == [f"s-{i}" for i in range(6)]
+        assert peak <= 3
+
+    @patch("modelaudit.methods.llmmap._call_model_api_once", return_value="Sure! Here you go.")
+    def test_fingerprinter_uses_max_concurrency(self, mock_once):
+        fp = LLMmapFingerprinter(num_probes=4, max_concurrency=1)
+        fp.prepare("m")
+        with patch("modelaudit.methods.llmmap.ThreadPoolExecutor") as pool:
+            result = fp.get_fingerprint()
+        pool.assert_not_called()
+        assert result.data["raw_responses"] == ["Sure! Here you go."] * 4
+        assert len(result.data["style_scores"]) == 4
+        assert result.data["style_scores"][0]
+        assert result.data["behavior_signature"]["features"]["avg_length"] == 4
+        assert result.data["combined_style_scores"]
+        assert result.data["derived_version"] == __version__
+        assert result.data["unit_vector"] == _unit_vector(result.data["vector"])
+        assert len(result.data["unit_array"]) == len(result.data["vector"])
+
+
+class TestMarshalProbes:
+    def test_roundtrip(self):
+        prompt = _marshal_probes(["What is 2+2?", "Name a color."])
+        assert "[[QUESTION 1]]\nWhat is 2+2?" in prompt
+        assert "[[QUESTION 2]]\nName a color." in prompt
+        text = "[[ANSWER 1]]\n4\n\n[[ANSWER 2]]\n1. Red\n2. Blue"
+        # 答案内部的编号列表不会被误切
+        assert _unmarshal_response(text, 2) == ["4", "1. Red\n2. Blue"]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "[[ANSWER 1]]\nfoo",
+            "[[ANSWER 2]]\nfoo\n[[ANSWER 1]]\nbar",
+            "[[ANSWER 1]]\n\n[[ANSWER 2]]\nbar",
+            "no markers at all",
+        ],
+    )
+    def test_malformed_returns_none(self, text):
+        assert _unmarshal_response(text, 2) is None
+
+    def test_call_probes_batches_calls(self):
+        def fake_call(model, prompt, *args, **kwargs):
+            n = prompt.count("[[QUESTION")
+            assert kwargs["max_tokens"] == 500 * max(n, 1)
+            if not n:
+                return "ans"
+            return "\n".join(f"[[ANSWER {i}]]\nans" for i in range(1, n + 1))
+
+        with patch("modelaudit.methods.llmmap._call_model_api", side_effect=fake_call) as m:
+            responses = _call_probes("m", ["a", "b", "c", "d", "e"], marshal_batch=2)
+        assert responses == ["ans"] * 5
+        # 2 + 2 + 1 条, 末组只有一条时按原 prompt 直接调用
+        assert m.call_count == 3
+
+    def test_parse_failure_falls_back_per_probe(self):
+        def fake_call(model, prompt, *args, **kwargs):
+            return "garbled" if "[[QUESTION" in prompt else f"resp-{prompt}"
+
+        with patch("modelaudit.methods.llmmap._call_model_api", side_effect=fake_call) as m:
+            responses = _call_probes("m", ["a", "b"], marshal_batch=2, max_concurrency=1)
+        assert responses == ["resp-a", "resp-b"]
+        assert m.call_count == 3
+
+    def test_fingerprinter_records_marshal_batch(self):
+        fp = LLMmapFingerprinter(num_probes=4)
+        fp.prepare("m", marshal_batch=4)
+        answer = "\n".join(f"[[ANSWER {i}]]\nSure." for i in range(1, 5))
+        with patch("modelaudit.methods.llmmap._call_model_api", return_value=answer) as m:
+            result = fp.get_fingerprint()
+        assert m.call_count == 1
+        assert result.data["raw_responses"] == ["Sure."] * 4
+        assert result.data["marshal_batch"] == 4
+
+
+class TestClientReuse:
+    def setup_method(self):
+        from modelaudit.methods.llmmap import _get_client
+
+        _get_client.cache_clear()
+
+    def teardown_method(self):
+        from modelaudit.methods.llmmap import _get_client
+
+        _get_client.cache_clear()
+
+    def test_openai_client_shared_across_calls(self):
+        import sys
+        import types
+        from unittest.mock import MagicMock
+
+        from modelaudit.methods.llmmap import _call_model_api_once
+
+        fake_openai = types.ModuleType("openai")
+        fake_openai.OpenAI = MagicMock()
+        create = fake_openai.OpenAI.return_value.chat.completions.create
+        create.return_value.choices = [MagicMock()]
+        create.return_value.choices[0].message.content = "hello"
+
+        with patch.dict(sys.modules, {"openai": fake_openai}):
+            for prompt in ("a", "b", "c"):
+                assert _call_model_api_once("gpt-4o", prompt, api_key="k") == "hello"
+            _call_model_api_once("gpt-4o", "d", api_key="other")
+
+        assert fake_openai.OpenAI.call_count == 2
+        assert create.call_count == 4
+        fake_openai.OpenAI.assert_any_call(api_key="k", timeout=60.0)
+
+    @pytest.mark.parametrize("has_h2", [True, False])
+    def test_custom_client_enables_http2_when_available(self, has_h2):
+        import sys
+        import types
+        from unittest.mock import MagicMock
+
+        from modelaudit.methods.llmmap import _get_client
+
+        fake_httpx = types.ModuleType("httpx")
+        fake_httpx.Client = MagicMock()
+        spec = object() if has_h2 else None
+        with patch.dict(sys.modules, {"httpx": fake_httpx}), \
+             patch("modelaudit.methods.llmmap.importlib.util.find_spec", return_value=spec):
+            _get_client("custom", "k", "http://host/", 30)
+        kwargs = fake_httpx.Client.call_args.kwargs
+        assert kwargs["http2"] is has_h2
+        assert kwargs["base_url"] == "http://host"
+
+    def test_concurrent_first_use_builds_one_client(self):
+        import sys
+        import threading
+        import time
+        import types
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest.mock import MagicMock
+
+        from modelaudit.methods.llmmap import _call_model_api_once
+
+        def slow_client(**kwargs):
+            time.sleep(0.02)
+            client = MagicMock()
+            create = client.chat.completions.create
+            create.return_value.choices = [MagicMock()]
+            create.return_value.choices[0].message.content = "hi"
+            return client
+
+        fake_openai = types.ModuleType("openai")
+        fake_openai.OpenAI = MagicMock(side_effect=slow_client)
+        barrier = threading.Barrier(4)
+
+        def call(_):
+            barrier.wait()
+            return _call_model_api_once("gpt-4o", "p", api_key="k")
+
+        with patch.dict(sys.modules, {"openai": fake_openai}), ThreadPoolExecutor(4) as ex:
+            assert list(ex.map(call, range(4))) == ["hi"] * 4
+        assert fake_openai.OpenAI.call_count == 1
+
+    def test_unsupported_provider(self):
+        from modelaudit.methods.llmmap import _call_model_api_once
+
+        with pytest.raises(ValueError, match="不支持的 provider"):
+            _call_model_api_once("m", "p", provider="nope")
@@ -236,3 +236,104 @@ class TestToolList:
 
         server = create_server()
         assert server is not None
+
+    def test_tool_definitions_built_once(self):
+        from modelaudit.mcp_server import _tool_definitions
+
+        tools = _tool_definitions()
+        assert _tool_definitions() is tools
+        names = [t.name for t in tools]
+        assert len(names) == len(set(names))
+        assert "audit_memorization" in names
+
+
+class TestAuditMemorization:
+    def test_samples_scored_concurrently_in_order(self):
+        import asyncio
+        import threading
+
+        from modelaudit.mcp_server import _memorization_results
+
+        barrier = threading.Barrier(4, timeout=5)
+
+        def fake_call(model, prompt, provider="openai"):
+            barrier.wait()  # 串行执行时这里会超时
+            if prompt.startswith("请续写"):
+                return "world again"
+            return "one two three four five six seven eight"
+
+        samples = [
+            "hello world again",
+            "one two three four five six seven eight nine ten eleven twelve",
+        ]
+        with patch("modelaudit.methods.llmmap._call_model_api_once", side_effect=fake_call):
+            results = asyncio.run(_memorization_results(samples, "m", "openai", "both"))
+
+        assert [(r["index"], r["method"]) for r in results] == [
+            (1, "prefix_completion"), (1, "verbatim_check"),
+            (2, "prefix_completion"), (2, "verbatim_check"),
+        ]
+        assert results[0]["score"] > 0.5
+        assert results[3]["score"] == 0.5
+
+    def test_concurrency_capped(self):
+        import asyncio
+        import threading
+        import time
+
+        from modelaudit.mcp_server import _memorization_results
+
+        active = peak = 0
+        lock = threading.Lock()
+
+        def fake_call(model, prompt, provider="openai"):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            return ""
+
+        with patch("modelaudit.methods.llmmap._call_model_api_once", side_effect=fake_call):
+            results = asyncio.run(
+                _memorization_results(["a b"] * 6, "m", "openai", "prefix_completion", concurrency=2)
+            )
+        assert len(results) == 6
+        assert peak <= 2
+
+    def test_verbatim_check_phrases(self):
+        from modelaudit.mcp_server import _verbatim_check_score
+
+        with patch("modelaudit.methods.llmmap._call_model_api_once", return_value="a b c x"):
+            assert _verbatim_check_score("m", "a b c d e f", "openai") == 0.5
+            assert _verbatim_check_score("m", "a b", "openai") == 0.0
+        with patch("modelaudit.methods.llmmap._call_model_api_once", return_value="x a b c, d e f."):
+            assert _verbatim_check_score("m", "a b c d e f", "openai") == 1.0
+        with patch("modelaudit.methods.llmmap._call_model_api_once", return_value="  "):
+            assert _verbatim_check_score("m", "a b c d e f", "openai") == 0.0
+
+    def test_text_similarity_backends(self):
+        from modelaudit import mcp_server
+
+        with patch.object(mcp_server, "_fuzz_ratio", None):
+            assert mcp_server._text_similarity("abcd", "abcd") == 1.0
+            assert mcp_server._text_similarity("abcd", "wxyz") == 0.0
+        with patch.object(mcp_server, "_fuzz_ratio", return_value=75.0) as fuzz:
+            assert mcp_server._text_similarity("a", "b") == 0.75
+        fuzz.assert_called_once_with("a", "b")
+
+
+class TestAuditReport:
+    def test_sections_in_order_with_placeholders(self):
+        from modelaudit.mcp_server import _REPORT_SECTIONS, _build_audit_report
+
+        text = _build_audit_report({"verify_model": "OK"}, "m", "2026-01-01")
+        lines = text.split("\n")
+        assert lines[0] == "# 模型审计报告：m"
+        headings = [ln[3:] for ln in lines if ln.startswith("## ")]
+        assert headings == [title for _, title in _REPORT_SECTIONS]
+        i = lines.index("## 模型身份验证")
+        assert lines[i + 2] == "OK"
+        assert text.count("*未执行此项检查。*") == len(_REPORT_SECTIONS) - 1
@@ -0,0 +1,94 @@
+"""测试 API 速率限制."""
+
+from unittest.mock import patch
+
+import pytest
+
+from modelaudit.config import AuditConfig
+from modelaudit.engine import AuditEngine
+from modelaudit.ratelimit import RateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("modelaudit.ratelimit.time", fake):
+        yield fake
+
+
+class TestTokenBucket:
+    def test_burst_then_wait(self, clock):
+        bucket = TokenBucket(60)  # 1 个/秒, 容量 60
+        for _ in range(60):
+            assert bucket.acquire() == 0
+        waited = bucket.acquire()
+        assert waited == pytest.approx(1.0)
+        assert clock.now == pytest.approx(1.0)
+
+    def test_refill_over_time(self, clock):
+        bucket = TokenBucket(120, capacity=2)
+        bucket.acquire(2)
+        clock.now += 0.5  # 补充 1 个
+        assert bucket.acquire(1) == 0
+        assert bucket.acquire(1) == pytest.approx(0.5)
+
+    def test_amount_capped_at_capacity(self, clock):
+        bucket = TokenBucket(60, capacity=10)
+        bucket.acquire(10)
+        assert bucket.acquire(1000) == pytest.approx(10.0)
+
+    def test_invalid_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+
+class TestRateLimiter:
+    def test_rpm_and_tpm(self, clock):
+        limiter = RateLimiter(rpm=60, tpm=600)
+        assert limiter.acquire(600) == 0
+        # 请求数还有余量, token 需等 1 秒补充 10 个
+        assert limiter.acquire(10) == pytest.approx(1.0)
+
+    def test_unlimited(self, clock):
+        limiter = RateLimiter()
+        for _ in range(1000):
+            limiter.acquire(10_000)
+        assert clock.slept == []
+
+
+class TestEngineRateLimiter:
+    def test_shared_per_endpoint(self):
+        engine = AuditEngine(AuditConfig(rate_limits={"openai": (60, 0)}), use_cache=False)
+        a = engine._rate_limiter("openai", "")
+        assert a is not None
+        assert engine._rate_limiter("openai", "") is a
+        assert engine._rate_limiter("openai", "https://other") is not a
+        assert engine._rate_limiter("anthropic", "") is None
+
+    def test_slots_shared_per_endpoint(self):
+        engine = AuditEngine(AuditConfig(max_concurrency=2), use_cache=False)
+        slots = engine._endpoint_slots("openai", "")
+        assert engine._endpoint_slots("openai", "") is slots
+        assert engine._endpoint_slots("openai", "https://other") is not slots
+        assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+        assert not slots.acquire(blocking=False)
+
+    def test_passed_to_fingerprinter(self):
+        engine = AuditEngine(AuditConfig(rate_limits={"openai": (60, 0)}), use_cache=False)
+        with patch("modelaudit.methods.llmmap._call_model_api_once", return_value="ok"), \
+             patch.object(RateLimiter, "acquire", return_value=0.0) as acquire:
+            engine.fingerprint("m", num_probes=3)
+        assert acquire.call_count == 3
@@ -1,5 +1,7 @@
 """测试 REEF 白盒指纹方法."""
 
+from unittest.mock import patch
+
 import pytest
 
 from modelaudit.methods.reef import _REEF_PROBES, REEFFingerprinter
@@ -62,6 +64,71 @@ class TestComputeCKA:
         cka = _compute_cka(X, Y)
         assert 0 <= cka <= 1
 
+    def test_matches_feature_space_formula(self):
+        import numpy as np
+
+        from modelaudit.methods.reef import _compute_cka
+
+        rng = np.random.default_rng(2)
+        X = rng.normal(size=(6, 40))
+        Y = rng.normal(size=(6, 25))
+        Xc = X - X.mean(axis=0)
+        Yc = Y - Y.mean(axis=0)
+        expected = np.linalg.norm(Yc.T @ Xc) ** 2 / (
+            np.linalg.norm(Xc.T @ Xc) * np.linalg.norm(Yc.T @ Yc)
+        )
+        assert _compute_cka(X, Y) == pytest.approx(expected)
+
+    def test_ndarray_input_matches_lists(self):
+        import numpy as np
+
+        from modelaudit.methods.reef import _compute_cka
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(8, 16))
+        Y = rng.normal(size=(8, 12))
+        assert _compute_cka(X, Y) == pytest.approx(_compute_cka(X.tolist(), Y.tolist()))
+
+
+@needs_numpy
+class TestComputeLayerCKA:
+    def test_matches_per_layer(self):
+        import numpy as np
+
+        from modelaudit.methods.reef import _compute_cka, _compute_layer_cka
+
+        rng = np.random.default_rng(1)
+        A = rng.normal(size=(3, 8, 16))
+        B = rng.normal(size=(3, 8, 10))
+        expected = [_compute_cka(a, b) for a, b in zip(A, B, strict=True)]
+        assert _compute_layer_cka(A.tolist(), B.tolist()) == pytest.approx(expected)
+
+    def test_ragged_layers_fall_back(self):
+        from modelaudit.methods.reef import _compute_layer_cka
+
+        hs = [[[1.0, 2.0], [3.0, 5.0]], [[1.0, 2.0]]]
+        assert _compute_layer_cka(hs, hs) == pytest.approx([1.0, 0.0])
+
+    def test_non_cpu_device_without_torch_falls_back(self):
+        import sys
+
+        import numpy as np
+
+        from modelaudit.methods.reef import _compute_layer_cka
+
+        rng = np.random.default_rng(3)
+        A = rng.normal(size=(2, 5, 7))
+        B = rng.normal(size=(2, 5, 4))
+        with patch.dict(sys.modules, {"torch": None}):
+            got = _compute_layer_cka(A, B, device="cuda")
+        assert got == pytest.approx(_compute_layer_cka(A, B))
+
+    def test_zero_layer(self):
+        from modelaudit.methods.reef import _compute_layer_cka
+
+        zeros = [[[0.0, 0.0], [0.0, 0.0]]]
+        assert _compute_layer_cka(zeros, zeros) == [0.0]
+
 
 class TestREEFFingerprinter:
     def test_init(self):
@@ -98,6 +165,25 @@ class TestREEFFingerprinter:
         assert result.similarity == 0.0
         assert result.is_derived is False
 
+    @needs_numpy
+    def test_get_fingerprint_packs_hidden_states(self):
+        import hashlib
+
+        import numpy as np
+
+        hs = np.arange(2 * len(_REEF_PROBES) * 4, dtype=np.float32).reshape(2, -1, 4)
+        fp = REEFFingerprinter()
+        fp.prepare("m")
+        with patch("modelaudit.methods.reef._extract_hidden_states", return_value=hs):
+            result = fp.get_fingerprint()
+        packed = result.data["hidden_states"]
+        assert packed["dtype"] == "float16"
+        assert packed["shape"] == [2, len(_REEF_PROBES), 4]
+        assert result.data["num_layers"] == 2
+        # 与按层 list 计算的旧哈希一致
+        flat = np.array([np.mean(layer, axis=0)[:16] for layer in hs.tolist()]).flatten()
+        assert result.data["hash"] == hashlib.md5(flat.tobytes()).hexdigest()[:16]
+
     @needs_numpy
     def test_compare_with_hidden_states(self):
         fp = REEFFingerprinter()
@@ -120,6 +206,79 @@ class TestREEFFingerprinter:
         assert abs(result.similarity - 1.0) < 1e-6
         assert result.is_derived is True
         assert "layer_cka" in result.details
+        assert result.details["skipped_cka"] is True
+        assert result.details["layer_cka"] == [1.0, 1.0]
+
+    @needs_numpy
+    @pytest.mark.parametrize("hs", [
+        [[[1.0, 2.0]], [[3.0, 4.0]]],  # 单样本
+        [[[1.0, 2.0], [3.0, 4.0]], [[5.0, 5.0], [5.0, 5.0]]],  # 第二层零方差
+    ])
+    def test_identical_degenerate_matches_cka(self, hs):
+        from modelaudit.methods.reef import _compute_layer_cka
+
+        fp = REEFFingerprinter()
+        fps = [
+            Fingerprint(model_id=m, method="reef", fingerprint_type="whitebox",
+                        data={"hidden_states": hs, "hash": "same"})
+            for m in ("a", "b")
+        ]
+        result = fp.compare(*fps)
+        assert result.details["skipped_cka"] is False
+        assert result.details["layer_cka"] == _compute_layer_cka(hs, hs)
+        assert 0.0 in result.details["layer_cka"]
+
+    @needs_numpy
+    def test_same_hash_different_data_runs_cka(self):
+        fp = REEFFingerprinter()
+        hs_a = [[[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]]
+        hs_b = [[[0.0, 1.0], [1.0, 0.0], [0.5, 0.5]]]
+        fps = [
+            Fingerprint(model_id=m, method="reef", fingerprint_type="whitebox",
+                        data={"hidden_states": hs, "hash": "same"})
+            for m, hs in (("a", hs_a), ("b", hs_b))
+        ]
+        with patch("modelaudit.methods.reef._compute_layer_cka", return_value=[0.3]) as cka:
+            result = fp.compare(*fps)
+        cka.assert_called_once()
+        assert result.details["hash_match"] is True
+        assert result.details["skipped_cka"] is False
+        assert result.similarity == pytest.approx(0.3)
+
+    @needs_numpy
+    def test_pack_roundtrip_and_cka_error(self):
+        import numpy as np
+
+        from modelaudit.methods.reef import _pack_hidden_states, _unpack_hidden_states
+
+        rng = np.random.default_rng(4)
+        hs_a = rng.normal(size=(3, 8, 64)).astype(np.float32)
+        hs_b = (hs_a + rng.normal(scale=0.5, size=hs_a.shape)).astype(np.float32)
+        packed_a = _pack_hidden_states(hs_a)
+        packed_b = _pack_hidden_states(hs_b)
+        np.testing.assert_allclose(_unpack_hidden_states(packed_a), hs_a, atol=1e-2)
+
+        def _fp(model, hs):
+            return Fingerprint(
+                model_id=model, method="reef", fingerprint_type="whitebox",
+                data={"hidden_states": hs},
+            )
+
+        fp = REEFFingerprinter()
+        exact = fp.compare(_fp("a", hs_a.tolist()), _fp("b", hs_b.tolist()))
+        packed = fp.compare(_fp("a", packed_a), _fp("b", packed_b))
+        assert abs(exact.similarity - packed.similarity) < 1e-3
+
+    @needs_numpy
+    def test_pack_out_of_fp16_range_keeps_fp32(self):
+        import numpy as np
+
+        from modelaudit.methods.reef import _pack_hidden_states, _unpack_hidden_states
+
+        hs = np.array([[[1e6, 1.0], [2.0, 3.0]]], dtype=np.float32)
+        packed = _pack_hidden_states(hs)
+        assert packed["dtype"] == "float32"
+        np.testing.assert_array_equal(_unpack_hidden_states(packed), hs)
 
     @needs_numpy
     def test_compare_different_hidden_states(self):
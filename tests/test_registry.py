@@ -34,3 +34,67 @@ class TestRegistry:
     def test_list_methods_not_empty(self):
         methods = list_methods()
         assert len(methods) >= 2
+
+    def test_attributes_available_on_class(self):
+        from modelaudit.methods.dli import DLIFingerprinter
+        from modelaudit.methods.reef import REEFFingerprinter
+
+        assert DLIFingerprinter.name == "dli"
+        assert DLIFingerprinter.fingerprint_type == "blackbox"
+        assert REEFFingerprinter.fingerprint_type == "whitebox"
+
+    def test_builtin_methods_imported_lazily(self):
+        import subprocess
+        import sys
+
+        code = (
+            "import sys\n"
+            "from modelaudit.engine import AuditEngine\n"
+            "AuditEngine(use_cache=False).detect(['hello'])\n"
+            "assert 'modelaudit.methods.reef' not in sys.modules\n"
+            "from modelaudit.registry import get_fingerprinter\n"
+            "assert get_fingerprinter('reef').name == 'reef'\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+    def test_builtin_methods_match_package(self):
+        """registry 的内置方法表与 methods 包内模块一致, 且每个都注册了同名方法."""
+        from pathlib import Path
+
+        import modelaudit.methods as methods_pkg
+        from modelaudit.registry import _BUILTIN_METHODS
+
+        pkg_dir = Path(methods_pkg.__file__).parent
+        modules = {p.stem for p in pkg_dir.glob("*.py")} - {"__init__"}
+        assert set(methods_pkg.__all__) == modules
+        assert set(_BUILTIN_METHODS) <= modules
+        assert set(_BUILTIN_METHODS) <= set(list_methods())
+
+    def test_list_methods_with_property_plugin(self):
+        """插件按抽象属性实现 fingerprint_type (property) 时, 列出的是实际值."""
+        from modelaudit.base import Fingerprinter
+        from modelaudit.registry import _REGISTRY, register
+
+        @register("_prop_plugin")
+        class PropPlugin(Fingerprinter):
+            @property
+            def name(self) -> str:
+                return "_prop_plugin"
+
+            @property
+            def fingerprint_type(self):
+                return "blackbox"
+
+            def prepare(self, model, **kwargs):
+                pass
+
+            def get_fingerprint(self):
+                raise NotImplementedError
+
+            def compare(self, fp_a, fp_b):
+                raise NotImplementedError
+
+        try:
+            assert list_methods()["_prop_plugin"] == "blackbox"
+        finally:
+            _REGISTRY.pop("_prop_plugin", None)
@@ -1,8 +1,11 @@
 """测试风格分析方法."""
 
 from modelaudit.methods.style import (
+    _cached_style_scores,
+    _claimed_family,
     _compute_style_scores,
     _detect_lang,
+    clear_style_caches,
     compute_style_fingerprint,
     detect_text_source,
 )
@@ -38,6 +41,52 @@ class TestComputeStyleScores:
         scores = _compute_style_scores("")
         assert isinstance(scores, dict)
 
+    def test_memoized_and_isolated(self):
+        text = "Memo test: certainly, here's the answer."
+        first = _compute_style_scores(text)
+        hits = _cached_style_scores.cache_info().hits
+        first["gpt-4"] = -1.0
+        second = _compute_style_scores(text)
+        assert _cached_style_scores.cache_info().hits == hits + 1
+        assert second["gpt-4"] != -1.0
+
+    def test_automaton_path_matches_substring_path(self):
+        from unittest.mock import patch
+
+        from modelaudit.methods import style
+
+        class FakeAutomaton:
+            """按 pyahocorasick 接口的朴素实现: iter 产出所有 (含重叠) 命中."""
+
+            def __init__(self):
+                self.words = {}
+
+            def add_word(self, key, value):
+                self.words[key] = value
+
+            def make_automaton(self):
+                pass
+
+            def iter(self, text):
+                for key, value in self.words.items():
+                    start = text.find(key)
+                    while start != -1:
+                        yield start + len(key) - 1, value
+                        start = text.find(key, start + 1)
+
+        text = (
+            "Certainly! Here's it's worth noting that... I cannot assist with that. "
+            "好的，我来看看 作为ai助手"
+        )
+        expected = _cached_style_scores.__wrapped__(text)
+        fake = type("FakeModule", (), {"Automaton": FakeAutomaton})
+        style._pattern_automaton.cache_clear()
+        try:
+            with patch.object(style, "ahocorasick", fake):
+                assert _cached_style_scores.__wrapped__(text) == expected
+        finally:
+            style._pattern_automaton.cache_clear()
+
 
 class TestDetectTextSource:
     def test_single_text(self):
@@ -90,6 +139,58 @@ class TestDetectLang:
     def test_empty(self):
         assert _detect_lang("") == "en"
 
+    def test_cjk_range_bounds(self):
+        # 统一汉字区间两端都计入, 区间外的全角标点不计
+        assert _detect_lang("\u4e00\u9fff" * 5) == "zh"
+        assert _detect_lang("a" * 100 + "\u4e00" * 9 + "，" * 20) == "en"
+
+    def test_ascii_fast_path_skips_scan(self):
+        from unittest.mock import patch
+
+        from modelaudit.methods import style
+
+        with patch.object(style, "_CJK_RE") as cjk:
+            assert _detect_lang("plain ascii " * 100) == "en"
+        cjk.findall.assert_not_called()
+        # 非 ASCII 但无汉字 (如带重音字母) 仍走完整统计
+        assert _detect_lang("café " * 50) == "en"
+
+
+class TestClaimedFamily:
+    def test_first_signature_match_wins(self):
+        assert _claimed_family("GPT-4o-mini") == "gpt-4"
+        assert _claimed_family("deepseek-chat") == "deepseek"
+        assert _claimed_family("Qwen2.5-72B") == "qwen"
+
+    def test_unknown(self):
+        assert _claimed_family("my-private-model") is None
+
+
+class TestClearStyleCaches:
+    def test_signature_edits_visible_after_clear(self):
+        from unittest.mock import patch
+
+        from modelaudit.methods import style
+        from modelaudit.methods.style import MODEL_STYLE_SIGNATURES
+
+        text = "Zorblax greetings, traveller."
+        assert "zorblax" not in _compute_style_scores(text)
+        assert "zorblax greetings" not in style._signature_patterns()
+        assert _claimed_family("zorblax-7b") is None
+        sig = {"markers": ["zorblax greetings"], "refusal_patterns": [], "structural": {}, "lang": "en"}
+        try:
+            with patch.dict(MODEL_STYLE_SIGNATURES, {"zorblax": sig}):
+                # 未清缓存时仍返回旧表的结果
+                assert "zorblax" not in _compute_style_scores(text)
+                clear_style_caches()
+                assert _compute_style_scores(text)["zorblax"] > 0.3
+                assert _claimed_family("zorblax-7b") == "zorblax"
+                assert "zorblax greetings" in style._signature_patterns()
+        finally:
+            clear_style_caches()
+        assert "zorblax" not in _compute_style_scores(text)
+        assert "zorblax greetings" not in style._signature_patterns()
+
 
 class TestBenchmarkAccuracy:
     def test_all_benchmark_correct(self):
@@ -119,3 +220,26 @@ class TestStructuralScoring:
         scores = _compute_style_scores(text)
         # gpt-4 tends_code_blocks=True, gemini tends_code_blocks=False
         assert scores["gpt-4"] > scores["gemini"]
+
+
+class TestSingleDefinition:
+    def test_style_module_defines_each_name_once(self):
+        """风格签名表与打分函数只在 style.py 中定义一次, 防止重复定义静默覆盖."""
+        import ast
+        from collections import Counter
+        from pathlib import Path
+
+        from modelaudit.methods import style
+
+        tree = ast.parse(Path(style.__file__).read_text(encoding="utf-8"))
+        names: Counter = Counter()
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                names[node.name] += 1
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                names.update(t.id for t in targets if isinstance(t, ast.Name))
+        duplicated = [n for n, c in names.items() if c > 1]
+        assert duplicated == []
+        assert names["MODEL_STYLE_SIGNATURES"] == 1
+        assert names["_compute_style_scores"] == 1